@@ -0,0 +1,239 @@
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request
+from pydantic import BaseModel, PrivateAttr
+
+from app import settings
+from app.browser_pool import BrowserPool, get_browser_pool
+
+# A task runs in a browser worker thread on a checked-out WebDriver:
+# task(driver, **params) -> JSON-serializable result
+BrowserTask = Callable[..., Any]
+
+
+class QueueFullError(Exception):
+    """
+    Every browser worker is busy and the queue is full: retry later (429).
+    """
+
+
+class QueueClosedError(Exception):
+    """
+    The queue no longer takes jobs (the app is shutting down): 503.
+    """
+
+
+class BrowserJob(BaseModel):
+    id: str
+    task: str
+    status: str = "queued"  # queued / running / done / failed / timeout
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    queue_position: Optional[int] = None  # only while queued
+    result: Any = None
+    error: Optional[str] = None
+    # Set when the job was given up on (timeout): its worker must not start the task
+    _cancelled: threading.Event = PrivateAttr(default_factory=threading.Event)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "timeout")
+
+
+class BrowserJobQueue:
+    """
+    Runs browser tasks on `workers` dedicated threads, each holding one
+    BrowserPool session at a time, so browser work never occupies the
+    server's own thread pool.
+
+    At most `max_queued` jobs wait for a worker; `submit` raises
+    QueueFullError beyond that instead of piling up work. A running job
+    gets `job_timeout` seconds; after that it is marked "timeout" and its
+    browser is quit, which aborts the blocking WebDriver call and makes
+    the pool replace the session. A timed-out job still occupies its
+    worker until the task has returned, and one that timed out before it
+    got a browser never runs. Jobs still waiting for a worker when the
+    queue is closed fail. Finished jobs can be polled for `keep_finished`
+    seconds.
+    """
+
+    def __init__(
+        self,
+        pool: BrowserPool,
+        workers: int = settings.BROWSER_WORKERS,
+        max_queued: int = settings.BROWSER_QUEUE_SIZE,
+        job_timeout: float = settings.BROWSER_JOB_TIMEOUT,
+        keep_finished: float = settings.BROWSER_JOB_TTL,
+    ):
+        self.pool = pool
+        self.workers = workers
+        self.max_queued = max_queued
+        self.job_timeout = job_timeout
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="browser-job")
+        self._jobs: "OrderedDict[str, BrowserJob]" = OrderedDict()
+        self._done: Dict[str, asyncio.Event] = {}
+        self._drivers: Dict[str, Any] = {}  # job id -> driver, while running
+        self._queued: "OrderedDict[str, None]" = OrderedDict()
+        # Worker threads busy with a job, counted from the threads themselves:
+        # a timed-out job keeps its worker (and browser) until the task returns
+        self._running = 0
+        self._closed = False
+        # Set (and replaced) whenever a worker frees up, for `run` callers waiting for room
+        self._freed = asyncio.Event()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "queued": len(self._queued),
+            "max_queued": self.max_queued,
+        }
+
+    def get(self, job_id: str) -> Optional[BrowserJob]:
+        self._purge()
+        job = self._jobs.get(job_id)
+        if job is not None and job.status == "queued":
+            job.queue_position = list(self._queued).index(job_id) + 1
+        return job
+
+    def submit(self, name: str, task: BrowserTask, **params) -> BrowserJob:
+        """
+        Queues `task(driver, **params)` and returns its job right away.
+        """
+        if self._closed:
+            raise QueueClosedError("Browser job queue is shut down")
+        self._purge()
+        if self._running + len(self._queued) >= self.workers + self.max_queued:
+            raise QueueFullError(f"{self._running} browser jobs running and {len(self._queued)} queued")
+
+        job = BrowserJob(id=uuid.uuid4().hex, task=name, created_at=time.time())
+        self._jobs[job.id] = job
+        self._done[job.id] = asyncio.Event()
+        self._queued[job.id] = None
+        asyncio.ensure_future(self._run(job, task, params))
+        return job
+
+    async def run(self, name: str, task: BrowserTask, queue_timeout: Optional[float] = None, **params) -> BrowserJob:
+        """
+        Like `submit`, but waits up to `queue_timeout` seconds (None: no
+        limit) for room in the queue before raising QueueFullError, then
+        waits for the job to finish. For callers that are already bounded
+        themselves, like batch URL checks.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if queue_timeout is None else loop.time() + queue_timeout
+        while True:
+            try:
+                job = self.submit(name, task, **params)
+                break
+            except QueueFullError:
+                remaining = None if deadline is None else deadline - loop.time()
+                if remaining is not None and remaining <= 0:
+                    raise QueueFullError(f"No room in the browser queue after {queue_timeout}s")
+                try:
+                    await asyncio.wait_for(self._freed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass  # reported by the next round
+        return await self.wait(job)
+
+    async def wait(self, job: BrowserJob, timeout: Optional[float] = None) -> BrowserJob:
+        """
+        Waits until `job` is finished (or `timeout` seconds) and returns it.
+        """
+        done = self._done.get(job.id)
+        if done is not None:
+            try:
+                await asyncio.wait_for(done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    def _worker_started(self, job: BrowserJob, started: asyncio.Event):
+        self._queued.pop(job.id, None)
+        self._running += 1
+        started.set()
+
+    def _worker_finished(self):
+        self._running -= 1
+        self._freed.set()
+        self._freed = asyncio.Event()
+
+    async def _run(self, job: BrowserJob, task: BrowserTask, params: dict):
+        loop = asyncio.get_running_loop()
+        started = asyncio.Event()
+
+        def work():
+            loop.call_soon_threadsafe(self._worker_started, job, started)
+            try:
+                if job._cancelled.is_set():
+                    return None
+                with self.pool.session() as driver:
+                    self._drivers[job.id] = driver
+                    try:
+                        # Checked after publishing the driver: either this sees
+                        # the cancellation or the timeout handler sees the driver
+                        if job._cancelled.is_set():
+                            return None
+                        return task(driver, **params)
+                    finally:
+                        self._drivers.pop(job.id, None)
+            finally:
+                loop.call_soon_threadsafe(self._worker_finished)
+
+        waiter = asyncio.ensure_future(started.wait())
+        try:
+            # After close() the executor refuses the job (RuntimeError) or
+            # cancels it before it starts (CancelledError): both fail the job
+            future = loop.run_in_executor(self._executor, work)
+            await asyncio.wait({future, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            job.status, job.started_at, job.queue_position = "running", time.time(), None
+            try:
+                job.result = await asyncio.wait_for(asyncio.shield(future), self.job_timeout)
+                job.status = "done"
+            except asyncio.TimeoutError:
+                job.status, job.error = "timeout", f"Browser job took longer than {self.job_timeout}s"
+                job._cancelled.set()
+                driver = self._drivers.get(job.id)
+                if driver is not None:
+                    # Unblocks the worker thread; the pool then replaces the session
+                    loop.run_in_executor(None, driver.quit)
+        except asyncio.CancelledError:
+            job.status, job.error = "failed", "Browser job was cancelled"
+            if asyncio.current_task().cancelling():
+                raise  # this coroutine itself is being cancelled, not just the job
+        except Exception as e:
+            job.status, job.error = "failed", f"{type(e).__name__}: {e}"
+        finally:
+            waiter.cancel()
+            # Never started (the executor was shut down): not queued anymore either
+            self._queued.pop(job.id, None)
+            job.finished_at = time.time()
+            self._done.pop(job.id).set()
+
+    def _purge(self):
+        cutoff = time.time() - self.keep_finished
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def close(self):
+        self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_browser_jobs(request: Request) -> BrowserJobQueue:
+    """
+    FastAPI dependency returning the shared browser job queue.
+    """
+    jobs = getattr(request.app.state, "browser_jobs", None)
+    if jobs is None:
+        jobs = BrowserJobQueue(get_browser_pool(request))
+        request.app.state.browser_jobs = jobs
+    return jobs
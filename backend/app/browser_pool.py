@@ -0,0 +1,256 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from fastapi import Request
+
+from app import settings
+from app.selenium_runner import create_display, create_driver
+
+
+def process_tree_rss(pid: int) -> Optional[int]:
+    """
+    Resident memory in bytes of `pid` and all its descendants (chromedriver
+    plus every Chrome process it started). Linux only; None elsewhere.
+    """
+    try:
+        children: Dict[int, List[int]] = {}
+        rss: Dict[int, int] = {}
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # The command name may contain spaces, fields start after ')'
+                    fields = f.read().rsplit(")", 1)[1].split()
+            except OSError:
+                continue
+            children.setdefault(int(fields[1]), []).append(int(entry))
+            rss[int(entry)] = int(fields[21]) * page_size
+    except (OSError, ValueError, IndexError):
+        return None
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        total += rss.get(current, 0)
+        pending.extend(children.get(current, ()))
+    return total
+
+
+class BrowserSession:
+    """
+    A warm WebDriver plus what the pool needs to decide when to recycle it.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.started_at = time.monotonic()
+
+    def memory(self) -> Optional[int]:
+        service = getattr(self.driver, "service", None)
+        process = getattr(service, "process", None)
+        return process_tree_rss(process.pid) if process is not None else None
+
+    def alive(self) -> bool:
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def reset(self):
+        """
+        Leaves the browser as a fresh session would be: blank page, no
+        cookies, cache or storage, no selenium-wire interceptors or
+        captured requests.
+        """
+        driver = self.driver
+        for attribute in ("request_interceptor", "response_interceptor"):
+            if hasattr(driver, attribute):
+                delattr(driver, attribute)
+        if hasattr(driver, "requests"):
+            del driver.requests
+        if hasattr(driver, "scopes"):
+            driver.scopes = []
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+        driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": "*", "storageTypes": "all"})
+        driver.get("about:blank")
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            print(f"⚠️ Browser did not quit cleanly: {e}")
+
+
+class BrowserPool:
+    """
+    Up to `size` warm browser sessions, checked out one task at a time.
+
+    A session goes back to the pool after `reset()`. It is thrown away and
+    replaced instead when the task crashed it, after `max_uses` tasks, or
+    when Chrome uses more than `max_memory_mb`. All sessions share one
+    virtual display, started with the pool.
+
+    Selenium is blocking, so the pool is thread-safe and meant for sync
+    endpoints (run in FastAPI's thread pool) or `asyncio.to_thread`.
+    """
+
+    def __init__(
+        self,
+        size: int = settings.BROWSER_POOL_SIZE,
+        max_uses: int = settings.BROWSER_MAX_USES,
+        max_memory_mb: int = settings.BROWSER_MAX_MEMORY_MB,
+        checkout_timeout: float = settings.BROWSER_CHECKOUT_TIMEOUT,
+        driver_factory: Optional[Callable[[], object]] = None,
+        display_factory: Optional[Callable[[], object]] = None,
+    ):
+        self.size = size
+        self.max_uses = max_uses
+        self.max_memory = max_memory_mb * 1024 * 1024 if max_memory_mb > 0 else None
+        self.checkout_timeout = checkout_timeout
+        self._driver_factory = driver_factory or create_driver
+        self._display_factory = display_factory if display_factory is not None else create_display
+        self._display = None
+        self._idle: "queue.LifoQueue[BrowserSession]" = queue.LifoQueue()
+        # Sessions alive or being started, checked out or not
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.started = 0
+        self.recycled = 0
+
+    def _start_session(self) -> BrowserSession:
+        with self._lock:
+            if self._display is None and self._display_factory:
+                self._display = self._display_factory()
+        session = BrowserSession(self._driver_factory())
+        self.started += 1
+        return session
+
+    def warm(self):
+        """
+        Starts sessions until the pool is full (called at app startup, in
+        a background thread).
+        """
+        started = []
+        try:
+            while not self._closed and self._slots.acquire(blocking=False):
+                try:
+                    started.append(self._start_session())
+                except Exception:
+                    self._slots.release()
+                    raise
+        except Exception as e:
+            print(f"⚠️ Could not warm up the browser pool: {e}")
+        finally:
+            for session in started:
+                self._idle.put(session)
+        print(f"✅ Browser pool warm: {len(started)} sessions")
+
+    def start_warming(self) -> threading.Thread:
+        thread = threading.Thread(target=self.warm, name="browser-pool-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def _checkout(self, timeout: float) -> BrowserSession:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            if self._slots.acquire(blocking=False):
+                try:
+                    return self._start_session()
+                except Exception:
+                    self._slots.release()
+                    raise
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"No browser session free after {timeout}s")
+            try:
+                return self._idle.get(timeout=min(remaining, 0.5))
+            except queue.Empty:
+                continue
+
+    def _discard(self, session: BrowserSession):
+        session.quit()
+        self.recycled += 1
+        self._slots.release()
+
+    def _checkin(self, session: BrowserSession, crashed: bool):
+        session.uses += 1
+        if self._closed or crashed or session.uses >= self.max_uses:
+            self._discard(session)
+            return
+        if self.max_memory is not None:
+            memory = session.memory()
+            if memory is not None and memory > self.max_memory:
+                print(f"⚠️ Browser session uses {memory // (1024 * 1024)} MB, recycling it")
+                self._discard(session)
+                return
+        try:
+            session.reset()
+        except Exception:
+            self._discard(session)
+            return
+        self._idle.put(session)
+
+    @contextmanager
+    def session(self, timeout: Optional[float] = None) -> Iterator[object]:
+        """
+        Checks out a WebDriver for one task:
+
+            with pool.session() as driver:
+                driver.get(url)
+        """
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+        session = self._checkout(self.checkout_timeout if timeout is None else timeout)
+        crashed = False
+        try:
+            yield session.driver
+        except BaseException:
+            # A failed task may have been the browser dying under it
+            crashed = not session.alive()
+            raise
+        finally:
+            self._checkin(session, crashed)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "started": self.started,
+            "recycled": self.recycled,
+        }
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().quit()
+            except queue.Empty:
+                break
+        if self._display is not None:
+            self._display.stop()
+            self._display = None
+        print("✅ Browser pool stopped")
+
+
+def get_browser_pool(request: Request) -> BrowserPool:
+    """
+    FastAPI dependency returning the shared browser pool.
+    """
+    pool = getattr(request.app.state, "browser_pool", None)
+    if pool is None:
+        pool = BrowserPool()
+        request.app.state.browser_pool = pool
+    return pool
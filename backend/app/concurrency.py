@@ -0,0 +1,181 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, TypeVar
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class KeyedLimiter:
+    """
+    One semaphore per key (usually a host), created on demand and dropped
+    again once nobody is using it.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphores: Dict[Hashable, asyncio.Semaphore] = {}
+        self._users: Dict[Hashable, int] = {}
+
+    async def acquire(self, key: Hashable):
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = self._semaphores[key] = asyncio.Semaphore(self.limit)
+        self._users[key] = self._users.get(key, 0) + 1
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            self._forget(key)
+            raise
+
+    def release(self, key: Hashable):
+        self._semaphores[key].release()
+        self._forget(key)
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable):
+        await self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release(key)
+
+    def _forget(self, key: Hashable):
+        self._users[key] -= 1
+        if self._users[key] == 0:
+            del self._users[key]
+            del self._semaphores[key]
+
+    def __len__(self):
+        return len(self._semaphores)
+
+
+class TokenBucket:
+    """
+    Allows `rate` acquisitions per second on average, with bursts of up to
+    `burst`. Waiters reserve a token up front (the bucket may go into debt),
+    so they are served in arrival order without polling.
+    """
+
+    def __init__(self, rate: float, burst: float = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """
+        Takes a token; returns how many seconds to wait before using it.
+        """
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class KeyedRateLimiter:
+    """
+    One TokenBucket per key (usually a host), created on demand.
+    """
+
+    def __init__(self, rate: float, burst: float = 1):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[Hashable, TokenBucket] = {}
+
+    async def acquire(self, key: Hashable):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+        await bucket.acquire()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+async def run_bounded_chunks(
+    items: Iterable[T],
+    worker: Callable[[T], Awaitable[R]],
+    concurrency: int,
+    per_key_concurrency: Optional[int] = None,
+    key: Optional[Callable[[T], Hashable]] = None,
+) -> AsyncIterator[List[R]]:
+    """
+    Runs `worker` over `items` like `run_bounded`, but yields the results
+    in chunks: every result that completed since the previous chunk, in
+    input order. Lets the consumer process finished results as a batch
+    without holding any of them back.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = KeyedLimiter(per_key_concurrency) if per_key_concurrency and key else None
+
+    async def run(item: T) -> R:
+        if limiter is None:
+            async with semaphore:
+                return await worker(item)
+        async with limiter.hold(key(item)):
+            async with semaphore:
+                return await worker(item)
+
+    tasks = [asyncio.ensure_future(run(item)) for item in items]
+    order = {task: index for index, task in enumerate(tasks)}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            yield [task.result() for task in sorted(done, key=order.__getitem__)]
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def run_bounded(
+    items: Iterable[T],
+    worker: Callable[[T], Awaitable[R]],
+    concurrency: int,
+    per_key_concurrency: Optional[int] = None,
+    key: Optional[Callable[[T], Hashable]] = None,
+) -> AsyncIterator[R]:
+    """
+    Runs `worker` over `items` and yields results as soon as each completes.
+
+    At most `concurrency` workers run at once, and at most
+    `per_key_concurrency` for the same `key(item)`. The per-key slot is taken
+    first, so items waiting on a busy host don't hold a global slot.
+    Pending work is cancelled if the consumer stops iterating.
+    """
+    chunks = run_bounded_chunks(items, worker, concurrency, per_key_concurrency, key)
+    try:
+        async for chunk in chunks:
+            for result in chunk:
+                yield result
+    finally:
+        await chunks.aclose()
+
+
+def ndjson_response(results: AsyncIterator[BaseModel], include: Optional[set] = None) -> StreamingResponse:
+    """
+    Streams pydantic models as newline-delimited JSON, one object per line
+    (only the `include` fields, if given).
+    """
+
+    async def lines():
+        try:
+            async for result in results:
+                yield result.model_dump_json(include=include) + "\n"
+        finally:
+            # Client went away: stop the producer and its pending work too
+            if hasattr(results, "aclose"):
+                await results.aclose()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
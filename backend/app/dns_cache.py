@@ -0,0 +1,184 @@
+import asyncio
+import ipaddress
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+import httpcore
+from fastapi import Request
+
+from app import settings
+from app.timing import record_dns
+
+# Lookups that are cached as negative answers; timeouts are never cached
+NEGATIVE_ERRORS = (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer)
+
+
+class CachingResolver:
+    """
+    Non-blocking DNS resolver with an in-process, TTL-aware LRU cache.
+
+    - Positive answers are kept for the record TTL (clamped to min/max TTL).
+    - NXDOMAIN and NoAnswer are cached for `negative_ttl` seconds.
+    - Concurrent lookups of the same name share a single query.
+    """
+
+    def __init__(
+        self,
+        max_size: int = settings.DNS_CACHE_SIZE,
+        negative_ttl: float = settings.DNS_NEGATIVE_TTL,
+        min_ttl: float = settings.DNS_MIN_TTL,
+        max_ttl: float = settings.DNS_MAX_TTL,
+        resolver: Optional[dns.asyncresolver.Resolver] = None,
+    ):
+        self.max_size = max_size
+        self.negative_ttl = negative_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        if resolver is None:
+            resolver = dns.asyncresolver.Resolver()
+            resolver.lifetime = settings.DNS_TIMEOUT
+        self._resolver = resolver
+        # (host, rdtype) -> (expires_at, addresses or negative exception class)
+        self._cache: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()
+        self._pending: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._cache),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def clear(self):
+        self._cache.clear()
+
+    async def resolve(self, host: str, rdtype: str = "A") -> List[str]:
+        """
+        Returns the addresses for `host`. Raises the same dns.resolver
+        exceptions as dnspython (NXDOMAIN, NoAnswer, Timeout, ...).
+        """
+        started = time.perf_counter()
+        try:
+            return await self._resolve((host.lower().rstrip("."), rdtype))
+        finally:
+            record_dns(time.perf_counter() - started)
+
+    async def _resolve(self, key: Tuple[str, str]) -> List[str]:
+        entry = self._cache.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._cache.move_to_end(key)
+                self.hits += 1
+                if isinstance(value, type):
+                    raise value()
+                return list(value)
+            del self._cache[key]
+
+        self.misses += 1
+
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._query(key))
+            self._pending[key] = task
+            task.add_done_callback(lambda t: self._query_done(key, t))
+        # Shielded so one cancelled caller doesn't cancel the lookup for everyone
+        return list(await asyncio.shield(task))
+
+    def _query_done(self, key, task: asyncio.Task):
+        self._pending.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every caller went away
+
+    async def _query(self, key: Tuple[str, str]) -> List[str]:
+        host, rdtype = key
+        try:
+            answer = await self._resolver.resolve(host, rdtype)
+        except NEGATIVE_ERRORS as exc:
+            self._store(key, self.negative_ttl, type(exc))
+            raise
+
+        addresses = [rdata.to_text() for rdata in answer]
+        ttl = min(max(answer.rrset.ttl, self.min_ttl), self.max_ttl)
+        self._store(key, ttl, tuple(addresses))
+        return addresses
+
+    def _store(self, key, ttl: float, value):
+        if ttl <= 0:
+            return
+        self._cache[key] = (time.monotonic() + ttl, value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    async def resolve_host(self, host: str) -> List[str]:
+        """
+        Addresses to connect to: A records, falling back to AAAA.
+        """
+        try:
+            return await self.resolve(host, "A")
+        except dns.resolver.NoAnswer:
+            return await self.resolve(host, "AAAA")
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+class CachedDNSNetworkBackend(httpcore.AsyncNetworkBackend):
+    """
+    httpcore network backend that resolves names through CachingResolver,
+    so the HTTP fetch reuses the lookup done by the DNS check.
+
+    Only the TCP connect goes to the IP address; TLS still uses the original
+    hostname for SNI and certificate checks.
+    """
+
+    def __init__(self, resolver: CachingResolver, backend: Optional[httpcore.AsyncNetworkBackend] = None):
+        self._resolver = resolver
+        self._backend = backend or httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        if _is_ip(host) or host == "localhost":
+            return await self._backend.connect_tcp(host, port, timeout, local_address, socket_options)
+
+        try:
+            addresses = await self._resolver.resolve_host(host)
+        except dns.exception.DNSException as exc:
+            raise httpcore.ConnectError(f"DNS lookup failed for {host}: {exc}") from exc
+
+        last_exc = None
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as exc:
+                last_exc = exc
+        raise last_exc or httpcore.ConnectError(f"No addresses found for {host}")
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds):
+        await self._backend.sleep(seconds)
+
+
+def get_dns_resolver(request: Request) -> CachingResolver:
+    """
+    FastAPI dependency returning the shared resolver created in the app lifespan.
+    """
+    resolver = getattr(request.app.state, "dns_resolver", None)
+    if resolver is None:
+        resolver = CachingResolver()
+        request.app.state.dns_resolver = resolver
+    return resolver
@@ -0,0 +1,246 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ConfigDict, Field, HttpUrl, field_validator, model_validator
+from typing import Any, Callable, Dict, NamedTuple, Optional, Type
+
+from app import settings
+from app.browser_jobs import BrowserJob, BrowserJobQueue, QueueClosedError, QueueFullError, get_browser_jobs
+from app.page_performance import PagePerformance
+from app.private_hosts import PrivateHostError, check_host, ensure_public_url
+from app.selenium_runner import measure_page, render_page, run_selenium
+
+router = APIRouter(
+    prefix="",
+    tags=["Browser"]
+)
+
+# ✅ Only public http(s) pages go to the browser: its results (the HTML)
+# come back to the caller, so local files and internal hosts must not be reachable.
+# This catches local names and IP literals; host names are resolved before
+# queueing (ensure_public_url) and every browser request goes through HostGuard
+def public_page_url(url: HttpUrl) -> HttpUrl:
+    if not settings.BROWSER_ALLOW_PRIVATE_HOSTS:
+        check_host(url.host or "")
+    return url
+
+# ✅ Parameters of each task; unknown keys are refused
+class GoogleSearchParams(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+class RenderParams(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    url: HttpUrl = Field(..., json_schema_extra={"example": "https://example.com"})
+    wait: str = Field(
+        settings.RENDER_WAIT,
+        min_length=1,
+        max_length=500,
+        description='Readiness: "load", "networkidle" or a CSS selector to wait for.'
+    )
+    timeout: float = Field(settings.RENDER_TIMEOUT, gt=0, le=settings.BROWSER_JOB_TIMEOUT)
+    block: bool = True
+
+    @field_validator('url')
+    def public_url(cls, url):
+        return public_page_url(url)
+
+# ✅ Input model for performance capture (also the params of the "performance" task)
+class PerformanceInput(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    url: HttpUrl = Field(..., json_schema_extra={"example": "https://example.com"})
+    wait: str = Field(
+        settings.RENDER_WAIT,
+        min_length=1,
+        max_length=500,
+        description='Readiness: "load", "networkidle" or a CSS selector to wait for.'
+    )
+    settle_ms: int = Field(
+        settings.PERFORMANCE_SETTLE_MS,
+        ge=0,
+        le=10000,
+        description="Milliseconds to keep observing after readiness, for late LCP and layout shifts."
+    )
+
+    @field_validator('url')
+    def public_url(cls, url):
+        return public_page_url(url)
+
+class BrowserTaskSpec(NamedTuple):
+    run: Callable[..., Any]  # task(driver, **params)
+    params: Type[BaseModel]
+
+# ✅ Tasks that can be queued, by name
+BROWSER_TASKS: Dict[str, BrowserTaskSpec] = {
+    "google_search": BrowserTaskSpec(run_selenium, GoogleSearchParams),
+    "render": BrowserTaskSpec(render_page, RenderParams),
+    "performance": BrowserTaskSpec(measure_page, PerformanceInput),
+}
+
+# ✅ Input model
+class BrowserJobInput(BaseModel):
+    task: str = Field(..., json_schema_extra={"example": "google_search"})
+    params: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Parameters of the task, checked against its model (e.g. `url` for render and performance)."
+    )
+    wait: float = Field(
+        0,
+        ge=0,
+        le=settings.BROWSER_JOB_TIMEOUT,
+        description="Seconds to wait for the job to finish before answering; 0 returns right away."
+    )
+
+    @field_validator('task')
+    def known_task(cls, task):
+        if task not in BROWSER_TASKS:
+            raise ValueError(f"Unknown task {task!r}, expected one of: {', '.join(BROWSER_TASKS)}")
+        return task
+
+    @model_validator(mode='after')
+    def valid_params(self):
+        # Validated values (URLs as strings) are what the task gets
+        self.params = BROWSER_TASKS[self.task].params.model_validate(self.params).model_dump(mode="json")
+        return self
+
+class BrowserQueueStatus(BaseModel):
+    workers: int
+    running: int
+    queued: int
+    max_queued: int
+    pool: Dict[str, int]
+
+# ✅ Queue errors as HTTP errors, so clients can back off
+def queue_error_response(error: Exception) -> JSONResponse:
+    if isinstance(error, QueueFullError):
+        return JSONResponse(
+            status_code=429,
+            content={"detail": f"Browser queue is full: {error}"},
+            headers={"Retry-After": str(settings.BROWSER_QUEUE_RETRY_AFTER)}
+        )
+    return JSONResponse(status_code=503, content={"detail": str(error)})
+
+async def submit_job(jobs: BrowserJobQueue, task: str, params: Dict[str, Any], wait: float):
+    try:
+        if "url" in params:
+            # ✅ Host names that resolve to internal addresses are refused before queueing
+            await ensure_public_url(params["url"])
+        job = jobs.submit(task, BROWSER_TASKS[task].run, **params)
+    except PrivateHostError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    except (QueueFullError, QueueClosedError) as e:
+        return queue_error_response(e)
+    if wait:
+        await jobs.wait(job, timeout=wait)
+    return job
+
+
+@router.post(
+    "/jobs",
+    summary="Queue a browser task",
+    response_description="The job, to poll with GET /browser/jobs/{id} until it is finished.",
+    response_model=BrowserJob,
+    status_code=202,
+    responses={
+        400: {"description": "The URL resolves to a private address"},
+        429: {"description": "Queue full, retry after Retry-After seconds"},
+        503: {"description": "Queue shut down"}
+    }
+)
+async def create_job(data: BrowserJobInput, jobs: BrowserJobQueue = Depends(get_browser_jobs)):
+    """
+    **Overview:**
+
+    Browser tasks run on a fixed number of browser workers, each with a warm
+    Chrome session from the pool, and never on the API's own threads.
+
+    - 📥 **Queue:** jobs wait in a bounded queue; when it is full the answer is
+      `429` with `Retry-After`, so heavy browser load slows browser jobs down
+      instead of the whole API.
+    - ⏱️ **Timeout:** a running job is stopped after `BROWSER_JOB_TIMEOUT` seconds
+      (status `timeout`) and its browser is replaced.
+    - 🔁 **Polling:** `GET /browser/jobs/{id}` returns `status`
+      (`queued`/`running`/`done`/`failed`/`timeout`), `queue_position` and `result`.
+      Set `wait` to get the finished job directly when it is quick.
+
+    **Example request:**
+
+    ```json
+    {
+        "task": "google_search",
+        "wait": 20
+    }
+    ```
+    """
+    return await submit_job(jobs, data.task, data.params, data.wait)
+
+
+@router.get(
+    "/jobs/{job_id}",
+    summary="Status and result of a browser job",
+    response_model=BrowserJob,
+    responses={404: {"description": "Unknown or expired job"}}
+)
+async def get_job(job_id: str, jobs: BrowserJobQueue = Depends(get_browser_jobs)):
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"detail": "Unknown or expired job"})
+    return job
+
+
+@router.get(
+    "/status",
+    summary="Browser queue and pool load",
+    response_model=BrowserQueueStatus
+)
+async def queue_status(jobs: BrowserJobQueue = Depends(get_browser_jobs)):
+    return BrowserQueueStatus(**jobs.stats(), pool=jobs.pool.stats())
+
+
+@router.post(
+    "/performance",
+    summary="Page speed metrics from a real browser load",
+    response_model=PagePerformance,
+    responses={
+        400: {"description": "The URL resolves to a private address"},
+        429: {"description": "Queue full, retry after Retry-After seconds"},
+        502: {"description": "The browser failed to load the page"},
+        503: {"description": "Queue shut down"},
+        504: {"description": "The load took longer than BROWSER_JOB_TIMEOUT"}
+    }
+)
+async def page_performance(data: PerformanceInput, jobs: BrowserJobQueue = Depends(get_browser_jobs)):
+    """
+    **Overview:**
+
+    Loads the URL cold (no cache, no cookies) in a warm pooled Chrome and
+    returns what the browser measured:
+
+    - ⏱️ **Navigation Timing:** redirect, DNS, connect, TLS, TTFB, download,
+      DOM interactive, DOMContentLoaded and load, in ms.
+    - 🎨 **Paint:** first paint, first contentful paint, largest contentful
+      paint (and its element), cumulative layout shift.
+    - 📦 **Weight:** request count and transferred bytes (as seen by the
+      browser proxy), plus Resource Timing grouped by type.
+
+    Runs as a browser job (`performance` task), so it queues with the other
+    browser work and gets `429` when the queue is full.
+
+    **Example request:**
+
+    ```json
+    {
+        "url": "https://example.com",
+        "wait": "networkidle"
+    }
+    ```
+    """
+    job = await submit_job(jobs, "performance", data.model_dump(mode="json"), 0)
+    if isinstance(job, JSONResponse):
+        return job
+    await jobs.wait(job)
+    if job.status == "timeout":
+        return JSONResponse(status_code=504, content={"detail": job.error})
+    if job.status != "done":
+        return JSONResponse(status_code=502, content={"detail": job.error})
+    return job.result
@@ -1,10 +1,19 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, field_validator, Field
 from typing import Optional, List
 import httpx
+import dns.exception
 import dns.resolver
 import time
 
+from app import settings
+from app.concurrency import ndjson_response, run_bounded
+from app.dns_cache import CachingResolver, get_dns_resolver
+from app.http_client import TIMEOUTS, get_http_client
+from app.redirects import RedirectHop, RedirectResolver, get_redirect_resolver
+from app.timing import RequestTimer, RequestTimings
+
 router = APIRouter(
     prefix="",
     tags=["Domain Checker"]
@@ -23,6 +32,30 @@ class DomainInput(BaseModel):
             domain = 'https://' + domain
         return domain
 
+class DomainsInput(BaseModel):
+    domains: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.BULK_MAX_ITEMS,
+        description="Domains or full URLs to check. Each one is normalized like `DomainInput.domain`.",
+        json_schema_extra={"example": ["test.com", "https://example.com"]}
+    )
+    concurrency: int = Field(
+        settings.BULK_CONCURRENCY,
+        ge=1,
+        le=settings.BULK_MAX_CONCURRENCY,
+        description="How many domains are checked at the same time."
+    )
+    per_host_concurrency: int = Field(
+        settings.BULK_PER_HOST_CONCURRENCY,
+        ge=1,
+        description="How many checks may hit the same host at the same time."
+    )
+
+    @field_validator('domains')
+    def normalize_domains(cls, domains):
+        return [DomainInput(domain=domain).domain for domain in domains]
+
 class DomainCheckResponse(BaseModel):
     fixed_domain: str
     dns_status: str
@@ -31,62 +64,47 @@ class DomainCheckResponse(BaseModel):
     redirected: Optional[bool]
     final_url: Optional[str]
     redirect_chain: List[str]
+    redirect_hops: List[RedirectHop] = Field(default_factory=list)
     response_time: Optional[float]
+    timings: Optional[RequestTimings] = None
     message: str
 
-@router.post(
-    "/check-domain",
-    summary="Check domain status",
-    response_description="Detailed result of DNS and HTTP status for the provided domain.",
-    response_model=DomainCheckResponse
-)
-async def check_domain(data: DomainInput):
+def host_of(domain: str) -> str:
     """
-    **Overview:**
-
-    This endpoint checks the status of a given domain or URL. It performs:
-
-    - 🛜 **DNS lookup:** Validates if the domain has a valid A record.
-    - 🌐 **HTTP request:** Sends an HTTP GET request to see if the website responds.
-    - 🔄 **Redirect tracking:** Detects if there are any HTTP redirects and provides the full redirect chain.
-    - ⚡ **Response timing:** Measures how long the HTTP request takes.
-
-    **Returns:**
-
-    - `fixed_domain`: The input domain with `https://` prepended if missing.
-    - `dns_status`: Status of the DNS query (e.g., `ok`, `NXDOMAIN`, `DNS timeout`, `No A record`).
-    - `http_status`: HTTP status code from the website (e.g., 200, 404, etc.).
-    - `is_live`: `true` if the site returned a 200 OK response.
-    - `redirected`: `true` if the request was redirected.
-    - `final_url`: The final URL after all redirects.
-    - `redirect_chain`: List of URLs that were followed during redirects.
-    - `response_time`: Time taken (in seconds) for the HTTP request to complete.
-    - `message`: Human-readable status message.
+    Strips the scheme and trailing slash from a normalized domain.
+    """
+    return domain.replace('https://', '').replace('http://', '').rstrip('/')
 
-    **Example request:**
 
-    ```json
-    {
-        "domain": "test.com"
-    }
-    ```
+async def run_domain_check(
+    domain: str,
+    client: httpx.AsyncClient,
+    resolver: CachingResolver,
+    redirects: RedirectResolver,
+) -> DomainCheckResponse:
+    """
+    DNS + HTTP check for one normalized domain, shared by the single and bulk endpoints.
     """
-    host_only = data.domain.replace('https://', '').replace('http://', '').rstrip('/')
+    host_only = host_of(domain)
+    timer = RequestTimer()
 
     # 1️⃣ DNS check
     dns_status = "ok"
     try:
-        dns.resolver.resolve(host_only, 'A')
+        with timer:
+            await resolver.resolve(host_only, 'A')
     except dns.resolver.NXDOMAIN:
         dns_status = "NXDOMAIN"
     except dns.resolver.Timeout:
         dns_status = "DNS timeout"
     except dns.resolver.NoAnswer:
         dns_status = "No A record"
+    except dns.exception.DNSException:
+        dns_status = "DNS error"
 
     if dns_status != "ok":
         return DomainCheckResponse(
-            fixed_domain=data.domain,
+            fixed_domain=domain,
             dns_status=dns_status,
             http_status=None,
             is_live=False,
@@ -94,26 +112,32 @@ async def check_domain(data: DomainInput):
             final_url=None,
             redirect_chain=[],
             response_time=None,
+            timings=timer.summary(),
             message=f"DNS issue: {dns_status}"
         )
 
     # 2️⃣ HTTP check
     try:
-        async with httpx.AsyncClient(timeout=5.0, follow_redirects=True) as client:
+        with timer:
             start_time = time.perf_counter()
-            response = await client.get(data.domain)
+            result = await redirects.fetch(
+                client,
+                domain,
+                timeout=TIMEOUTS["domain"],
+                extensions={"trace": timer.trace}
+            )
             end_time = time.perf_counter()
 
-            status = response.status_code
-            is_live = response.status_code == 200
-            redirected = len(response.history) > 0
-            final_url = str(response.url)
-            redirect_chain = [str(r.url) for r in response.history]
-            response_time = round(end_time - start_time, 3)  # in seconds
+        status = result.status_code
+        is_live = status == 200
+        redirected = len(result.hops) > 0
+        final_url = result.final_url
+        redirect_chain = [hop.url for hop in result.hops]
+        response_time = round(end_time - start_time, 3)  # in seconds
 
     except httpx.RequestError as exc:
         return DomainCheckResponse(
-            fixed_domain=data.domain,
+            fixed_domain=domain,
             dns_status=dns_status,
             http_status=None,
             is_live=False,
@@ -121,11 +145,21 @@ async def check_domain(data: DomainInput):
             final_url=None,
             redirect_chain=[],
             response_time=None,
+            timings=timer.summary(),
             message=f"Connection error: {exc}"
         )
 
+    if result.stopped == "loop":
+        message = f"Redirect loop detected after {len(result.hops)} hops"
+    elif result.stopped == "max_redirects":
+        message = f"Stopped after {len(result.hops)} redirects"
+    elif is_live:
+        message = "Domain is live and responded with 200"
+    else:
+        message = f"Site returned status {status}"
+
     return DomainCheckResponse(
-        fixed_domain=data.domain,
+        fixed_domain=domain,
         dns_status=dns_status,
         http_status=status,
         is_live=is_live,
@@ -133,8 +167,100 @@ async def check_domain(data: DomainInput):
         final_url=final_url,
         redirect_chain=redirect_chain,
         response_time=response_time,
-        message=(
-            "Domain is live and responded with 200"
-            if is_live else f"Site returned status {status}"
-        )
+        redirect_hops=result.hops,
+        timings=timer.summary(result.responses),
+        message=message
+    )
+
+
+@router.post(
+    "/check-domain",
+    summary="Check domain status",
+    response_description="Detailed result of DNS and HTTP status for the provided domain.",
+    response_model=DomainCheckResponse
+)
+async def check_domain(
+    data: DomainInput,
+    client: httpx.AsyncClient = Depends(get_http_client),
+    resolver: CachingResolver = Depends(get_dns_resolver),
+    redirects: RedirectResolver = Depends(get_redirect_resolver),
+):
+    """
+    **Overview:**
+
+    This endpoint checks the status of a given domain or URL. It performs:
+
+    - 🛜 **DNS lookup:** Validates if the domain has a valid A record.
+    - 🌐 **HTTP request:** Sends an HTTP GET request to see if the website responds.
+    - 🔄 **Redirect tracking:** Follows redirects hop by hop (without downloading redirect bodies),
+      stops on loops or after `MAX_REDIRECTS`, and caches hops so shared chains resolve once.
+    - ⚡ **Response timing:** Measures how long the HTTP request takes, split into DNS, connect, TLS, TTFB and download.
+
+    **Returns:**
+
+    - `fixed_domain`: The input domain with `https://` prepended if missing.
+    - `dns_status`: Status of the DNS query (e.g., `ok`, `NXDOMAIN`, `DNS timeout`, `No A record`).
+    - `http_status`: HTTP status code from the website (e.g., 200, 404, etc.).
+    - `is_live`: `true` if the site returned a 200 OK response.
+    - `redirected`: `true` if the request was redirected.
+    - `final_url`: The final URL after all redirects.
+    - `redirect_chain`: List of URLs that were followed during redirects.
+    - `redirect_hops`: Status, Location and latency of every redirect hop (`cached` if it came from the hop cache).
+    - `response_time`: Time taken (in seconds) for the HTTP request to complete.
+    - `timings`: Per-phase breakdown (dns, connect, tls, send, ttfb, download) in seconds,
+      summed over all hops, with `hops` holding the breakdown of each redirect hop.
+    - `message`: Human-readable status message.
+
+    **Example request:**
+
+    ```json
+    {
+        "domain": "test.com"
+    }
+    ```
+    """
+    return await run_domain_check(data.domain, client, resolver, redirects)
+
+
+@router.post(
+    "/check-domains",
+    summary="Check many domains and stream the results",
+    response_description="NDJSON stream with one DomainCheckResponse per line, in completion order.",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}}
+)
+async def check_domains(
+    data: DomainsInput,
+    client: httpx.AsyncClient = Depends(get_http_client),
+    resolver: CachingResolver = Depends(get_dns_resolver),
+    redirects: RedirectResolver = Depends(get_redirect_resolver),
+):
+    """
+    **Overview:**
+
+    Bulk version of `/check-domain`. Runs the same DNS and HTTP checks for every
+    domain and streams each result as soon as it is ready.
+
+    - 🚦 **Concurrency:** at most `concurrency` checks run at once, and at most
+      `per_host_concurrency` against the same host.
+    - 📤 **Streaming:** the response is NDJSON (`application/x-ndjson`), one
+      `DomainCheckResponse` per line. Lines arrive in completion order, use
+      `fixed_domain` to match them to the input.
+
+    **Example request:**
+
+    ```json
+    {
+        "domains": ["test.com", "example.com"],
+        "concurrency": 50
+    }
+    ```
+    """
+    results = run_bounded(
+        data.domains,
+        lambda domain: run_domain_check(domain, client, resolver, redirects),
+        concurrency=data.concurrency,
+        per_key_concurrency=data.per_host_concurrency,
+        key=lambda domain: host_of(domain).lower(),
     )
+    return ndjson_response(results)
@@ -1,10 +1,29 @@
-from fastapi import APIRouter
-from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import AsyncIterator, Dict, Optional, List, Tuple
+from datetime import datetime, timezone
+import asyncio
 import httpx
 import xml.etree.ElementTree as ET
-import gzip
-from io import BytesIO
+
+from app import settings
+from app.concurrency import ndjson_response
+from app.http_client import TIMEOUTS, get_http_client
+from app.result_cache import ResultCache, get_sitemap_results
+from app.robots import RobotsCache, RobotsRule, get_robots_cache, robots_origin, url_path
+from app.sitemap_cache import SitemapDiskCache, get_sitemap_cache, open_sitemap_cached, read_sitemap_cached
+from app.sitemap_crawl import SitemapCrawl, SitemapFileResult
+from app.sitemap_snapshot import Snapshot, SnapshotStore, diff_snapshots, get_snapshot_store
+from app.sitemap_stream import (
+    ParsedSitemap,
+    SitemapEntry,
+    SitemapDecompressionError,
+    UnsupportedSitemapError,
+    describe_error,
+    open_sitemap,
+)
+from app.sitemap_validation import SitemapValidation, SitemapValidator, read_sitemap_validated
+from app.status_sweep import LatencyStats, StatusResult, StatusSweep
 
 router = APIRouter(
     prefix="",
@@ -12,7 +31,42 @@ router = APIRouter(
 )
 
 
-class SitemapCheckInput(BaseModel):
+class SitemapPageInput(BaseModel):
+    limit: Optional[int] = Field(
+        None,
+        ge=1,
+        le=settings.SITEMAP_PAGE_MAX_LIMIT,
+        description="Return at most this many URLs (or sitemap files). Enables pagination."
+    )
+    offset: int = Field(
+        0,
+        ge=0,
+        description="Index of the first URL to return. Ignored when `cursor` is given."
+    )
+    cursor: Optional[str] = Field(
+        None,
+        pattern=r"^[\w-]+:\d+$",
+        description="`next_cursor` from the previous page."
+    )
+    validation: bool = Field(
+        False,
+        description="Also check the file against the sitemaps.org protocol (limits, duplicates, hosts, escaping, lastmod)."
+    )
+
+    @property
+    def paginated(self) -> bool:
+        return self.limit is not None or self.cursor is not None or self.offset > 0
+
+    @property
+    def cursor_snapshot(self) -> Optional[str]:
+        return self.cursor.rsplit(':', 1)[0] if self.cursor else None
+
+    @property
+    def start(self) -> int:
+        return int(self.cursor.rsplit(':', 1)[1]) if self.cursor else self.offset
+
+
+class SitemapCheckInput(SitemapPageInput):
     domain: str = Field(
         ...,
         description="The domain or full URL to check sitemap.xml for. If missing scheme, 'https://' will be added automatically.",
@@ -29,13 +83,229 @@ class SitemapCheckInput(BaseModel):
             return 'https://' + v
         return v
 
+    discover: bool = Field(
+        True,
+        description="Use the first `Sitemap:` line of robots.txt when there is one, instead of /sitemap.xml."
+    )
+
 
-class SitemapFetchInput(BaseModel):
+class SitemapFetchInput(SitemapPageInput):
     sitemap_url: str = Field(
         ...,
         description="Full URL of the sitemap to fetch and parse.",
         json_schema_extra={"example": "https://example.com/sitemap1.xml.gz"}
     )
+    stream: bool = Field(
+        False,
+        description="Stream URLs as NDJSON while the file is parsed instead of returning one JSON object."
+    )
+
+    @model_validator(mode='after')
+    def stream_without_pages(self):
+        if self.stream and self.paginated:
+            raise ValueError("`stream` can't be combined with `limit`, `offset` or `cursor`.")
+        return self
+
+
+class SitemapValidateInput(BaseModel):
+    sitemap_url: str = Field(
+        ...,
+        description="Full URL of the sitemap file to validate.",
+        json_schema_extra={"example": "https://example.com/sitemap.xml"}
+    )
+
+
+class SitemapRobotsInput(BaseModel):
+    sitemap_url: str = Field(
+        ...,
+        description="Full URL of the sitemap whose URLs are checked against robots.txt.",
+        json_schema_extra={"example": "https://example.com/sitemap.xml"}
+    )
+    user_agent: str = Field(
+        settings.ROBOTS_USER_AGENT,
+        description="User-agent whose robots.txt group applies (e.g. 'Googlebot'); '*' for the default group."
+    )
+    max_listed: int = Field(
+        settings.ROBOTS_MAX_LISTED,
+        ge=0,
+        description="At most this many blocked URLs are listed; `blocked_count` always covers everything."
+    )
+
+
+class RobotsFile(BaseModel):
+    robots_url: str
+    robots_status: str  # "ok" / "unavailable" (allow all) / "unreachable" (disallow all)
+    http_status: Optional[int]
+    rule_count: int  # Allow/Disallow rules that apply to the user-agent
+
+
+class BlockedURL(BaseModel):
+    url: str
+    rule: RobotsRule
+
+
+class SitemapRobotsResponse(BaseModel):
+    sitemap_url: str
+    sitemap_status: str
+    http_status: Optional[int]
+    user_agent: str
+    sitemap_allowed: Optional[bool] = None  # whether the sitemap file itself may be crawled
+    robots_files: List[RobotsFile] = Field(default_factory=list)
+    total_urls: int = 0
+    blocked_count: int = 0
+    skipped_count: int = 0  # <loc> values that aren't (valid) http(s) URLs
+    blocked: List[BlockedURL] = Field(default_factory=list)
+    message: str
+
+
+class SitemapSweepInput(BaseModel):
+    sitemap_url: str = Field(
+        ...,
+        description="Full URL of the sitemap file whose URLs are checked.",
+        json_schema_extra={"example": "https://example.com/sitemap.xml"}
+    )
+    concurrency: int = Field(
+        settings.SWEEP_CONCURRENCY,
+        ge=1,
+        le=settings.BULK_MAX_CONCURRENCY,
+        description="How many URLs are checked at the same time, over all hosts."
+    )
+    host_rate: float = Field(
+        settings.SWEEP_HOST_RATE,
+        gt=0,
+        description="Requests per second allowed per host."
+    )
+    host_burst: int = Field(
+        settings.SWEEP_HOST_BURST,
+        ge=1,
+        description="Requests a host may get at once before `host_rate` applies."
+    )
+    max_listed: int = Field(
+        settings.SWEEP_MAX_LISTED,
+        ge=0,
+        description="At most this many URLs are listed per status class; the counts always cover everything."
+    )
+    stream: bool = Field(
+        False,
+        description="Stream every non-2xx result as an NDJSON line while the sweep runs, then the summary."
+    )
+
+
+class SitemapSweepResponse(BaseModel):
+    sitemap_url: str
+    sitemap_status: str
+    http_status: Optional[int]
+    kind: Optional[str] = None
+    total_urls: int = 0  # URLs checked
+    skipped_count: int = 0  # <loc> values that aren't http(s) URLs
+    counts: Dict[str, int] = Field(default_factory=dict)  # "2xx" / "3xx" / "4xx" / "5xx" / "error"
+    redirects: List[StatusResult] = Field(default_factory=list)  # 3xx, with their Location
+    client_errors: List[StatusResult] = Field(default_factory=list)  # 4xx
+    server_errors: List[StatusResult] = Field(default_factory=list)  # 5xx
+    failed: List[StatusResult] = Field(default_factory=list)  # no response (timeout, DNS, ...)
+    latency: LatencyStats = Field(default_factory=LatencyStats)
+    message: str
+
+
+class SitemapValidationResponse(BaseModel):
+    sitemap_url: str
+    sitemap_status: str
+    http_status: Optional[int]
+    kind: Optional[str] = None
+    validation: Optional[SitemapValidation] = None
+    message: str
+
+
+class SitemapEntryItem(BaseModel):
+    loc: str
+    lastmod: Optional[str] = None
+    changefreq: Optional[str] = None
+    priority: Optional[float] = None
+    images: List[str] = Field(default_factory=list)
+    alternates: List[Tuple[Optional[str], str]] = Field(default_factory=list)  # (hreflang, href)
+
+
+class SitemapEntryColumns(BaseModel):
+    """
+    Column-oriented entries: row i is (loc[i], lastmod[i], ...). `images` and
+    `alternates` are null for rows that have none.
+    """
+    loc: List[str] = Field(default_factory=list)
+    lastmod: List[Optional[str]] = Field(default_factory=list)
+    changefreq: List[Optional[str]] = Field(default_factory=list)
+    priority: List[Optional[float]] = Field(default_factory=list)
+    images: List[Optional[List[str]]] = Field(default_factory=list)
+    alternates: List[Optional[List[Tuple[Optional[str], str]]]] = Field(default_factory=list)
+
+    def append(self, entry: SitemapEntry):
+        self.loc.append(entry.loc)
+        self.lastmod.append(entry.lastmod)
+        self.changefreq.append(entry.changefreq)
+        self.priority.append(entry.priority)
+        self.images.append(list(entry.images) or None)
+        self.alternates.append(list(entry.alternates) or None)
+
+
+class SitemapEntriesResponse(BaseModel):
+    sitemap_url: str
+    sitemap_status: str
+    http_status: Optional[int]
+    kind: Optional[str] = None  # 'urlset' or 'sitemapindex'
+    total_count: int = 0  # entries returned
+    filtered_count: int = 0  # entries dropped by `modified_since`
+    columns: Optional[SitemapEntryColumns] = None  # None in stream mode
+    message: str
+
+
+class SitemapTreeInput(BaseModel):
+    sitemap_url: str = Field(
+        ...,
+        description="Full URL of the sitemap or sitemap index to expand.",
+        json_schema_extra={"example": "https://example.com/sitemap.xml"}
+    )
+    max_depth: int = Field(
+        settings.SITEMAP_CRAWL_MAX_DEPTH,
+        ge=0,
+        description="How many levels of nested <sitemapindex> files to follow (0 = only the given file)."
+    )
+    max_files: int = Field(
+        settings.SITEMAP_CRAWL_MAX_FILES,
+        ge=1,
+        description="Upper bound on the number of sitemap files fetched."
+    )
+    concurrency: int = Field(
+        settings.SITEMAP_CRAWL_CONCURRENCY,
+        ge=1,
+        le=settings.BULK_MAX_CONCURRENCY,
+        description="How many sitemap files are fetched at the same time."
+    )
+
+
+class SitemapCrawlInput(SitemapTreeInput):
+    include_urls: bool = Field(
+        True,
+        description="Return the deduplicated URL list. Set to false to get only per-file counts."
+    )
+
+
+class SitemapEntriesInput(BaseModel):
+    sitemap_url: str = Field(
+        ...,
+        description="Full URL of the sitemap to fetch and parse.",
+        json_schema_extra={"example": "https://example.com/sitemap1.xml.gz"}
+    )
+    modified_since: Optional[datetime] = Field(
+        None,
+        description="Only return entries whose <lastmod> is at or after this time (UTC if no timezone given)."
+    )
+    keep_undated: bool = Field(
+        True,
+        description="With `modified_since`: keep entries that have no (valid) <lastmod>."
+    )
+    stream: bool = Field(
+        False,
+        description="Stream one entry per NDJSON line instead of returning columns."
+    )
 
 
 class SitemapCheckResponse(BaseModel):
@@ -44,6 +314,12 @@ class SitemapCheckResponse(BaseModel):
     http_status: Optional[int]
     sitemap_files: List[str] = Field(default_factory=list)
     urls: List[str] = Field(default_factory=list)  # 👈 додаємо для <urlset>
+    total_count: Optional[int] = None  # size of the whole list, urls/sitemap_files may be one page of it
+    next_cursor: Optional[str] = None
+    cache_status: Optional[str] = None  # "hit" (304, stored list used) / "miss"
+    validation: Optional[SitemapValidation] = None
+    sitemap_source: str = "default"  # "robots.txt" when discovered from a Sitemap: line
+    robots_sitemaps: List[str] = Field(default_factory=list)  # every Sitemap: line of robots.txt
     message: str
 
 
@@ -52,81 +328,322 @@ class SitemapURLsResponse(BaseModel):
     sitemap_status: str
     http_status: Optional[int]
     urls: List[str] = Field(default_factory=list)
+    total_count: Optional[int] = None
+    next_cursor: Optional[str] = None
+    cache_status: Optional[str] = None
+    validation: Optional[SitemapValidation] = None
+    message: str
+
+
+class SitemapURLItem(BaseModel):
+    url: str
+
+
+class SitemapCrawlResponse(BaseModel):
+    sitemap_url: str
+    sitemap_status: str
+    files: List[SitemapFileResult] = Field(default_factory=list)
+    urls: List[str] = Field(default_factory=list)
+    total_urls: int  # unique URLs across all files
+    duplicate_urls: int  # <loc> entries already listed by another file
+    files_fetched: int
+    files_failed: int
+    files_skipped: int
     message: str
 
 
+class SitemapDiffInput(SitemapTreeInput):
+    save: bool = Field(
+        True,
+        description="Store this fetch as the new snapshot to diff the next one against."
+    )
+    max_listed: int = Field(
+        settings.SITEMAP_DIFF_MAX_LISTED,
+        ge=0,
+        description="At most this many URLs are listed per category; the counts always cover everything."
+    )
+
+
+class LastmodChange(BaseModel):
+    url: str
+    old_lastmod: Optional[str]
+    new_lastmod: Optional[str]
+
+
+class SitemapDiffResponse(BaseModel):
+    sitemap_url: str
+    sitemap_status: str
+    previous_snapshot_at: Optional[datetime] = None  # None on the first run (baseline)
+    snapshot_saved: bool = False
+    total_urls: int = 0
+    previous_total_urls: Optional[int] = None
+    added_count: int = 0
+    removed_count: int = 0
+    changed_count: int = 0  # same URL, different <lastmod>
+    added: List[str] = Field(default_factory=list)
+    removed: List[str] = Field(default_factory=list)
+    changed: List[LastmodChange] = Field(default_factory=list)
+    files_fetched: int = 0
+    files_failed: int = 0
+    message: str
+
+
+def page_of(items: List[str], offset: int, limit: Optional[int]) -> List[str]:
+    if limit is None:
+        return items[offset:]
+    return items[offset:offset + limit]
+
+
+async def load_sitemap(
+    client: httpx.AsyncClient,
+    results: ResultCache,
+    disk_cache: Optional[SitemapDiskCache],
+    sitemap_url: str,
+    page: SitemapPageInput
+) -> Tuple[ParsedSitemap, Optional[str], bool]:
+    """
+    Reads a sitemap (revalidating against the disk cache), going through the
+    in-memory result cache when a page was requested.
+
+    With `validation` the file is always downloaded and validated while it
+    is parsed (later pages reuse the first page's validation).
+
+    Returns the parsed file, its cache snapshot id (None when not paginating)
+    and whether the snapshot the cursor pointed at had expired.
+    """
+    async def read():
+        if page.validation:
+            return await read_sitemap_validated(client, sitemap_url, timeout=TIMEOUTS["sitemap"])
+        return await read_sitemap_cached(client, disk_cache, sitemap_url, timeout=TIMEOUTS["sitemap"])
+
+    if not page.paginated:
+        return await read(), None, False
+
+    # Validated and plain parses differ (the report, the download path), so
+    # they get separate entries and cursors
+    key = (sitemap_url, page.validation)
+    cached = results.get(key)
+    if cached is not None:
+        snapshot, parsed = cached
+    else:
+        parsed = await read()
+        # Errors are not cached, the next page request retries the download
+        snapshot = results.put(key, parsed) if parsed.ok else None
+
+    expired = page.cursor_snapshot is not None and page.cursor_snapshot != snapshot
+    return parsed, snapshot, expired
+
+
+def next_cursor(snapshot: Optional[str], offset: int, returned: int, total: int) -> Optional[str]:
+    if snapshot is None or offset + returned >= total:
+        return None
+    return f"{snapshot}:{offset + returned}"
+
+
+def page_message(page: SitemapPageInput, returned: int, expired: bool) -> str:
+    if not page.paginated:
+        return ""
+    message = f" Returning {returned} from offset {page.start}."
+    if expired:
+        message += " The cached result for this cursor expired, the sitemap was parsed again."
+    return message
+
+
 @router.post(
     "/check-sitemap",
     summary="Check sitemap.xml status and list nested sitemap files or direct URLs",
     response_description="Returns sitemap files (from sitemapindex) or direct URLs (from urlset).",
     response_model=SitemapCheckResponse
 )
-async def check_sitemap(data: SitemapCheckInput):
+async def check_sitemap(
+    data: SitemapCheckInput,
+    client: httpx.AsyncClient = Depends(get_http_client),
+    results: ResultCache = Depends(get_sitemap_results),
+    disk_cache: Optional[SitemapDiskCache] = Depends(get_sitemap_cache),
+    robots_cache: RobotsCache = Depends(get_robots_cache)
+):
     """
     🛠 Main endpoint that:
 
-    1️⃣ Builds the sitemap URL (domain + /sitemap.xml).
-    2️⃣ Downloads and parses the sitemap file.
+    1️⃣ Finds the sitemap URL: the first `Sitemap:` line of robots.txt, or
+       domain + /sitemap.xml when there is none (or `discover` is off).
+    2️⃣ Downloads and parses the sitemap file as a stream (gzip supported).
     3️⃣ If it's <sitemapindex>: returns a list of nested sitemap files.
     4️⃣ If it's <urlset>: returns URLs directly.
+
+    📄 With `limit` (and `offset` or the returned `next_cursor`) only one page
+    of the list is returned; the parsed file is cached for a short while so
+    following pages don't download it again.
     """
     sitemap_url = data.domain.rstrip('/') + '/sitemap.xml'
-    sitemap_files = []
-    urls = []
+    discovered = dict(sitemap_source="default", robots_sitemaps=[])
+    if data.discover:
+        robots = await robots_cache.get(client, data.domain)
+        if robots.sitemaps:
+            sitemap_url = robots.sitemaps[0]
+            discovered = dict(sitemap_source="robots.txt", robots_sitemaps=robots.sitemaps)
 
     try:
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            resp = await client.get(sitemap_url)
-            status_code = resp.status_code
+        parsed, snapshot, expired = await load_sitemap(client, results, disk_cache, sitemap_url, data)
+    except httpx.RequestError as exc:
+        return SitemapCheckResponse(
+            **discovered,
+            sitemap_url=sitemap_url,
+            sitemap_status="Error",
+            http_status=None,
+            sitemap_files=[],
+            urls=[],
+            message=f"Request error: {exc}"
+        )
+
+    status_code = parsed.status_code
+    if status_code >= 400:
+        return SitemapCheckResponse(
+            **discovered,
+            sitemap_url=sitemap_url,
+            sitemap_status="Not Found",
+            http_status=status_code,
+            cache_status=parsed.cache_status,
+            validation=parsed.validation,
+            sitemap_files=[],
+            urls=[],
+            message=f"Sitemap returned status {status_code}."
+        )
+
+    if isinstance(parsed.error, UnsupportedSitemapError):
+        return SitemapCheckResponse(
+            **discovered,
+            sitemap_url=sitemap_url,
+            sitemap_status="Unsupported format",
+            http_status=status_code,
+            cache_status=parsed.cache_status,
+            validation=parsed.validation,
+            message="Sitemap XML has unsupported root element."
+        )
+
+    if parsed.error is not None:
+        return SitemapCheckResponse(
+            **discovered,
+            sitemap_url=sitemap_url,
+            sitemap_status="Parse Error",
+            http_status=status_code,
+            cache_status=parsed.cache_status,
+            validation=parsed.validation,
+            message="Failed to parse sitemap XML."
+        )
+
+    locs = page_of(parsed.locs, data.start, data.limit)
+    message = f"Sitemap is available (status {status_code})."
+    if parsed.kind == 'urlset':
+        message += f" This is a <urlset> sitemap. Found {len(parsed.locs)} URLs."
+    else:
+        message += f" Found {len(parsed.locs)} nested sitemap files."
+
+    return SitemapCheckResponse(
+        **discovered,
+        sitemap_url=sitemap_url,
+        sitemap_status="Found",
+        http_status=status_code,
+        cache_status=parsed.cache_status,
+        validation=parsed.validation,
+        sitemap_files=locs if parsed.kind != 'urlset' else [],
+        urls=locs if parsed.kind == 'urlset' else [],
+        total_count=len(parsed.locs),
+        next_cursor=next_cursor(snapshot, data.start, len(locs), len(parsed.locs)),
+        message=message + page_message(data, len(locs), expired)
+    )
+
+
+async def stream_sitemap_urls(
+    client: httpx.AsyncClient,
+    disk_cache: Optional[SitemapDiskCache],
+    sitemap_url: str,
+    validation: bool = False
+) -> AsyncIterator[BaseModel]:
+    """
+    Yields a SitemapURLItem per <loc> as soon as it is parsed (or read back
+    from the disk cache on a 304), then one SitemapURLsResponse (with empty
+    `urls`) summarizing the file.
+
+    With `validation` the file is always downloaded (validation needs the
+    bytes) and checked in the same pass.
+    """
+    count = 0
+    cache_status = None
+    validator = SitemapValidator(sitemap_url) if validation else None
+    if validator is not None:
+        disk_cache = None
+    try:
+        async with open_sitemap_cached(
+            client,
+            disk_cache,
+            sitemap_url,
+            timeout=TIMEOUTS["sitemap"],
+            with_lastmod=validation
+        ) as (cached, sitemap, writer):
+            if cached is not None:
+                for loc in (cached.locs if cached.kind == 'urlset' else []):
+                    count += 1
+                    yield SitemapURLItem(url=loc)
+                yield SitemapURLsResponse(
+                    sitemap_url=sitemap_url,
+                    sitemap_status="Parsed",
+                    http_status=cached.status_code,
+                    total_count=count,
+                    cache_status=cached.cache_status,
+                    message=f"Parsed {count} URLs from sitemap."
+                )
+                return
+
+            status_code = sitemap.status_code
+            cache_status = "miss" if disk_cache is not None else None
 
             if status_code >= 400:
-                return SitemapCheckResponse(
+                yield SitemapURLsResponse(
                     sitemap_url=sitemap_url,
                     sitemap_status="Not Found",
                     http_status=status_code,
-                    sitemap_files=[],
-                    urls=[],
-                    message=f"Sitemap returned status {status_code}."
+                    cache_status=cache_status,
+                    message=f"Sitemap file returned status {status_code}."
                 )
-
-            sitemap_status = "Found"
-            message = f"Sitemap is available (status {status_code})."
+                return
 
             try:
-                root = ET.fromstring(resp.content)
-
-                if root.tag.endswith('urlset'):
-                    urls = [elem.text for elem in root.findall('.//{*}url/{*}loc')]
-                    message += f" This is a <urlset> sitemap. Found {len(urls)} URLs."
-
-                elif root.tag.endswith('sitemapindex'):
-                    sitemap_files = [elem.text for elem in root.findall('.//{*}sitemap/{*}loc')]
-                    message += f" Found {len(sitemap_files)} nested sitemap files."
-
-                else:
-                    sitemap_status = "Unsupported format"
-                    message = "Sitemap XML has unsupported root element."
-
-            except ET.ParseError:
-                sitemap_status = "Parse Error"
-                message = "Failed to parse sitemap XML."
+                async for item in sitemap:
+                    if validator is not None:
+                        loc, lastmod = item
+                        validator.add(loc, lastmod)
+                    else:
+                        loc = item
+                    if writer is not None:
+                        writer.add(loc)
+                    if sitemap.kind == 'urlset':
+                        count += 1
+                        yield SitemapURLItem(url=loc)
+                sitemap_status, message = "Parsed", f"Parsed {count} URLs from sitemap."
+                if writer is not None:
+                    writer.commit(sitemap.kind)
+            except (ET.ParseError, SitemapDecompressionError, UnsupportedSitemapError) as e:
+                # URLs sent before the error stay valid, the summary line reports it
+                sitemap_status, message = describe_error(e)
 
-            return SitemapCheckResponse(
+            yield SitemapURLsResponse(
                 sitemap_url=sitemap_url,
                 sitemap_status=sitemap_status,
                 http_status=status_code,
-                sitemap_files=sitemap_files,
-                urls=urls,
+                total_count=count,
+                cache_status=cache_status,
+                validation=validator.result(sitemap.parser.bytes_parsed) if validator is not None else None,
                 message=message
             )
 
     except httpx.RequestError as exc:
-        return SitemapCheckResponse(
+        yield SitemapURLsResponse(
             sitemap_url=sitemap_url,
             sitemap_status="Error",
             http_status=None,
-            sitemap_files=[],
-            urls=[],
+            total_count=count,
+            cache_status=cache_status,
             message=f"Request error: {exc}"
         )
 
@@ -135,69 +652,538 @@ async def check_sitemap(data: SitemapCheckInput):
     "/fetch-sitemap-urls",
     summary="Fetch and parse URLs from a specific sitemap file",
     response_description="Returns all <loc> URLs from a sitemap file (supports .xml and .xml.gz).",
-    response_model=SitemapURLsResponse
+    response_model=SitemapURLsResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}}
 )
-async def fetch_sitemap_urls(data: SitemapFetchInput):
+async def fetch_sitemap_urls(
+    data: SitemapFetchInput,
+    client: httpx.AsyncClient = Depends(get_http_client),
+    results: ResultCache = Depends(get_sitemap_results),
+    disk_cache: Optional[SitemapDiskCache] = Depends(get_sitemap_cache)
+):
     """
     📥 Fetches and parses a given sitemap file:
 
-    ✅ Supports normal XML and gzipped XML (.gz).
+    ✅ Supports normal XML and gzipped XML (.gz), decompressed incrementally.
+    ✅ Parses while downloading, so memory stays flat even for 50 MB sitemaps.
     ✅ Extracts all <loc> URLs inside <url> elements.
+
+    Response modes:
+
+    - 📦 default: one JSON object with every URL.
+    - 📄 `limit` + `offset` / `cursor`: one page of URLs and a `next_cursor`;
+      the parsed file is cached for a short while between pages.
+    - 📤 `stream: true`: NDJSON, one `{"url": ...}` line per URL sent while the
+      file is still being parsed, then a final `SitemapURLsResponse` line
+      (empty `urls`, `total_count` set) with the status.
     """
-    urls = []
+    if data.stream:
+        return ndjson_response(stream_sitemap_urls(client, disk_cache, data.sitemap_url, data.validation))
 
     try:
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            resp = await client.get(data.sitemap_url)
-            status_code = resp.status_code
-            content = resp.content
+        parsed, snapshot, expired = await load_sitemap(client, results, disk_cache, data.sitemap_url, data)
+    except httpx.RequestError as exc:
+        return SitemapURLsResponse(
+            sitemap_url=data.sitemap_url,
+            sitemap_status="Error",
+            http_status=None,
+            urls=[],
+            message=f"Request error: {exc}"
+        )
+
+    status_code = parsed.status_code
+    if status_code >= 400:
+        return SitemapURLsResponse(
+            sitemap_url=data.sitemap_url,
+            sitemap_status="Not Found",
+            http_status=status_code,
+            cache_status=parsed.cache_status,
+            validation=parsed.validation,
+            urls=[],
+            message=f"Sitemap file returned status {status_code}."
+        )
+
+    if parsed.error is not None:
+        sitemap_status, message = describe_error(parsed.error)
+        return SitemapURLsResponse(
+            sitemap_url=data.sitemap_url,
+            sitemap_status=sitemap_status,
+            http_status=status_code,
+            cache_status=parsed.cache_status,
+            validation=parsed.validation,
+            urls=[],
+            message=message
+        )
+
+    all_urls = parsed.locs if parsed.kind == 'urlset' else []
+    urls = page_of(all_urls, data.start, data.limit)
+
+    return SitemapURLsResponse(
+        sitemap_url=data.sitemap_url,
+        sitemap_status="Parsed",
+        http_status=status_code,
+        cache_status=parsed.cache_status,
+        validation=parsed.validation,
+        urls=urls,
+        total_count=len(all_urls),
+        next_cursor=next_cursor(snapshot, data.start, len(urls), len(all_urls)),
+        message=f"Parsed {len(all_urls)} URLs from sitemap." + page_message(data, len(urls), expired)
+    )
+
+
+@router.post(
+    "/crawl-sitemap",
+    summary="Expand a sitemap index into all of its URLs",
+    response_description="Deduplicated URLs of every nested sitemap file, with per-file status and counts.",
+    response_model=SitemapCrawlResponse
+)
+async def crawl_sitemap(data: SitemapCrawlInput, client: httpx.AsyncClient = Depends(get_http_client)):
+    """
+    🌳 Walks a whole sitemap tree server-side:
+
+    1️⃣ Fetches `sitemap_url` (plain or gzipped <urlset> / <sitemapindex>).
+    2️⃣ Follows nested indexes up to `max_depth`, fetching up to `concurrency` files at once.
+    3️⃣ Dedupes URLs across files and skips files listed more than once.
+    4️⃣ Reports status and URL counts for every file, failed ones included.
+    """
+    crawl = await SitemapCrawl(
+        client,
+        max_depth=data.max_depth,
+        max_files=data.max_files,
+        concurrency=data.concurrency,
+        timeout=TIMEOUTS["sitemap"],
+        keep_urls=data.include_urls
+    ).run(data.sitemap_url)
+
+    root = crawl.files[0]
+    failed, skipped = crawl.failed_files, crawl.skipped_files
+
+    if root.sitemap_status != "Parsed":
+        message = root.message
+    else:
+        message = f"Crawled {crawl.fetched_files} sitemap files, found {crawl.unique_urls} unique URLs."
+        if failed:
+            message += f" {failed} files failed."
+        if skipped:
+            message += f" {skipped} files skipped."
+
+    return SitemapCrawlResponse(
+        sitemap_url=data.sitemap_url,
+        sitemap_status=root.sitemap_status,
+        files=crawl.files,
+        urls=crawl.urls,
+        total_urls=crawl.unique_urls,
+        duplicate_urls=crawl.duplicate_urls,
+        files_fetched=crawl.fetched_files,
+        files_failed=failed,
+        files_skipped=skipped,
+        message=message
+    )
+
+
+async def sitemap_entries(data: SitemapEntriesInput, client: httpx.AsyncClient, columns: Optional[SitemapEntryColumns]) -> AsyncIterator[BaseModel]:
+    """
+    Parses a sitemap into SitemapEntry rows. Each row is appended to `columns`
+    or, without columns, yielded as a SitemapEntryItem; a final
+    SitemapEntriesResponse summarizes the file.
+    """
+    count = 0
+    try:
+        async with open_sitemap(
+            client,
+            data.sitemap_url,
+            timeout=TIMEOUTS["sitemap"],
+            full=True,
+            modified_since=data.modified_since,
+            keep_undated=data.keep_undated
+        ) as sitemap:
+            status_code = sitemap.status_code
 
             if status_code >= 400:
-                return SitemapURLsResponse(
+                yield SitemapEntriesResponse(
                     sitemap_url=data.sitemap_url,
                     sitemap_status="Not Found",
                     http_status=status_code,
-                    urls=[],
                     message=f"Sitemap file returned status {status_code}."
                 )
-
-            # Detect gzip by magic bytes (0x1f 0x8b)
-            is_gzip = content[:2] == b'\x1f\x8b'
-            if is_gzip:
-                try:
-                    with gzip.GzipFile(fileobj=BytesIO(content)) as f:
-                        content = f.read()
-                except Exception as e:
-                    return SitemapURLsResponse(
-                        sitemap_url=data.sitemap_url,
-                        sitemap_status="Decompression Failed",
-                        http_status=status_code,
-                        urls=[],
-                        message=f"Failed to decompress gzip sitemap: {e}"
-                    )
+                return
 
             try:
-                root = ET.fromstring(content)
-                urls = [elem.text for elem in root.findall('.//{*}url/{*}loc')]
-                msg = f"Parsed {len(urls)} URLs from sitemap."
+                async for entry in sitemap:
+                    count += 1
+                    if columns is not None:
+                        columns.append(entry)
+                    else:
+                        yield SitemapEntryItem(**entry._asdict())
                 sitemap_status = "Parsed"
-            except ET.ParseError as e:
-                msg = f"Failed to parse sitemap XML: {e}"
-                sitemap_status = "Parse Error"
+                message = f"Parsed {count} entries from sitemap."
+                if data.modified_since is not None:
+                    message += f" {sitemap.parser.filtered} older entries skipped."
+            except (ET.ParseError, SitemapDecompressionError, UnsupportedSitemapError) as e:
+                sitemap_status, message = describe_error(e)
 
-            return SitemapURLsResponse(
+            yield SitemapEntriesResponse(
                 sitemap_url=data.sitemap_url,
                 sitemap_status=sitemap_status,
                 http_status=status_code,
-                urls=urls,
-                message=msg
+                kind=sitemap.kind,
+                total_count=count,
+                filtered_count=sitemap.parser.filtered,
+                columns=columns,
+                message=message
             )
 
     except httpx.RequestError as exc:
-        return SitemapURLsResponse(
+        yield SitemapEntriesResponse(
+            sitemap_url=data.sitemap_url,
+            sitemap_status="Error",
+            http_status=None,
+            total_count=count,
+            message=f"Request error: {exc}"
+        )
+
+
+@router.post(
+    "/fetch-sitemap-entries",
+    summary="Fetch a sitemap file with lastmod, changefreq, priority, images and hreflang alternates",
+    response_description="Column-oriented sitemap entries, optionally only those modified since a given time.",
+    response_model=SitemapEntriesResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}}
+)
+async def fetch_sitemap_entries(data: SitemapEntriesInput, client: httpx.AsyncClient = Depends(get_http_client)):
+    """
+    🗂 Like `/fetch-sitemap-urls`, but keeps everything an entry carries:
+
+    ✅ <loc>, <lastmod>, <changefreq>, <priority>, <image:image> locations and
+       <xhtml:link rel="alternate"> hreflang links, read in one streaming pass.
+    ✅ `modified_since` drops older entries while parsing, so they are never collected.
+    ✅ Result is column-oriented (one list per field); with `stream: true`
+       each entry is sent as an NDJSON line instead, then a summary line
+       (`columns` is null).
+
+    For a <sitemapindex> the entries are the nested sitemap files.
+    """
+    if data.stream:
+        return ndjson_response(sitemap_entries(data, client, None))
+
+    # Rows go into the columns, the only item produced is the summary
+    async for summary in sitemap_entries(data, client, SitemapEntryColumns()):
+        pass
+    if summary.sitemap_status != "Parsed":
+        summary.columns = None
+    return summary
+
+
+@router.post(
+    "/validate-sitemap",
+    summary="Validate a sitemap file against the sitemaps.org protocol",
+    response_description="Protocol issues found in one streaming pass, with counts and examples.",
+    response_model=SitemapValidationResponse
+)
+async def validate_sitemap(data: SitemapValidateInput, client: httpx.AsyncClient = Depends(get_http_client)):
+    """
+    ✅ Checks one sitemap file while it downloads, without keeping its URLs:
+
+    - 📏 more than 50,000 entries or more than 50 MB uncompressed
+    - 🔁 duplicate <loc> (Bloom filter, so memory stays fixed; may rarely over-count)
+    - 🌐 <loc> on another host than the sitemap
+    - 🔗 non-absolute or badly escaped <loc>
+    - 📅 <lastmod> that isn't a valid W3C Datetime
+
+    `/check-sitemap` and `/fetch-sitemap-urls` accept `validation: true` to
+    get the same report alongside their normal output.
+    """
+    try:
+        parsed = await read_sitemap_validated(client, data.sitemap_url, timeout=TIMEOUTS["sitemap"], keep_locs=False)
+    except httpx.RequestError as exc:
+        return SitemapValidationResponse(
             sitemap_url=data.sitemap_url,
             sitemap_status="Error",
             http_status=None,
-            urls=[],
             message=f"Request error: {exc}"
         )
+
+    if parsed.status_code >= 400:
+        return SitemapValidationResponse(
+            sitemap_url=data.sitemap_url,
+            sitemap_status="Not Found",
+            http_status=parsed.status_code,
+            message=f"Sitemap file returned status {parsed.status_code}."
+        )
+
+    if parsed.error is not None:
+        sitemap_status, message = describe_error(parsed.error)
+    elif parsed.validation.valid:
+        sitemap_status, message = "Valid", f"No protocol issues in {parsed.validation.entry_count} entries."
+    else:
+        sitemap_status = "Invalid"
+        message = f"{len(parsed.validation.issues)} kinds of protocol issues in {parsed.validation.entry_count} entries."
+
+    return SitemapValidationResponse(
+        sitemap_url=data.sitemap_url,
+        sitemap_status=sitemap_status,
+        http_status=parsed.status_code,
+        kind=parsed.kind,
+        validation=parsed.validation,
+        message=message
+    )
+
+
+@router.post(
+    "/check-sitemap-robots",
+    summary="Check every URL of a sitemap against robots.txt",
+    response_description="URLs of the sitemap that robots.txt blocks for the given user-agent, with the deciding rule.",
+    response_model=SitemapRobotsResponse
+)
+async def check_sitemap_robots(
+    data: SitemapRobotsInput,
+    client: httpx.AsyncClient = Depends(get_http_client),
+    robots_cache: RobotsCache = Depends(get_robots_cache)
+):
+    """
+    🤖 Finds sitemap URLs that crawlers aren't allowed to fetch:
+
+    1️⃣ Streams the sitemap (plain or gzipped).
+    2️⃣ Loads robots.txt once per host (cached), compiled for `user_agent`.
+    3️⃣ Matches every URL as it is parsed (longest rule wins, Allow on a tie),
+       a few microseconds per URL.
+
+    A missing robots.txt (4xx) allows everything; an unreachable one (5xx,
+    network error) blocks everything, as crawlers treat it.
+    """
+    robots = await robots_cache.get(client, data.sitemap_url)
+    response = SitemapRobotsResponse(
+        sitemap_url=data.sitemap_url,
+        sitemap_status="Parsed",
+        http_status=None,
+        user_agent=data.user_agent,
+        sitemap_allowed=robots.allowed(data.sitemap_url, data.user_agent),
+        message=""
+    )
+
+    matchers = {}
+
+    async def matcher_for(loc: str):
+        robots = await robots_cache.get(client, loc)
+        matcher = robots.matcher(data.user_agent)
+        response.robots_files.append(RobotsFile(
+            robots_url=robots.url,
+            robots_status=robots.status,
+            http_status=robots.http_status,
+            rule_count=len(matcher)
+        ))
+        return matcher
+
+    try:
+        async with open_sitemap(client, data.sitemap_url, timeout=TIMEOUTS["sitemap"]) as sitemap:
+            response.http_status = sitemap.status_code
+            if sitemap.status_code >= 400:
+                response.sitemap_status = "Not Found"
+                response.message = f"Sitemap file returned status {sitemap.status_code}."
+                return response
+
+            try:
+                async for loc in sitemap:
+                    if not loc.startswith(("http://", "https://")):
+                        response.skipped_count += 1
+                        continue
+                    try:
+                        origin, path = robots_origin(loc), url_path(loc)
+                    except ValueError:
+                        # Unparseable URL (e.g. an unclosed [ in the host)
+                        response.skipped_count += 1
+                        continue
+                    matcher = matchers.get(origin)
+                    if matcher is None:
+                        matcher = matchers[origin] = await matcher_for(loc)
+                    response.total_urls += 1
+                    if matcher.allowed(path):
+                        continue
+                    response.blocked_count += 1
+                    if len(response.blocked) < data.max_listed:
+                        response.blocked.append(BlockedURL(url=loc, rule=matcher.decide(path)))
+            except (ET.ParseError, SitemapDecompressionError, UnsupportedSitemapError) as e:
+                response.sitemap_status, response.message = describe_error(e)
+                return response
+    except httpx.RequestError as exc:
+        response.sitemap_status = "Error"
+        response.message = f"Request error: {exc}"
+        return response
+
+    response.message = (
+        f"{response.blocked_count} of {response.total_urls} URLs are blocked by robots.txt "
+        f"for user-agent '{data.user_agent}'."
+    )
+    if not response.sitemap_allowed:
+        response.message += " The sitemap file itself is blocked."
+    return response
+
+
+def sweep_summary(data: SitemapSweepInput, sweep: StatusSweep, listed: bool = True) -> SitemapSweepResponse:
+    response = SitemapSweepResponse(
+        sitemap_url=data.sitemap_url,
+        sitemap_status=sweep.sitemap_status,
+        http_status=sweep.http_status,
+        kind=sweep.kind,
+        total_urls=sweep.checked,
+        skipped_count=sweep.skipped,
+        counts=sweep.counts,
+        latency=sweep.latency(),
+        message=sweep.message
+    )
+    if listed:
+        response.redirects = sweep.listed["3xx"]
+        response.client_errors = sweep.listed["4xx"]
+        response.server_errors = sweep.listed["5xx"]
+        response.failed = sweep.listed["error"]
+    if sweep.sitemap_status == "Parsed":
+        problems = sweep.checked - sweep.counts["2xx"]
+        response.message = f"Checked {sweep.checked} URLs, {problems} did not answer 2xx."
+    return response
+
+
+async def stream_sweep(data: SitemapSweepInput, sweep: StatusSweep) -> AsyncIterator[BaseModel]:
+    async for result in sweep.results(data.sitemap_url):
+        if result.status_class != "2xx":
+            yield result
+    # Every problem was already sent as its own line
+    yield sweep_summary(data, sweep, listed=False)
+
+
+@router.post(
+    "/sweep-sitemap-status",
+    summary="Check the HTTP status of every URL in a sitemap",
+    response_description="3xx / 4xx / 5xx URLs of the sitemap and latency percentiles.",
+    response_model=SitemapSweepResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}}
+)
+async def sweep_sitemap_status(data: SitemapSweepInput, client: httpx.AsyncClient = Depends(get_http_client)):
+    """
+    🚦 Status of every URL in a sitemap file, without downloading the pages:
+
+    1️⃣ Streams the sitemap and queues each <loc> as soon as it is parsed.
+    2️⃣ Sends HEAD (redirects are reported, not followed). If the server
+       rejects HEAD (400/403/405/406/501), it sends a GET for one byte instead.
+    3️⃣ Limits requests to `concurrency` overall and `host_rate` per second
+       per host (token bucket, bursts of `host_burst`).
+    4️⃣ Reports counts per status class, the 3xx / 4xx / 5xx / failed URLs
+       and p50/p90/p95/p99 latency.
+
+    With `stream: true` each non-2xx result is sent as an NDJSON line as
+    soon as it is known, and the summary comes last.
+    """
+    sweep = StatusSweep(
+        client,
+        concurrency=data.concurrency,
+        host_rate=data.host_rate,
+        host_burst=data.host_burst,
+        timeout=TIMEOUTS["sweep"],
+        max_listed=data.max_listed
+    )
+    if data.stream:
+        return ndjson_response(stream_sweep(data, sweep))
+
+    await sweep.run(data.sitemap_url)
+    return sweep_summary(data, sweep)
+
+
+def compare_snapshots(previous: Snapshot, current: Snapshot, max_listed: int):
+    """
+    Diffs two snapshots and reads back up to `max_listed` entries per category.
+    CPU/disk bound, meant to run in a worker thread.
+    """
+    diff = diff_snapshots(previous, current)
+    added = [loc for loc, _ in current.read(diff.added, max_listed)]
+    removed = [loc for loc, _ in previous.read(diff.removed, max_listed)]
+
+    # changed_new[i] and changed_old[i] are the same URL, pair them by it
+    new_entries = dict(current.read(diff.changed_new[:max_listed]))
+    old_entries = dict(previous.read(diff.changed_old[:max_listed]))
+    changed = [
+        LastmodChange(url=loc, old_lastmod=old_entries.get(loc), new_lastmod=lastmod)
+        for loc, lastmod in new_entries.items()
+    ]
+    return diff, added, removed, changed
+
+
+@router.post(
+    "/diff-sitemap",
+    summary="Diff a sitemap against its previous snapshot",
+    response_description="Added, removed and lastmod-changed URLs since the last stored snapshot.",
+    response_model=SitemapDiffResponse
+)
+async def diff_sitemap(
+    data: SitemapDiffInput,
+    client: httpx.AsyncClient = Depends(get_http_client),
+    snapshots: SnapshotStore = Depends(get_snapshot_store)
+):
+    """
+    🔍 Compares the current URL set of a sitemap (tree) with the last stored one:
+
+    1️⃣ Crawls `sitemap_url` like `/crawl-sitemap`, collecting <loc> + <lastmod>.
+    2️⃣ Builds a snapshot: URLs go to disk, only sorted 64-bit hashes stay in memory.
+    3️⃣ Merges it with the previous snapshot to find added, removed and changed URLs.
+    4️⃣ Saves it as the new baseline (`save`), unless some files failed to load,
+       since a partial snapshot would show their URLs as removed.
+    """
+    builder = snapshots.builder()
+    try:
+        crawl = await SitemapCrawl(
+            client,
+            max_depth=data.max_depth,
+            max_files=data.max_files,
+            concurrency=data.concurrency,
+            timeout=TIMEOUTS["sitemap"],
+            keep_urls=False,
+            on_url=builder.add
+        ).run(data.sitemap_url)
+    except BaseException:
+        builder.abort()
+        raise
+
+    root = crawl.files[0]
+    if root.sitemap_status != "Parsed":
+        builder.abort()
+        return SitemapDiffResponse(
+            sitemap_url=data.sitemap_url,
+            sitemap_status=root.sitemap_status,
+            files_fetched=crawl.fetched_files,
+            files_failed=crawl.failed_files,
+            message=root.message
+        )
+
+    current = await asyncio.to_thread(builder.finish)
+    previous = snapshots.load(data.sitemap_url)
+    response = SitemapDiffResponse(
+        sitemap_url=data.sitemap_url,
+        sitemap_status="Parsed",
+        total_urls=len(current),
+        files_fetched=crawl.fetched_files,
+        files_failed=crawl.failed_files,
+        message=""
+    )
+
+    if previous is None:
+        response.message = f"No previous snapshot, {len(current)} URLs form the baseline."
+    else:
+        diff, added, removed, changed = await asyncio.to_thread(compare_snapshots, previous, current, data.max_listed)
+        response.previous_snapshot_at = datetime.fromtimestamp(previous.created_at, tz=timezone.utc)
+        response.previous_total_urls = len(previous)
+        response.added_count = len(diff.added)
+        response.removed_count = len(diff.removed)
+        response.changed_count = len(diff.changed_new)
+        response.added, response.removed, response.changed = added, removed, changed
+        response.message = (
+            f"{response.added_count} added, {response.removed_count} removed, "
+            f"{response.changed_count} changed since the previous snapshot."
+        )
+
+    if crawl.failed_files:
+        response.message += f" {crawl.failed_files} files failed, snapshot not saved."
+    if data.save and not crawl.failed_files:
+        await asyncio.to_thread(snapshots.save, data.sitemap_url, current)
+        response.snapshot_saved = True
+    else:
+        snapshots.discard(current)
+
+    return response
@@ -1,8 +1,23 @@
-from fastapi import APIRouter
-from pydantic import BaseModel, Field, HttpUrl
-from typing import Optional, Dict, List
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, HttpUrl, field_validator
+from typing import Any, AsyncIterator, Optional, Dict, List, Tuple
 import httpx
-from bs4 import BeautifulSoup
+
+from app import settings
+from app.browser_jobs import BrowserJobQueue, QueueClosedError, QueueFullError, get_browser_jobs
+from app.concurrency import ndjson_response, run_bounded_chunks
+from app.endpoint.browser import queue_error_response
+from app.html_extract import PageData, looks_like_html, read_head
+from app.http_client import TIMEOUTS, get_http_client
+from app.parse_pool import ParsePool, get_parse_pool
+from app.private_hosts import PrivateHostError, ensure_public_url
+from app.redirects import RedirectHop, RedirectResolver, get_redirect_resolver
+from app.resource_blocking import BlockingStats
+from app.robots import RobotsCache, RobotsVerdict, check_robots, get_robots_cache
+from app.selenium_runner import render_page
+from app.seo_rules import RuleSet, SEOCheck, get_rule_set
+from app.timing import RequestTimer, RequestTimings
 
 router = APIRouter(
     prefix="",
@@ -19,6 +34,23 @@ class HeadingTag(BaseModel):
     tag: str
     text: str
 
+# ✅ A field whose raw (server HTML) and rendered (browser DOM) values differ
+class FieldDifference(BaseModel):
+    field: str
+    raw: Any
+    rendered: Any
+
+# ✅ Outcome of render mode
+class RenderResult(BaseModel):
+    status: str  # "done" / "failed" / "timeout" (the browser job's status), "queue_full" in batches, "refused" for private hosts
+    wait: str
+    ready: bool = False  # the readiness condition was met before RENDER_TIMEOUT
+    final_url: Optional[str] = None
+    elapsed: Optional[float] = None  # seconds in the browser
+    error: Optional[str] = None
+    blocking: Optional[BlockingStats] = None  # requests blocked by the render policy, None with render_block off
+    differences: List[FieldDifference] = Field(default_factory=list)
+
 # ✅ Response model
 class URLCheckResponse(BaseModel):
     url: str
@@ -44,37 +76,234 @@ class URLCheckResponse(BaseModel):
     lang: Optional[str]
     favicon_url: Optional[str]
     message: str
-    seo_checks: Optional[Dict[str, Dict[str, str]]] = None
+    seo_checks: Optional[Dict[str, SEOCheck]] = None
+    redirect_hops: List[RedirectHop] = Field(default_factory=list)
+    timings: Optional[RequestTimings] = None
+    robots_txt: Optional[RobotsVerdict] = None
+    body_bytes_read: Optional[int] = None  # decoded body bytes downloaded
+    read_stopped: Optional[str] = None  # head-only mode: "head_end" / "max_bytes", None if the body was read to the end
+    rendered: Optional[RenderResult] = None  # render mode only
+
+# ✅ Per-URL options, shared by the single and batch inputs
+class URLCheckOptions(BaseModel):
+    check_robots: bool = Field(False, description="Also check the URL against the site's robots.txt (cached per host).")
+    head_only: bool = Field(False, description="Stop downloading at </head> (or HEAD_ONLY_MAX_BYTES). Headings are skipped unless with_headings is set.")
+    with_headings: bool = Field(False, description="Head-only mode: read on into the body for H1-H6, still up to HEAD_ONLY_MAX_BYTES.")
+    render: bool = Field(False, description="Also load the page in a (warm, pooled) browser; page fields then come from the rendered DOM.")
+    render_wait: str = Field(
+        settings.RENDER_WAIT,
+        description='Render mode readiness: "load", "networkidle" or a CSS selector to wait for.'
+    )
+    render_block: bool = Field(
+        True,
+        description="Render mode: skip the requests of RENDER_BLOCK_TYPES and blocked domains (images, fonts, trackers...)."
+    )
+    fields: Optional[List[str]] = Field(
+        None,
+        description="Only compute and return these response fields (plus url and message). Unset means all of them.",
+        json_schema_extra={"example": ["http_status", "title", "canonical"]}
+    )
+
+    @field_validator('fields')
+    def known_fields(cls, fields):
+        if fields is not None:
+            unknown = [name for name in fields if name not in URLCheckResponse.model_fields]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return fields
 
 # ✅ Input model
-class URLCheckInput(BaseModel):
+class URLCheckInput(URLCheckOptions):
     url: HttpUrl = Field(..., json_schema_extra={"example": "https://example.com/page"})
 
-# ✅ Main endpoint
-@router.post(
-    "/check-url",
-    summary="Check technical and SEO data for a URL",
-    response_description="Returns technical status and SEO-related information for the given URL.",
-    response_model=URLCheckResponse
-)
-async def check_url(data: URLCheckInput):
-    async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
+# ✅ Batch input: the options apply to every URL
+class URLsCheckInput(URLCheckOptions):
+    urls: List[HttpUrl] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.BULK_MAX_ITEMS,
+        description="URLs to check.",
+        json_schema_extra={"example": ["https://example.com/a", "https://example.com/b"]}
+    )
+    concurrency: int = Field(
+        settings.BULK_CONCURRENCY,
+        ge=1,
+        le=settings.BULK_MAX_CONCURRENCY,
+        description="How many URLs are checked at the same time."
+    )
+    per_host_concurrency: int = Field(
+        settings.BULK_PER_HOST_CONCURRENCY,
+        ge=1,
+        description="How many checks may hit the same host at the same time."
+    )
+
+# Response fields that need the page body, and those that need its headings
+HTML_FIELDS = {
+    'title', 'description', 'canonical', 'canonical_matches', 'h1', 'all_h1', 'headings', 'robots_meta',
+    'open_graph', 'twitter_meta', 'schema_json_ld', 'alternate_hreflang', 'lang', 'favicon_url', 'seo_checks',
+    'rendered',
+}
+HEADING_FIELDS = {'h1', 'all_h1', 'headings', 'seo_checks'}
+
+# ✅ Only the requested fields (always with url and message)
+def select_fields(response: URLCheckResponse, fields: Optional[List[str]]):
+    if fields is None:
+        return response
+    return JSONResponse(content=response.model_dump(mode="json", include={"url", "message", *fields}))
+
+# ✅ Render mode: the page as a browser sees it, compared with the raw HTML
+async def render_and_compare(
+    url: str,
+    raw: PageData,
+    wait: str,
+    block: bool,
+    browser_jobs: BrowserJobQueue,
+    parse_pool: ParsePool,
+    headings: bool,
+    queue_timeout: Optional[float] = None,
+):
+    """
+    Renders `url` on a pooled browser and extracts the DOM the same way as
+    the raw HTML. Returns the RenderResult and the rendered PageData (None
+    if rendering failed).
+
+    Without `queue_timeout` the job is submitted like any other, and a full
+    or closed queue raises (the caller answers 429/503). With it (batches),
+    the render waits that long for room and reports "queue_full" instead.
+    Pages on private hosts are never rendered ("refused").
+    """
+    try:
+        await ensure_public_url(url)
+    except PrivateHostError as e:
+        return RenderResult(status="refused", wait=wait, error=str(e)), None
+    if queue_timeout is None:
+        job = await browser_jobs.wait(browser_jobs.submit("render", render_page, url=url, wait=wait, block=block))
+    else:
+        try:
+            job = await browser_jobs.run("render", render_page, queue_timeout=queue_timeout, url=url, wait=wait, block=block)
+        except (QueueFullError, QueueClosedError) as e:
+            return RenderResult(status="queue_full", wait=wait, error=str(e)), None
+    if job.status != "done":
+        return RenderResult(status=job.status, wait=wait, error=job.error), None
+
+    page = await parse_pool.extract(job.result["html"].encode("utf-8"), "utf-8", headings=headings)
+    raw_values, rendered_values = raw.as_dict(), page.as_dict()
+    if not headings:
+        for name in ("headings", "all_h1", "h1"):
+            raw_values.pop(name)
+    differences = [
+        FieldDifference(field=name, raw=value, rendered=rendered_values[name])
+        for name, value in raw_values.items()
+        if rendered_values[name] != value
+    ]
+    return RenderResult(
+        status=job.status,
+        wait=wait,
+        ready=job.result["ready"],
+        final_url=job.result["final_url"],
+        elapsed=job.result["elapsed"],
+        blocking=job.result["blocking"],
+        differences=differences
+    ), page
+
+# ✅ Response with no page data (request failed or no final page)
+def empty_url_response(url: str, message: str, **fields) -> URLCheckResponse:
+    values = dict(
+        url=url,
+        http_status=None,
+        redirected=False,
+        final_url=None,
+        title=None,
+        description=None,
+        canonical=None,
+        canonical_matches=None,
+        h1=None,
+        all_h1=[],
+        headings=[],
+        robots_meta=None,
+        x_robots_tag=None,
+        content_type=None,
+        content_length=None,
+        headers={},
+        open_graph={},
+        twitter_meta={},
+        schema_json_ld=None,
+        alternate_hreflang=[],
+        lang=None,
+        favicon_url=None,
+        message=message,
+        seo_checks=None
+    )
+    values.update(fields)
+    return URLCheckResponse(**values)
+
+# ✅ One URL check, shared by the single and batch endpoints
+async def collect_url_check(
+    data: URLCheckInput,
+    client: httpx.AsyncClient,
+    redirects: RedirectResolver,
+    robots_cache: RobotsCache,
+    parse_pool: ParsePool,
+    browser_jobs: Optional[BrowserJobQueue] = None,
+    render_queue_timeout: Optional[float] = None,
+) -> Tuple[URLCheckResponse, Optional[dict]]:
+    """
+    Fetches and parses one URL. Fields not in `data.fields` are left empty;
+    `select_fields` drops them from the output. In render mode a full
+    browser queue raises QueueFullError, unless `render_queue_timeout` says
+    how long to wait for room (see `render_and_compare`).
+
+    SEO rules are not run here: the values to run them on come back with
+    the response (None when there is no page or seo_checks wasn't asked
+    for), so the batch endpoint can evaluate many pages at once.
+    """
+    wanted = set(data.fields) if data.fields is not None else None
+    needs_body = wanted is None or bool(wanted & HTML_FIELDS)
+    needs_headings = wanted is None or bool(wanted & HEADING_FIELDS)
+
+    timer = RequestTimer()
+    robots_txt = await check_robots(client, robots_cache, str(data.url)) if data.check_robots else None
+    try:
+        with timer:
+            result = await redirects.fetch(
+                client,
+                str(data.url),
+                timeout=TIMEOUTS["url"],
+                extensions={"trace": timer.trace},
+                stream=data.head_only or not needs_body
+            )
+
+        if result.response is None:
+            # Redirect loop or too many redirects, there is no page to parse
+            reason = "Redirect loop detected" if result.stopped == "loop" else "Too many redirects"
+            return empty_url_response(
+                str(data.url),
+                f"{reason} after {len(result.hops)} hops",
+                http_status=result.status_code,
+                redirected=True,
+                final_url=result.final_url,
+                redirect_hops=result.hops,
+                timings=timer.summary(result.responses),
+                robots_txt=robots_txt
+            )
+
+        response = result.response
         try:
-            response = await client.get(str(data.url))
             status_code = response.status_code
-            redirected = len(response.history) > 0
+            redirected = len(result.hops) > 0
             final_url = str(response.url)
-            headers = {k: v for k, v in response.headers.items()}
-            content_type = headers.get('Content-Type')
+            headers = {k: v for k, v in response.headers.items()} if wanted is None or 'headers' in wanted else {}
+            # Look up on response.headers: it is case-insensitive, the dict above is not
+            content_type = response.headers.get('Content-Type')
 
             # Safer content-length parsing
-            content_length_raw = headers.get('Content-Length')
+            content_length_raw = response.headers.get('Content-Length')
             try:
                 content_length = int(content_length_raw) if content_length_raw else None
             except ValueError:
                 content_length = None
 
-            x_robots_tag = headers.get('X-Robots-Tag')
+            x_robots_tag = response.headers.get('X-Robots-Tag')
 
             # Initialize fields
             title = description = canonical = robots_meta = schema_json_ld = lang = favicon_url = None
@@ -87,219 +316,240 @@ async def check_url(data: URLCheckInput):
             twitter_meta = {}
 
             # Decide if we should parse the HTML
-            should_parse_html = False
-            if content_type and 'text/html' in content_type.lower():
-                should_parse_html = True
-            elif not content_type:
-                text_snippet = response.text.strip().lower()
-                if text_snippet.startswith('<!doctype html') or text_snippet.startswith('<html'):
-                    should_parse_html = True
-
-            if should_parse_html:
-                # ✅ Use 'html.parser' parser here
-                soup = BeautifulSoup(response.text, 'html.parser')
-
-                # ✅ Title
-                if soup.title and soup.title.string:
-                    title = soup.title.string.strip()
-
-                # ✅ Meta description
-                desc_tag = soup.find('meta', attrs={'name': 'description'})
-                if desc_tag and desc_tag.has_attr('content'):
-                    description = desc_tag['content'].strip()
-
-                # ✅ Meta robots
-                robots_tag = soup.find('meta', attrs={'name': 'robots'})
-                if robots_tag and robots_tag.has_attr('content'):
-                    robots_meta = robots_tag['content'].strip()
-
-                # ✅ Canonical link
-                canonical_tag = soup.find('link', rel='canonical')
-                if canonical_tag and canonical_tag.has_attr('href'):
-                    canonical = canonical_tag['href'].strip()
-
-                # ✅ Check if canonical matches the final URL
-                canonical_matches = (canonical == final_url) if canonical else None
-
-                # ✅ Open Graph tags
-                og_tags = soup.find_all('meta', property=lambda x: x and x.startswith('og:'))
-                for tag in og_tags:
-                    if tag.has_attr('property') and tag.has_attr('content'):
-                        prop = tag['property']
-                        content = tag['content']
-                        open_graph[prop] = content.strip()
-
-                # ✅ Twitter meta tags
-                twitter_tags = soup.find_all('meta', attrs={'name': lambda x: x and x.startswith('twitter:')})
-                for tag in twitter_tags:
-                    if tag.has_attr('name') and tag.has_attr('content'):
-                        name = tag['name']
-                        content = tag['content']
-                        twitter_meta[name] = content.strip()
-
-                # ✅ All H1 tags
-                h1_tags = [tag.get_text(strip=True) for tag in soup.find_all('h1')]
-                all_h1 = h1_tags
-                h1 = h1_tags[0] if h1_tags else None
-
-                # ✅ Full headings structure (H1-H6)
-                for tag in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-                    headings.append(HeadingTag(
-                        tag=tag.name,
-                        text=tag.get_text(strip=True)
-                    ))
-
-                # ✅ JSON-LD Schema
-                json_ld_tag = soup.find('script', type='application/ld+json')
-                if json_ld_tag and json_ld_tag.string:
-                    schema_json_ld = json_ld_tag.string.strip()
-
-                # ✅ Alternate hreflang tags
-                for link in soup.find_all('link', rel='alternate'):
-                    if link.has_attr('hreflang') and link.has_attr('href'):
-                        hreflang = link['hreflang']
-                        href = link['href']
-                        alternate_hreflang.append(AlternateHreflang(
-                            hreflang=hreflang.strip(),
-                            href=href.strip()
-                        ))
-
-                # ✅ HTML lang attribute
-                html_tag = soup.find('html')
-                if html_tag and html_tag.has_attr('lang'):
-                    lang = html_tag['lang'].strip()
-
-                # ✅ Favicon
-                favicon_tag = soup.find('link', rel=lambda x: x and 'icon' in x)
-                if favicon_tag and favicon_tag.has_attr('href'):
-                    favicon_url = favicon_tag['href'].strip()
-
-            seo_checks = {}
-
-            # Title check
-            if title:
-                length = len(title)
-                seo_checks['title'] = {
-                    'passed': str(40 <= length <= 65),
-                    'message': f'Length: {length} characters'
-                }
-            else:
-                seo_checks['title'] = {
-                    'passed': 'False',
-                    'message': 'Missing title tag'
-                }
-
-            # Description check
-            if description:
-                length = len(description)
-                seo_checks['description'] = {
-                    'passed': str(50 <= length <= 160),
-                    'message': f'Length: {length} characters'
-                }
-            else:
-                seo_checks['description'] = {
-                    'passed': 'False',
-                    'message': 'Missing meta description'
-                }
-
-            # H1 check
-            seo_checks['h1'] = {
-                'passed': str(bool(h1)),
-                'message': f'H1 found: {h1}' if h1 else 'No H1 tag found'
-            }
-
-            # Multiple H1 check
-            seo_checks['all_h1'] = {
-                'passed': str(len(all_h1) == 1),
-                'message': f'{len(all_h1)} H1 tags found'
-            }
-
-            # Canonical matches
-            if canonical:
-                seo_checks['canonical'] = {
-                    'passed': str(canonical == final_url),
-                    'message': 'Canonical matches final URL' if canonical == final_url else 'Canonical does not match final URL'
-                }
-            else:
-                seo_checks['canonical'] = {
-                    'passed': 'False',
-                    'message': 'No canonical tag found'
-                }
-
-            # Robots meta noindex check
-            if robots_meta:
-                noindex = 'noindex' in robots_meta.lower()
-                seo_checks['robots_meta_noindex'] = {
-                    'passed': str(not noindex),
-                    'message': 'No noindex found' if not noindex else 'Contains noindex'
-                }
-            else:
-                seo_checks['robots_meta_noindex'] = {
-                    'passed': 'True',
-                    'message': 'No robots meta tag found'
-                }
-
-            # Open Graph basic check
-            required_og = ['og:title', 'og:description', 'og:image']
-            missing_og = [tag for tag in required_og if tag not in open_graph]
-            seo_checks['open_graph'] = {
-                'passed': str(len(missing_og) == 0),
-                'message': 'All required OG tags found' if not missing_og else f'Missing: {", ".join(missing_og)}'
-            }
-
-            message = f"URL checked successfully. Status: {status_code}"
-
-            return URLCheckResponse(
-                url=str(data.url),
-                http_status=status_code,
-                redirected=redirected,
-                final_url=final_url,
+            is_html = bool(content_type) and 'text/html' in content_type.lower()
+            page = None
+            body_bytes_read = read_stopped = None
+
+            # ✅ When no requested field needs the page, it is closed unread below
+            if needs_body and data.head_only:
+                # ✅ Parse while downloading, stop at </head>
+                if is_html or not content_type:
+                    head = await read_head(response, headings=data.with_headings and needs_headings, sniff=not content_type)
+                    page, body_bytes_read, read_stopped = head.page, head.bytes_read, head.stopped
+            elif needs_body:
+                body_bytes_read = len(response.content)
+                if is_html or (not content_type and looks_like_html(response.text)):
+                    # ✅ All fields in one pass (backend: settings.HTML_PARSER_BACKEND),
+                    # big pages in the parse pool so the event loop stays free
+                    page = await parse_pool.extract(response.content, response.encoding, headings=needs_headings)
+        finally:
+            # ✅ A streamed body is closed here whatever happened above, which
+            # frees its per-host connection slot (no-op once fully read)
+            await response.aclose()
+
+        rendered = None
+        if data.render and page is not None and browser_jobs is not None:
+            # ✅ Client-rendered pages: take the fields from the browser DOM
+            rendered, rendered_page = await render_and_compare(
+                final_url, page, data.render_wait, data.render_block, browser_jobs, parse_pool, needs_headings,
+                queue_timeout=render_queue_timeout
+            )
+            page = rendered_page or page
+
+        if page is not None:
+            title = page.title
+            description = page.description
+            robots_meta = page.robots_meta
+            canonical = page.canonical
+            open_graph = page.open_graph
+            twitter_meta = page.twitter_meta
+            all_h1 = page.all_h1
+            h1 = page.h1
+            headings = [HeadingTag(tag=tag, text=text) for tag, text in page.headings]
+            schema_json_ld = page.schema_json_ld
+            alternate_hreflang = [
+                AlternateHreflang(hreflang=hreflang, href=href)
+                for hreflang, href in page.alternate_hreflang
+            ]
+            lang = page.lang
+            favicon_url = page.favicon_url
+
+            # ✅ Check if canonical matches the final URL
+            canonical_matches = (canonical == final_url) if canonical else None
+
+        values = None
+        if wanted is None or 'seo_checks' in wanted:
+            # ✅ Declared rules (app/seo_rules.py, SEO_RULES_FILE); a rule is
+            # skipped when its field wasn't collected
+            values = dict(
                 title=title,
                 description=description,
                 canonical=canonical,
-                canonical_matches=canonical_matches,
-                h1=h1,
-                all_h1=all_h1,
-                headings=headings,
+                final_url=final_url,
                 robots_meta=robots_meta,
-                x_robots_tag=x_robots_tag,
-                content_type=content_type,
-                content_length=content_length,
-                headers=headers,
-                open_graph=open_graph,
-                twitter_meta=twitter_meta,
-                schema_json_ld=schema_json_ld,
-                alternate_hreflang=alternate_hreflang,
-                lang=lang,
-                favicon_url=favicon_url,
-                message=message,
-                seo_checks=seo_checks
+                open_graph=open_graph
             )
+            if not data.head_only or data.with_headings:
+                values.update(h1=h1, all_h1=all_h1)
+            if robots_txt is not None:
+                values.update(
+                    robots_txt_allowed=robots_txt.allowed,
+                    robots_txt_rule=robots_txt.rule.pattern if robots_txt.rule else None
+                )
+
+        message = f"URL checked successfully. Status: {status_code}"
+
+        return URLCheckResponse(
+            url=str(data.url),
+            http_status=status_code,
+            redirected=redirected,
+            final_url=final_url,
+            title=title,
+            description=description,
+            canonical=canonical,
+            canonical_matches=canonical_matches,
+            h1=h1,
+            all_h1=all_h1,
+            headings=headings,
+            robots_meta=robots_meta,
+            x_robots_tag=x_robots_tag,
+            content_type=content_type,
+            content_length=content_length,
+            headers=headers,
+            open_graph=open_graph,
+            twitter_meta=twitter_meta,
+            schema_json_ld=schema_json_ld,
+            alternate_hreflang=alternate_hreflang,
+            lang=lang,
+            favicon_url=favicon_url,
+            message=message,
+            seo_checks={},
+            redirect_hops=result.hops,
+            timings=timer.summary(result.responses),
+            robots_txt=robots_txt,
+            body_bytes_read=body_bytes_read,
+            read_stopped=read_stopped,
+            rendered=rendered
+        ), values
+
+    except httpx.RequestError as e:
+        return empty_url_response(
+            str(data.url),
+            f"Request failed: {str(e)}",
+            timings=timer.summary(),
+            robots_txt=robots_txt
+        ), None
+
+
+async def run_url_check(
+    data: URLCheckInput,
+    client: httpx.AsyncClient,
+    redirects: RedirectResolver,
+    robots_cache: RobotsCache,
+    parse_pool: ParsePool,
+    rules: RuleSet,
+    browser_jobs: Optional[BrowserJobQueue] = None,
+) -> URLCheckResponse:
+    """
+    One URL check with its SEO rules evaluated.
+    """
+    response, values = await collect_url_check(data, client, redirects, robots_cache, parse_pool, browser_jobs)
+    if values is not None:
+        response.seo_checks = rules.evaluate(values)
+    return response
+
+
+# ✅ Batch rule evaluation: every chunk of completed checks goes through the rules at once
+async def evaluate_chunks(
+    chunks: AsyncIterator[List[Tuple[URLCheckResponse, Optional[dict]]]],
+    rules: RuleSet
+) -> AsyncIterator[URLCheckResponse]:
+    try:
+        async for chunk in chunks:
+            evaluated = [(response, values) for response, values in chunk if values is not None]
+            checks = rules.evaluate_many([values for _, values in evaluated])
+            for (response, _), page_checks in zip(evaluated, checks):
+                response.seo_checks = page_checks
+            for response, _ in chunk:
+                yield response
+    finally:
+        await chunks.aclose()
 
-        except httpx.RequestError as e:
-            return URLCheckResponse(
-                url=str(data.url),
-                http_status=None,
-                redirected=False,
-                final_url=None,
-                title=None,
-                description=None,
-                canonical=None,
-                canonical_matches=None,
-                h1=None,
-                all_h1=[],
-                headings=[],
-                robots_meta=None,
-                x_robots_tag=None,
-                content_type=None,
-                content_length=None,
-                headers={},
-                open_graph={},
-                twitter_meta={},
-                schema_json_ld=None,
-                alternate_hreflang=[],
-                lang=None,
-                favicon_url=None,
-                message=f"Request failed: {str(e)}",
-                seo_checks=None
-            )
+
+# ✅ Main endpoint
+@router.post(
+    "/check-url",
+    summary="Check technical and SEO data for a URL",
+    response_description="Returns technical status and SEO-related information for the given URL.",
+    response_model=URLCheckResponse,
+    responses={
+        429: {"description": "Render mode only: browser queue full, retry after Retry-After seconds"},
+        503: {"description": "Render mode only: browser queue shut down"}
+    }
+)
+async def check_url(
+    data: URLCheckInput,
+    client: httpx.AsyncClient = Depends(get_http_client),
+    redirects: RedirectResolver = Depends(get_redirect_resolver),
+    robots_cache: RobotsCache = Depends(get_robots_cache),
+    parse_pool: ParsePool = Depends(get_parse_pool),
+    rules: RuleSet = Depends(get_rule_set),
+    browser_jobs: BrowserJobQueue = Depends(get_browser_jobs),
+):
+    try:
+        response = await run_url_check(data, client, redirects, robots_cache, parse_pool, rules, browser_jobs)
+    except (QueueFullError, QueueClosedError) as e:
+        # ✅ Render mode goes through the bounded browser queue: 429 / 503 when it is full or shut down
+        return queue_error_response(e)
+    return select_fields(response, data.fields)
+
+
+@router.post(
+    "/check-urls",
+    summary="Check many URLs and stream the results",
+    response_description="NDJSON stream with one URLCheckResponse per line, in completion order.",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}}
+)
+async def check_urls(
+    data: URLsCheckInput,
+    client: httpx.AsyncClient = Depends(get_http_client),
+    redirects: RedirectResolver = Depends(get_redirect_resolver),
+    robots_cache: RobotsCache = Depends(get_robots_cache),
+    parse_pool: ParsePool = Depends(get_parse_pool),
+    rules: RuleSet = Depends(get_rule_set),
+    browser_jobs: BrowserJobQueue = Depends(get_browser_jobs),
+):
+    """
+    **Overview:**
+
+    Bulk version of `/check-url` for auditing whole sections of a site. Every
+    URL gets the same checks and options (`check_robots`, `head_only`,
+    `with_headings`, `render`, `fields`), and each result is streamed as soon as it is ready.
+
+    - 🚦 **Concurrency:** at most `concurrency` checks run at once, and at most
+      `per_host_concurrency` against the same host.
+    - 🧵 **Parsing:** big pages are parsed in the parse pool (worker processes),
+      so pages that are still downloading are not held up by one being parsed.
+    - 📏 **SEO rules:** evaluated together for every chunk of checks that
+      finished at the same time (`RuleSet.evaluate_many`), not page by page.
+    - 🖥️ **Rendering:** with `render`, pages wait up to `BROWSER_QUEUE_WAIT` seconds
+      for room in the browser queue (no 429 inside a batch, `rendered.status` is
+      `queue_full` after that) and reuse the pool's warm sessions.
+    - 📤 **Streaming:** the response is NDJSON (`application/x-ndjson`), one
+      `URLCheckResponse` per line (only `fields` plus `url` and `message` when set).
+      Lines arrive in completion order, use `url` to match them to the input.
+
+    **Example request:**
+
+    ```json
+    {
+        "urls": ["https://example.com/a", "https://example.com/b"],
+        "concurrency": 20,
+        "fields": ["http_status", "title", "canonical"]
+    }
+    ```
+    """
+    options = data.model_dump(include=set(URLCheckOptions.model_fields))
+    chunks = run_bounded_chunks(
+        data.urls,
+        lambda url: collect_url_check(
+            URLCheckInput(url=url, **options), client, redirects, robots_cache, parse_pool, browser_jobs,
+            render_queue_timeout=settings.BROWSER_QUEUE_WAIT
+        ),
+        concurrency=data.concurrency,
+        per_key_concurrency=data.per_host_concurrency,
+        key=lambda url: (url.host or "").lower(),
+    )
+    include = {"url", "message", *data.fields} if data.fields is not None else None
+    return ndjson_response(evaluate_chunks(chunks, rules), include=include)
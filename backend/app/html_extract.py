@@ -0,0 +1,570 @@
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from bs4 import BeautifulSoup
+from bs4.dammit import EntitySubstitution
+
+from app import settings
+
+HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+
+# What BeautifulSoup's html.parser tree builder treats specially, mirrored
+# here so the single-pass extractor sees the same tree:
+# - void elements are closed right after their start tag
+VOID_TAGS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem', 'meta', 'param',
+    'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex', 'nextid', 'spacer',
+])
+# - text inside these (at any depth) is not part of get_text()
+STRING_CONTAINER_TAGS = frozenset(['rt', 'rp', 'style', 'script', 'template'])
+# - whitespace-only strings (even empty ones) become ' ' or '\n', except in these
+PRESERVE_WHITESPACE_TAGS = frozenset(['pre', 'textarea'])
+_ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+# - rel="a b" is a list of values
+_TOKEN_RE = re.compile(r"\S+")
+
+
+class PageData:
+    """
+    SEO fields extracted from an HTML page (plain values only, so it can be
+    pickled and sent between processes).
+    """
+
+    def __init__(self):
+        self.title: Optional[str] = None
+        self.description: Optional[str] = None
+        self.robots_meta: Optional[str] = None
+        self.canonical: Optional[str] = None
+        self.open_graph: Dict[str, str] = {}
+        self.twitter_meta: Dict[str, str] = {}
+        self.headings: List[Tuple[str, str]] = []  # (tag, text), H1-H6 in document order
+        self.schema_json_ld: Optional[str] = None
+        self.alternate_hreflang: List[Tuple[str, str]] = []  # (hreflang, href)
+        self.lang: Optional[str] = None
+        self.favicon_url: Optional[str] = None
+
+    @property
+    def all_h1(self) -> List[str]:
+        return [text for tag, text in self.headings if tag == "h1"]
+
+    @property
+    def h1(self) -> Optional[str]:
+        all_h1 = self.all_h1
+        return all_h1[0] if all_h1 else None
+
+    def as_dict(self) -> dict:
+        return dict(vars(self), all_h1=self.all_h1, h1=self.h1)
+
+
+def extract_soup(html: str, headings: bool = True) -> PageData:
+    """
+    Reference extractor: a BeautifulSoup tree searched once per field.
+    Slow on big pages; kept to check the other extractors against.
+    """
+    page = PageData()
+    soup = BeautifulSoup(html, 'html.parser')
+
+    if soup.title and soup.title.string:
+        page.title = soup.title.string.strip()
+
+    desc_tag = soup.find('meta', attrs={'name': 'description'})
+    if desc_tag and desc_tag.has_attr('content'):
+        page.description = desc_tag['content'].strip()
+
+    robots_tag = soup.find('meta', attrs={'name': 'robots'})
+    if robots_tag and robots_tag.has_attr('content'):
+        page.robots_meta = robots_tag['content'].strip()
+
+    canonical_tag = soup.find('link', rel='canonical')
+    if canonical_tag and canonical_tag.has_attr('href'):
+        page.canonical = canonical_tag['href'].strip()
+
+    for tag in soup.find_all('meta', property=lambda x: x and x.startswith('og:')):
+        if tag.has_attr('property') and tag.has_attr('content'):
+            page.open_graph[tag['property']] = tag['content'].strip()
+
+    for tag in soup.find_all('meta', attrs={'name': lambda x: x and x.startswith('twitter:')}):
+        if tag.has_attr('name') and tag.has_attr('content'):
+            page.twitter_meta[tag['name']] = tag['content'].strip()
+
+    if headings:
+        for tag in soup.find_all(list(HEADING_TAGS)):
+            page.headings.append((tag.name, tag.get_text(strip=True)))
+
+    json_ld_tag = soup.find('script', type='application/ld+json')
+    if json_ld_tag and json_ld_tag.string:
+        page.schema_json_ld = json_ld_tag.string.strip()
+
+    for link in soup.find_all('link', rel='alternate'):
+        if link.has_attr('hreflang') and link.has_attr('href'):
+            page.alternate_hreflang.append((link['hreflang'].strip(), link['href'].strip()))
+
+    html_tag = soup.find('html')
+    if html_tag and html_tag.has_attr('lang'):
+        page.lang = html_tag['lang'].strip()
+
+    favicon_tag = soup.find('link', rel=lambda x: x and 'icon' in x)
+    if favicon_tag and favicon_tag.has_attr('href'):
+        page.favicon_url = favicon_tag['href'].strip()
+
+    return page
+
+
+class _Node:
+    """
+    An element whose text is needed (title, headings, JSON-LD script) or
+    one nested in such an element. Children are _Node or
+    `(text, counts_for_get_text)` tuples.
+    """
+    __slots__ = ("children",)
+
+    def __init__(self):
+        self.children = []
+
+
+def _node_string(node: _Node) -> Optional[str]:
+    # Tag.string: the only child string, looking through single-child tags
+    while len(node.children) == 1:
+        child = node.children[0]
+        if isinstance(child, tuple):
+            return child[0]
+        node = child
+    return None
+
+
+def _node_text(node: _Node) -> str:
+    # Tag.get_text(strip=True)
+    parts = []
+    pending = [iter(node.children)]
+    while pending:
+        for child in pending[-1]:
+            if isinstance(child, tuple):
+                if child[1]:
+                    text = child[0].strip()
+                    if text:
+                        parts.append(text)
+            else:
+                pending.append(iter(child.children))
+                break
+        else:
+            pending.pop()
+    return "".join(parts)
+
+
+class SinglePassExtractor(HTMLParser):
+    """
+    Collects every PageData field during one html.parser pass, with no tree.
+
+    It is driven by the same tokenizer as BeautifulSoup's 'html.parser'
+    builder and replays its tree rules: void elements, how end tags pop
+    the stack, string container types, and entity and charref decoding.
+    Attribute fields are read from start tags as they arrive. Text is
+    only kept for the title, the headings and the first JSON-LD script.
+    The result is therefore the same as `extract_soup`.
+
+    It can be fed in pieces. With `stop_at_head=True`, `head_done` turns
+    True at `</head>` or `<body>`, after which the caller may stop
+    feeding. With `headings=False`, H1-H6 are skipped.
+    """
+
+    def __init__(self, headings: bool = True, stop_at_head: bool = False):
+        super().__init__(convert_charrefs=False)
+        self.page = PageData()
+        self.headings = headings
+        self.stop_at_head = stop_at_head
+        self.head_done = False
+        # Open elements as (name, _Node or None); index 0 is the document
+        self._stack: List[Tuple[Optional[str], Optional[_Node]]] = [(None, None)]
+        self._open_counts: Dict[str, int] = {}
+        self._containers: list = []
+        self._preserving: list = []
+        self._data: List[str] = []
+        self._closed_void: List[str] = []
+        self._title: Optional[_Node] = None
+        self._json_ld: Optional[_Node] = None
+        self._headings: List[Tuple[str, _Node]] = []
+        self._seen = set()  # first-match fields already decided
+
+    def result(self) -> PageData:
+        page = self.page
+        if self._title is not None:
+            title = _node_string(self._title)
+            if title:
+                page.title = title.strip()
+        if self._json_ld is not None:
+            json_ld = _node_string(self._json_ld)
+            if json_ld:
+                page.schema_json_ld = json_ld.strip()
+        page.headings = [(name, _node_text(node)) for name, node in self._headings]
+        return page
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    # -- tree bookkeeping ------------------------------------------------------
+
+    def _flush(self, kind: Optional[str] = None):
+        if not self._data:
+            return
+        text = "".join(self._data)
+        self._data = []
+        node = self._stack[-1][1]
+        if node is None:
+            return
+        if not self._preserving and not text.strip(_ASCII_SPACES):
+            text = '\n' if '\n' in text else ' '
+        # Plain strings count unless inside a string container; comments,
+        # doctypes and PIs never do, CDATA always does
+        counts = not self._containers if kind is None else kind == "cdata"
+        node.children.append((text, counts))
+
+    def _pop_to(self, name: str):
+        if not self._open_counts.get(name):
+            return
+        stack = self._stack
+        while len(stack) > 1:
+            frame = stack.pop()
+            self._open_counts[frame[0]] -= 1
+            if self._containers and self._containers[-1] is frame:
+                self._containers.pop()
+            if self._preserving and self._preserving[-1] is frame:
+                self._preserving.pop()
+            if frame[0] == name:
+                return
+
+    # -- HTMLParser events -----------------------------------------------------
+
+    def handle_starttag(self, tag, attrs, close_void=True):
+        values = {}
+        for key, value in attrs:
+            values[key] = '' if value is None else value
+        self._flush()
+
+        parent = self._stack[-1][1]
+        node = _Node() if parent is not None else None
+        if parent is not None:
+            parent.children.append(node)
+
+        if tag in HEADING_TAGS:
+            if self.headings:
+                node = node or _Node()
+                self._headings.append((tag, node))
+        elif tag == "meta":
+            self._meta(values)
+        elif tag == "link":
+            self._link(values)
+        elif tag == "title":
+            if self._title is None:
+                node = self._title = node or _Node()
+        elif tag == "script":
+            if self._json_ld is None and values.get("type") == "application/ld+json":
+                node = self._json_ld = node or _Node()
+        elif tag == "body":
+            self.head_done = self.stop_at_head
+        elif tag == "html":
+            if "html" not in self._seen:
+                self._seen.add("html")
+                if "lang" in values:
+                    self.page.lang = values["lang"].strip()
+
+        frame = (tag, node)
+        self._stack.append(frame)
+        self._open_counts[tag] = self._open_counts.get(tag, 0) + 1
+        if tag in STRING_CONTAINER_TAGS:
+            self._containers.append(frame)
+        if tag in PRESERVE_WHITESPACE_TAGS:
+            self._preserving.append(frame)
+
+        if close_void and tag in VOID_TAGS:
+            self.handle_endtag(tag, check_already_closed=False)
+            self._closed_void.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, close_void=False)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag, check_already_closed=True):
+        if check_already_closed and tag in self._closed_void:
+            # </br> after <br>: already closed
+            self._closed_void.remove(tag)
+            return
+        self._flush()
+        self._pop_to(tag)
+        if tag == "head":
+            self.head_done = self.stop_at_head
+
+    def handle_data(self, data):
+        self._data.append(data)
+
+    def handle_charref(self, name):
+        if name.startswith(('x', 'X')):
+            number = int(name.lstrip('xX'), 16)
+        else:
+            number = int(name)
+        data = None
+        if number < 256:
+            try:
+                data = bytearray([number]).decode('windows-1252')
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(number)
+            except (ValueError, OverflowError):
+                pass
+        self.handle_data(data or "\N{REPLACEMENT CHARACTER}")
+
+    def handle_entityref(self, name):
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self.handle_data(character if character is not None else "&%s" % name)
+
+    def handle_comment(self, data):
+        self._flush()
+        self._data.append(data)
+        self._flush("comment")
+
+    def handle_decl(self, data):
+        self._flush()
+        self._data.append(data[len("DOCTYPE "):])
+        self._flush("declaration")
+
+    def unknown_decl(self, data):
+        self._flush()
+        if data.upper().startswith('CDATA['):
+            self._data.append(data[len('CDATA['):])
+            self._flush("cdata")
+        else:
+            self._data.append(data)
+            self._flush("declaration")
+
+    def handle_pi(self, data):
+        self._flush()
+        self._data.append(data)
+        self._flush("pi")
+
+    # -- fields ----------------------------------------------------------------
+
+    def _first(self, field: str) -> bool:
+        if field in self._seen:
+            return False
+        self._seen.add(field)
+        return True
+
+    def _meta(self, values: Dict[str, str]):
+        page = self.page
+        name = values.get("name")
+        content = values.get("content")
+        if name == "description" and self._first("description") and content is not None:
+            page.description = content.strip()
+        elif name == "robots" and self._first("robots") and content is not None:
+            page.robots_meta = content.strip()
+        if name and name.startswith("twitter:") and content is not None:
+            page.twitter_meta[name] = content.strip()
+
+        prop = values.get("property")
+        if prop and prop.startswith("og:") and content is not None:
+            page.open_graph[prop] = content.strip()
+
+    def _link(self, values: Dict[str, str]):
+        rel = values.get("rel")
+        if rel is None:
+            return
+        tokens = _TOKEN_RE.findall(rel)
+        page = self.page
+        href = values.get("href")
+        if "canonical" in tokens and self._first("canonical") and href is not None:
+            page.canonical = href.strip()
+        if "alternate" in tokens and href is not None and "hreflang" in values:
+            page.alternate_hreflang.append((values["hreflang"].strip(), href.strip()))
+        if any("icon" in token for token in tokens) and self._first("favicon") and href is not None:
+            page.favicon_url = href.strip()
+
+
+def extract_single_pass(html: str, headings: bool = True) -> PageData:
+    extractor = SinglePassExtractor(headings=headings)
+    extractor.feed(html)
+    extractor.close()
+    return extractor.result()
+
+
+def looks_like_html(text: str) -> bool:
+    """
+    Whether a body served without Content-Type starts like an HTML document.
+    """
+    snippet = text.lstrip().lower()
+    return snippet.startswith('<!doctype html') or snippet.startswith('<html')
+
+
+# Enough non-whitespace text to decide `looks_like_html`
+_SNIFF_CHARS = len('<!doctype html')
+
+
+class HeadRead:
+    """
+    Outcome of `read_head`:
+    - `page`: the extracted fields, None if the body wasn't HTML;
+    - `bytes_read`: decoded body bytes read before stopping;
+    - `stopped`: "head_end" or "max_bytes", None if the whole body was read.
+    """
+
+    def __init__(self):
+        self.page: Optional[PageData] = None
+        self.bytes_read = 0
+        self.stopped: Optional[str] = None
+
+
+async def read_head(
+    response: httpx.Response,
+    max_bytes: int = settings.HEAD_ONLY_MAX_BYTES,
+    headings: bool = False,
+    sniff: bool = False,
+) -> HeadRead:
+    """
+    Parses a streamed response while it downloads and stops reading at
+    `</head>` (or `<body>`) or after `max_bytes`. With `headings=True` the
+    body is read on for H1-H6, still up to `max_bytes`. With `sniff=True`
+    (no Content-Type) it is only parsed if `looks_like_html`.
+
+    Always uses the single-pass extractor. The caller closes the response,
+    which drops the connection if the body wasn't read to the end.
+    """
+    read = HeadRead()
+    extractor = SinglePassExtractor(headings=headings, stop_at_head=not headings)
+    try:
+        decoder = codecs.getincrementaldecoder(response.charset_encoding or "utf-8")(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = "" if sniff else None
+
+    async for chunk in response.aiter_bytes():
+        read.bytes_read += len(chunk)
+        text = decoder.decode(chunk)
+        if pending is not None:
+            pending += text
+            if len(pending.lstrip()) < _SNIFF_CHARS and read.bytes_read < max_bytes:
+                continue
+            if not looks_like_html(pending):
+                return read
+            text, pending = pending, None
+        extractor.feed(text)
+        if extractor.head_done:
+            read.stopped = "head_end"
+            break
+        if read.bytes_read >= max_bytes:
+            read.stopped = "max_bytes"
+            break
+    else:
+        text = (pending or "") + decoder.decode(b"", final=True)
+        if pending is not None and not looks_like_html(text):
+            return read
+        extractor.feed(text)
+        extractor.close()
+
+    if read.stopped is not None:
+        # Keep the text read so far (a title cut by the cap) but leave a
+        # half-received tag alone rather than turning it into text
+        extractor._flush()
+    read.page = extractor.result()
+    return read
+
+
+def _lxml_text(element) -> str:
+    parts = []
+
+    def walk(el, counts):
+        counts = counts and el.tag not in STRING_CONTAINER_TAGS
+        if counts and el.text:
+            parts.append(el.text.strip())
+        for child in el:
+            if isinstance(child.tag, str):
+                walk(child, counts)
+            if counts and child.tail:
+                parts.append(child.tail.strip())
+
+    walk(element, True)
+    return "".join(parts)
+
+
+def extract_lxml(html: str, headings: bool = True) -> PageData:
+    """
+    Same fields from an lxml (libxml2) tree, walked once. Several times
+    faster than html.parser, but libxml2 repairs broken markup its own way
+    (implied end tags, misplaced <meta> moved into <head>, ...), so on
+    malformed pages the result can differ from `extract_soup`.
+    """
+    from lxml import etree
+
+    page = PageData()
+    root = etree.fromstring(html.encode("utf-8", "replace"), etree.HTMLParser(encoding="utf-8"))
+    if root is None:
+        return page
+
+    extractor = SinglePassExtractor()
+    title = json_ld = None
+    for el in root.iter():
+        tag = el.tag
+        if not isinstance(tag, str):
+            continue
+        values = {key: value or '' for key, value in el.attrib.items()}
+        if tag in HEADING_TAGS:
+            if headings:
+                page.headings.append((tag, _lxml_text(el)))
+        elif tag == "meta":
+            extractor._meta(values)
+        elif tag == "link":
+            extractor._link(values)
+        elif tag == "title" and title is None:
+            title = el
+        elif tag == "script" and json_ld is None and values.get("type") == "application/ld+json":
+            json_ld = el
+        elif tag == "html" and page.lang is None and "lang" in values:
+            page.lang = values["lang"].strip()
+
+    for field in ("description", "robots_meta", "canonical", "open_graph", "twitter_meta", "alternate_hreflang", "favicon_url"):
+        setattr(page, field, getattr(extractor.page, field))
+    if title is not None and len(title) == 0 and title.text:
+        page.title = title.text.strip()
+    if json_ld is not None and json_ld.text:
+        page.schema_json_ld = json_ld.text.strip()
+    return page
+
+
+def _lxml_available() -> bool:
+    try:
+        import lxml.etree  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_backend(backend: str) -> str:
+    if backend == "lxml" and not _lxml_available():
+        print("⚠️ HTML parser backend 'lxml' requested but lxml is not installed, falling back to html.parser")
+        return "html.parser"
+    return backend
+
+
+EXTRACTORS = {
+    "html.parser": extract_single_pass,
+    "lxml": extract_lxml,
+    "soup": extract_soup,
+}
+
+_default_backend: Optional[str] = None
+
+
+def extract_page(html: str, backend: Optional[str] = None, headings: bool = True) -> PageData:
+    """
+    Extracts the SEO fields of an HTML page with the configured backend
+    (settings.HTML_PARSER_BACKEND). `headings=False` skips H1-H6.
+    """
+    global _default_backend
+    if backend is None:
+        if _default_backend is None:
+            _default_backend = resolve_backend(settings.HTML_PARSER_BACKEND)
+        backend = _default_backend
+    return EXTRACTORS[backend](html, headings=headings)
@@ -0,0 +1,153 @@
+from typing import Optional
+
+import httpx
+from fastapi import Request
+
+from app import settings
+from app.concurrency import KeyedLimiter
+from app.dns_cache import CachedDNSNetworkBackend, CachingResolver, get_dns_resolver
+
+# Timeout profiles used by the routers (see settings.*_TIMEOUT)
+TIMEOUTS = {
+    "domain": httpx.Timeout(settings.DOMAIN_TIMEOUT),
+    "url": httpx.Timeout(settings.URL_TIMEOUT),
+    "sitemap": httpx.Timeout(settings.SITEMAP_TIMEOUT),
+    "robots": httpx.Timeout(settings.ROBOTS_TIMEOUT),
+    "sweep": httpx.Timeout(settings.SWEEP_TIMEOUT),
+}
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """
+    Wraps a response stream and frees the per-host slot once the body is closed.
+    """
+
+    def __init__(self, stream: httpx.AsyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Transport wrapper that caps the number of in-flight requests per host.
+
+    httpx only supports a global connection limit, so the per-host cap is
+    enforced here with one semaphore per (scheme, host, port). A slot is held
+    until the response body is closed, not just until the headers arrive.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_per_host: int):
+        self._transport = transport
+        self._limiter = KeyedLimiter(max_per_host)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = (request.url.scheme, request.url.host, request.url.port)
+        await self._limiter.acquire(key)
+
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self._limiter.release(key)
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            release()
+            raise
+
+        if isinstance(response.stream, httpx.ByteStream):
+            # Body already in memory, no connection is held
+            release()
+        else:
+            response.stream = _ReleasingStream(response.stream, release)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_http_client(
+    max_connections: Optional[int] = None,
+    max_keepalive_connections: Optional[int] = None,
+    max_connections_per_host: Optional[int] = None,
+    keepalive_expiry: Optional[float] = None,
+    http2: Optional[bool] = None,
+    resolver: Optional[CachingResolver] = None,
+) -> httpx.AsyncClient:
+    """
+    Builds the app-wide pooled client. Arguments default to values from settings.
+
+    When `resolver` is given, host names are resolved through its cache
+    instead of the system resolver.
+    """
+    http2 = settings.HTTP2_ENABLED if http2 is None else http2
+    if http2 and not _http2_available():
+        # requirements.txt installs httpx[http2]; this only happens in trimmed environments
+        print("⚠️ HTTP/2 requested but the 'h2' package is not installed, falling back to HTTP/1.1")
+        http2 = False
+
+    if max_connections is None:
+        max_connections = settings.HTTP_MAX_CONNECTIONS
+    if max_keepalive_connections is None:
+        max_keepalive_connections = settings.HTTP_MAX_KEEPALIVE_CONNECTIONS
+    if max_connections_per_host is None:
+        max_connections_per_host = settings.HTTP_MAX_CONNECTIONS_PER_HOST
+    if keepalive_expiry is None:
+        keepalive_expiry = settings.HTTP_KEEPALIVE_EXPIRY
+    if max_connections < 1 or max_connections_per_host < 1:
+        # 0 would make every request wait forever for a slot
+        raise ValueError("max_connections and max_connections_per_host must be at least 1")
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+    http_transport = httpx.AsyncHTTPTransport(limits=limits, http2=http2)
+    if resolver is not None:
+        # httpx doesn't expose the network backend, so set it on the httpcore pool
+        http_transport._pool._network_backend = CachedDNSNetworkBackend(resolver)
+    transport = HostLimitedTransport(
+        http_transport,
+        max_per_host=max_connections_per_host,
+    )
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=TIMEOUTS["url"],
+        follow_redirects=True,
+    )
+
+
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    """
+    FastAPI dependency returning the shared client created in the app lifespan.
+
+    Falls back to creating it lazily when the lifespan hook did not run
+    (e.g. when the app is driven through ASGITransport in tests).
+    """
+    client = getattr(request.app.state, "http_client", None)
+    if client is None:
+        client = create_http_client(resolver=get_dns_resolver(request))
+        request.app.state.http_client = client
+    return client
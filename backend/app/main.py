@@ -1,12 +1,53 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.selenium_runner import run_selenium
+from app.browser_jobs import BrowserJob, BrowserJobQueue, get_browser_jobs
+from app.browser_pool import BrowserPool
+from app.dns_cache import CachingResolver
+from app.http_client import create_http_client
+from app.parse_pool import ParsePool
+from app.redirects import RedirectResolver
+from app.result_cache import ResultCache
+from app.robots import RobotsCache
+from app.seo_rules import RuleSet
+from app.sitemap_cache import SitemapDiskCache
+from app import settings
+from app.endpoint import browser
 from app.endpoint import domain
 from app.endpoint import sitemap
 from app.endpoint import url
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared by all routers: DNS cache, pooled HTTP client and redirect hop cache
+    app.state.dns_resolver = CachingResolver()
+    app.state.http_client = create_http_client(resolver=app.state.dns_resolver)
+    app.state.redirect_resolver = RedirectResolver()
+    app.state.robots_cache = RobotsCache()
+    # HTML parsing of big pages, off the event loop
+    app.state.parse_pool = ParsePool()
+    # SEO check rules, compiled once (a broken SEO_RULES_FILE fails startup)
+    app.state.seo_rules = RuleSet.from_config()
+    # Warm Chrome sessions for browser work, started in the background
+    app.state.browser_pool = BrowserPool()
+    if settings.BROWSER_POOL_WARM:
+        app.state.browser_pool.start_warming()
+    app.state.browser_jobs = BrowserJobQueue(app.state.browser_pool)
+    # Parsed sitemaps kept between paginated requests, and on disk for conditional GETs
+    app.state.sitemap_results = ResultCache()
+    if settings.SITEMAP_CACHE_ENABLED:
+        app.state.sitemap_cache = SitemapDiskCache()
+    yield
+    await app.state.http_client.aclose()
+    app.state.parse_pool.shutdown()
+    app.state.browser_jobs.close()
+    app.state.browser_pool.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,12 +60,18 @@ app.add_middleware(
 app.include_router(domain.router, prefix="/domain")
 app.include_router(sitemap.router, prefix="/sitemap")
 app.include_router(url.router, prefix="/url")
+app.include_router(browser.router, prefix="/browser")
 
 @app.get("/")
 def root():
     return {"message": "SEO backend is running 🚀"}
 
 @app.get("/test-selenium")
-def test_selenium():
-    title = run_selenium()
-    return {"page_title": title}
\ No newline at end of file
+async def test_selenium(jobs: BrowserJobQueue = Depends(get_browser_jobs)):
+    # Queued like any browser job: a 429 when the browsers are busy, never a blocked server thread
+    job = await browser.submit_job(jobs, "google_search", {}, settings.BROWSER_JOB_TIMEOUT)
+    if not isinstance(job, BrowserJob):
+        return job
+    if job.status != "done":
+        return {"page_title": None, "status": job.status, "error": job.error}
+    return {"page_title": job.result}
\ No newline at end of file
@@ -0,0 +1,193 @@
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from pydantic import BaseModel, Field
+
+from app.resource_blocking import resource_type
+
+# Run with execute_async_script(PERFORMANCE_SCRIPT, settle_ms) once the page
+# is ready. Buffered observers also get the LCP and layout-shift entries
+# recorded before they were created; `settle_ms` leaves time for late ones.
+PERFORMANCE_SCRIPT = """
+    const done = arguments[arguments.length - 1];
+    const settle = arguments[0];
+    const result = {lcp: null, layout_shifts: []};
+    const observe = (type, handler) => {
+        try {
+            new PerformanceObserver(list => list.getEntries().forEach(handler)).observe({type, buffered: true});
+        } catch (e) {}  // entry type not supported
+    };
+    observe('largest-contentful-paint', entry => {
+        result.lcp = {
+            start: entry.renderTime || entry.loadTime || entry.startTime,
+            element: entry.element ? entry.element.tagName.toLowerCase() : null,
+            url: entry.url || null
+        };
+    });
+    observe('layout-shift', entry => {
+        if (!entry.hadRecentInput) result.layout_shifts.push({start: entry.startTime, value: entry.value});
+    });
+    setTimeout(() => {
+        const navigation = performance.getEntriesByType('navigation')[0];
+        result.navigation = navigation ? navigation.toJSON() : null;
+        result.paint = performance.getEntriesByType('paint').map(entry => ({name: entry.name, start: entry.startTime}));
+        result.resources = performance.getEntriesByType('resource').map(entry => ({
+            url: entry.name,
+            initiator: entry.initiatorType,
+            duration: entry.duration,
+            transfer_size: entry.transferSize,
+            decoded_size: entry.decodedBodySize
+        }));
+        done(result);
+    }, settle);
+"""
+
+# initiatorType values that say more than the URL does
+INITIATOR_TYPES = {
+    "img": "image",
+    "script": "script",
+    "link": "stylesheet",
+    "video": "media",
+    "audio": "media",
+    "fetch": "xhr",
+    "xmlhttprequest": "xhr",
+    "beacon": "xhr",
+}
+
+
+class NavigationTiming(BaseModel):
+    """
+    Navigation Timing phases of the page request, in milliseconds. The
+    dom_* and load values are offsets from the start of the navigation.
+    """
+    redirect: float = 0
+    dns: float = 0
+    connect: float = 0  # TCP + TLS
+    tls: float = 0
+    ttfb: float = 0  # navigation start to first response byte
+    download: float = 0
+    dom_interactive: float = 0
+    dom_content_loaded: float = 0
+    load: float = 0
+
+
+class ResourceGroup(BaseModel):
+    count: int = 0
+    transfer_bytes: int = 0  # 0 for cross-origin resources without Timing-Allow-Origin
+    decoded_bytes: int = 0
+    total_duration_ms: float = 0
+    max_duration_ms: float = 0
+
+
+class PagePerformance(BaseModel):
+    url: str
+    final_url: Optional[str] = None
+    ready: bool = False
+    navigation: Optional[NavigationTiming] = None
+    first_paint: Optional[float] = None
+    first_contentful_paint: Optional[float] = None
+    largest_contentful_paint: Optional[float] = None
+    lcp_element: Optional[str] = None
+    cumulative_layout_shift: float = 0
+    request_count: int = 0
+    transfer_bytes: int = 0
+    transfer_bytes_source: str = "resource_timing"  # or "proxy" (selenium-wire's captured responses)
+    resources: Dict[str, ResourceGroup] = Field(default_factory=dict)
+    elapsed: Optional[float] = None  # seconds in the browser
+
+
+def _ms(value) -> float:
+    return round(max(value or 0, 0), 1)
+
+
+def navigation_timing(entry: dict) -> NavigationTiming:
+    def span(start, end):
+        return _ms(entry.get(end, 0) - entry.get(start, 0)) if entry.get(start) else 0
+
+    secure = entry.get("secureConnectionStart") or 0
+    return NavigationTiming(
+        redirect=span("redirectStart", "redirectEnd"),
+        dns=span("domainLookupStart", "domainLookupEnd"),
+        connect=span("connectStart", "connectEnd"),
+        tls=_ms(entry.get("connectEnd", 0) - secure) if secure else 0,
+        ttfb=_ms(entry.get("responseStart")),
+        download=span("responseStart", "responseEnd"),
+        dom_interactive=_ms(entry.get("domInteractive")),
+        dom_content_loaded=_ms(entry.get("domContentLoadedEventEnd")),
+        load=_ms(entry.get("loadEventEnd")),
+    )
+
+
+def cumulative_layout_shift(shifts: List[dict]) -> float:
+    """
+    CLS as Chrome reports it: the largest session window of shifts (each
+    less than 1s after the previous one, at most 5s long).
+    """
+    best = current = 0.0
+    window_start = previous = None
+    for shift in sorted(shifts, key=lambda shift: shift["start"]):
+        start = shift["start"]
+        if previous is None or start - previous > 1000 or start - window_start > 5000:
+            window_start, current = start, 0.0
+        current += shift["value"]
+        previous = start
+        best = max(best, current)
+    return round(best, 4)
+
+
+def resource_group(resource: dict) -> str:
+    initiator = INITIATOR_TYPES.get(resource.get("initiator"))
+    if initiator in ("xhr", "image", "script", "media"):
+        return initiator
+    kind = resource_type(resource["url"], {})
+    if kind != "other":
+        return kind
+    return initiator or "other"
+
+
+def summarize_performance(
+    url: str,
+    raw: dict,
+    final_url: Optional[str] = None,
+    ready: bool = False,
+    proxy_bytes: Optional[int] = None,
+    elapsed: Optional[float] = None,
+) -> PagePerformance:
+    """
+    PagePerformance from what PERFORMANCE_SCRIPT returned. `proxy_bytes`
+    (bytes the selenium-wire proxy saw) replaces the Resource Timing
+    transfer sizes, which are 0 for most third-party resources.
+    """
+    entry = raw.get("navigation")
+    paints = {paint["name"]: _ms(paint["start"]) for paint in raw.get("paint") or ()}
+    lcp = raw.get("lcp") or {}
+
+    groups: Dict[str, ResourceGroup] = {}
+    for resource in raw.get("resources") or ():
+        if urlsplit(resource["url"]).scheme not in ("http", "https"):
+            continue  # data: URIs and the like
+        group = groups.setdefault(resource_group(resource), ResourceGroup())
+        group.count += 1
+        group.transfer_bytes += int(resource.get("transfer_size") or 0)
+        group.decoded_bytes += int(resource.get("decoded_size") or 0)
+        duration = _ms(resource.get("duration"))
+        group.total_duration_ms = round(group.total_duration_ms + duration, 1)
+        group.max_duration_ms = max(group.max_duration_ms, duration)
+
+    timing_bytes = int((entry or {}).get("transferSize") or 0) + sum(group.transfer_bytes for group in groups.values())
+    return PagePerformance(
+        url=url,
+        final_url=final_url,
+        ready=ready,
+        navigation=navigation_timing(entry) if entry else None,
+        first_paint=paints.get("first-paint"),
+        first_contentful_paint=paints.get("first-contentful-paint"),
+        largest_contentful_paint=_ms(lcp["start"]) if lcp.get("start") is not None else None,
+        lcp_element=lcp.get("element"),
+        cumulative_layout_shift=cumulative_layout_shift(raw.get("layout_shifts") or []),
+        request_count=(1 if entry else 0) + sum(group.count for group in groups.values()),
+        transfer_bytes=proxy_bytes if proxy_bytes is not None else timing_bytes,
+        transfer_bytes_source="proxy" if proxy_bytes is not None else "resource_timing",
+        resources=groups,
+        elapsed=elapsed,
+    )
@@ -0,0 +1,84 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from fastapi import Request
+
+from app import settings
+from app.html_extract import PageData, extract_page, resolve_backend
+
+
+def extract_bytes(body: bytes, encoding: str, backend: str, headings: bool = True) -> PageData:
+    """
+    Worker side: decodes the body the way httpx's `Response.text` does,
+    then extracts it.
+    """
+    return extract_page(body.decode(encoding, errors="replace"), backend, headings=headings)
+
+
+class ParsePool:
+    """
+    Runs HTML extraction off the event loop, so one big page doesn't stall
+    every other request of the process.
+
+    Bodies up to `inline_max_bytes` are parsed right on the loop; a pool
+    round trip costs more than they do. Bigger ones go to `workers`
+    processes: only the raw bytes are sent over, and a PageData of plain
+    values comes back. The lxml backend releases the GIL while it parses,
+    so with it (or with `workers=0`) a thread pool is used instead.
+
+    The executor is started on first use. Worker processes are spawned,
+    not forked, since the server process already runs threads.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.HTML_PARSE_WORKERS,
+        inline_max_bytes: int = settings.HTML_PARSE_INLINE_MAX_BYTES,
+        backend: Optional[str] = None,
+    ):
+        self.backend = resolve_backend(backend or settings.HTML_PARSER_BACKEND)
+        self.inline_max_bytes = inline_max_bytes
+        self.use_threads = workers <= 0 or self.backend == "lxml"
+        self.workers = max(workers, 1)
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_threads:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="html-parse")
+            else:
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def extract(self, body: bytes, encoding: str = "utf-8", headings: bool = True) -> PageData:
+        if len(body) <= self.inline_max_bytes:
+            return extract_bytes(body, encoding, self.backend, headings)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._get_executor(), extract_bytes, body, encoding, self.backend, headings
+            )
+        except BrokenProcessPool:
+            # A worker died (out of memory on a huge page?): start a fresh pool next time
+            print("⚠️ HTML parse pool broke, restarting it")
+            self.shutdown()
+            return await asyncio.to_thread(extract_bytes, body, encoding, self.backend, headings)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def get_parse_pool(request: Request) -> ParsePool:
+    """
+    FastAPI dependency returning the shared HTML parse pool.
+    """
+    pool = getattr(request.app.state, "parse_pool", None)
+    if pool is None:
+        pool = ParsePool()
+        request.app.state.parse_pool = pool
+    return pool
@@ -0,0 +1,140 @@
+import asyncio
+import ipaddress
+import socket
+import threading
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+from app import settings
+
+
+class PrivateHostError(ValueError):
+    """
+    The URL points at a local, private or reserved address: the browser
+    must not load it (its HTML comes back to the caller).
+    """
+
+
+def is_local_name(host: str) -> bool:
+    host = host.lower().rstrip(".")
+    return host == "localhost" or host.endswith(".localhost")
+
+
+def literal_address(host: str) -> Optional[str]:
+    """
+    The host itself when it is an IP address, else None.
+    """
+    try:
+        return str(ipaddress.ip_address(host.strip("[]")))
+    except ValueError:
+        return None
+
+
+def non_global_address(addresses: Iterable[str]) -> Optional[str]:
+    """
+    The first address that isn't on the public internet, None if all are.
+    """
+    for address in addresses:
+        # getaddrinfo gives IPv6 addresses with a zone ("fe80::1%eth0")
+        if not ipaddress.ip_address(address.split("%", 1)[0]).is_global:
+            return address
+    return None
+
+
+def check_host(host: str, addresses: Iterable[str] = ()) -> None:
+    """
+    Raises PrivateHostError for a local name, or when the host (an IP
+    literal) or any address it resolves to isn't global.
+    """
+    if is_local_name(host):
+        raise PrivateHostError(f"Local host {host!r} can't be loaded in the browser")
+    literal = literal_address(host)
+    address = non_global_address([literal] if literal else addresses)
+    if address is not None:
+        raise PrivateHostError(f"{host!r} resolves to {address}: private, loopback and reserved addresses can't be loaded in the browser")
+
+
+def _addresses(infos) -> List[str]:
+    return [info[4][0] for info in infos]
+
+
+def resolve_host(host: str) -> List[str]:
+    """
+    Addresses of `host` from the system resolver (the one the browser
+    uses), [] when it doesn't resolve: such a page can't load anyway.
+    """
+    try:
+        return _addresses(socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP))
+    except (socket.gaierror, UnicodeError):
+        return []
+
+
+async def ensure_public_url(url: str) -> None:
+    """
+    Resolves the URL's host without blocking the event loop and raises
+    PrivateHostError if the browser would reach a non-global address.
+    No-op with BROWSER_ALLOW_PRIVATE_HOSTS.
+    """
+    if settings.BROWSER_ALLOW_PRIVATE_HOSTS:
+        return
+    host = urlsplit(url).hostname or ""
+    addresses = []
+    if not is_local_name(host) and literal_address(host) is None:
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+            addresses = _addresses(infos)
+        except (socket.gaierror, UnicodeError):
+            pass
+    check_host(host, addresses)
+
+
+class HostGuard:
+    """
+    selenium-wire request interceptor that aborts every request of the
+    browser (the page, its redirects and subresources) to a non-global
+    address, then hands the rest to `then` (e.g. a BlockingRecorder).
+    Called from the proxy threads; each host is resolved once per guard.
+    """
+
+    def __init__(self, then=None, resolve=resolve_host):
+        self.then = then
+        self.resolve = resolve
+        self.refused = 0
+        self._verdicts: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def allowed(self, url: str) -> bool:
+        if settings.BROWSER_ALLOW_PRIVATE_HOSTS:
+            return True
+        try:
+            host = (urlsplit(url).hostname or "").lower()
+        except ValueError:
+            return False
+        with self._lock:
+            verdict = self._verdicts.get(host)
+        if verdict is None:
+            try:
+                check_host(host, () if is_local_name(host) or literal_address(host) else self.resolve(host))
+                verdict = True
+            except PrivateHostError:
+                verdict = False
+            with self._lock:
+                self._verdicts[host] = verdict
+        return verdict
+
+    def intercept(self, request):
+        if not self.allowed(request.url):
+            with self._lock:
+                self.refused += 1
+            request.abort()
+            return
+        if self.then is not None:
+            self.then(request)
+
+    def install(self, driver) -> "HostGuard":
+        """
+        Sets the guard as the driver's request interceptor. The pool's
+        session reset removes it again.
+        """
+        driver.request_interceptor = self.intercept
+        return self
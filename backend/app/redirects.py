@@ -0,0 +1,192 @@
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import httpx
+from fastapi import Request
+from pydantic import BaseModel
+
+from app import settings
+
+
+class RedirectHop(BaseModel):
+    url: str
+    status_code: int
+    location: Optional[str]
+    latency: Optional[float]  # seconds until the response headers; None when served from cache
+    cached: bool = False
+
+
+class RedirectResult:
+    """
+    Outcome of following a redirect chain by hand.
+
+    - `response`: the final non-redirect response, or None if the chain was
+      stopped (loop or too many redirects).
+    - `hops`: every redirect that was followed, in order.
+    - `responses`: responses that actually went over the network (cached hops
+      are skipped), in the same order as RequestTimer hops.
+    - `stopped`: None, "loop" or "max_redirects".
+    """
+
+    def __init__(self):
+        self.response: Optional[httpx.Response] = None
+        self.hops: List[RedirectHop] = []
+        self.responses: List[httpx.Response] = []
+        self.stopped: Optional[str] = None
+        self.next_url: Optional[str] = None
+
+    @property
+    def final_url(self) -> Optional[str]:
+        if self.response is not None:
+            return str(self.response.url)
+        return self.next_url
+
+    @property
+    def status_code(self) -> Optional[int]:
+        if self.response is not None:
+            return self.response.status_code
+        return self.hops[-1].status_code if self.hops else None
+
+
+class RedirectResolver:
+    """
+    Follows redirects one hop at a time instead of `follow_redirects=True`.
+
+    Redirect bodies are never downloaded, loops and overly long chains are
+    stopped, and each hop is cached by (URL, method) for `cache_ttl` seconds,
+    so a shared http→https→www chain is only resolved once per crawl.
+    """
+
+    def __init__(
+        self,
+        max_redirects: int = settings.MAX_REDIRECTS,
+        cache_ttl: float = settings.REDIRECT_CACHE_TTL,
+        cache_size: int = settings.REDIRECT_CACHE_SIZE,
+    ):
+        self.max_redirects = max_redirects
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        # (url, method) -> (expires_at, status_code, location, next_url, next_method)
+        self._cache: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self._cache.clear()
+
+    def _cache_get(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry
+
+    def _cache_put(self, key, status_code, location, next_url, next_method):
+        if self.cache_ttl <= 0:
+            return
+        self._cache[key] = (time.monotonic() + self.cache_ttl, status_code, location, next_url, next_method)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def fetch(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        method: str = "GET",
+        timeout=None,
+        extensions: Optional[dict] = None,
+        stream: bool = False,
+    ) -> RedirectResult:
+        """
+        Requests `url` and follows its redirects.
+
+        With `stream=True` the final response body is left unread and the
+        caller must close it.
+        """
+        result = RedirectResult()
+        seen = set()
+        current_url, current_method = str(url), method
+
+        while True:
+            key = (current_url, current_method)
+            if key in seen:
+                result.stopped = "loop"
+                break
+            seen.add(key)
+
+            if len(result.hops) >= self.max_redirects:
+                result.stopped = "max_redirects"
+                break
+
+            cached = self._cache_get(key)
+            if cached is not None:
+                self.hits += 1
+                _, status_code, location, next_url, next_method = cached
+                result.hops.append(RedirectHop(
+                    url=current_url,
+                    status_code=status_code,
+                    location=location,
+                    latency=None,
+                    cached=True
+                ))
+                current_url, current_method = next_url, next_method
+                result.next_url = current_url
+                continue
+
+            self.misses += 1
+            request = client.build_request(
+                current_method,
+                current_url,
+                timeout=timeout if timeout is not None else client.timeout,
+                extensions=extensions
+            )
+            started = time.perf_counter()
+            response = await client.send(request, stream=True, follow_redirects=False)
+            latency = round(time.perf_counter() - started, 4)
+            result.responses.append(response)
+
+            if not response.is_redirect or response.next_request is None:
+                if not stream:
+                    try:
+                        await response.aread()
+                    except BaseException:
+                        # Like httpx.AsyncClient.send: a failed or cancelled read
+                        # must still close the stream (and free its per-host slot)
+                        await response.aclose()
+                        raise
+                result.response = response
+                break
+
+            # Only the Location header matters, don't download the body
+            try:
+                next_request = response.next_request
+            finally:
+                await response.aclose()
+            location = response.headers.get("Location")
+            result.hops.append(RedirectHop(
+                url=current_url,
+                status_code=response.status_code,
+                location=location,
+                latency=latency
+            ))
+            self._cache_put(key, response.status_code, location, str(next_request.url), next_request.method)
+            current_url, current_method = str(next_request.url), next_request.method
+            result.next_url = current_url
+
+        return result
+
+
+def get_redirect_resolver(request: Request) -> RedirectResolver:
+    """
+    FastAPI dependency returning the shared redirect resolver (and its hop cache).
+    """
+    resolver = getattr(request.app.state, "redirect_resolver", None)
+    if resolver is None:
+        resolver = RedirectResolver()
+        request.app.state.redirect_resolver = resolver
+    return resolver
@@ -0,0 +1,171 @@
+import threading
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+from pydantic import BaseModel, Field
+
+from app import settings
+
+# Sec-Fetch-Dest values (sent by Chrome with every request) -> resource type
+FETCH_DEST_TYPES = {
+    "image": "image",
+    "font": "font",
+    "audio": "media",
+    "video": "media",
+    "track": "media",
+    "style": "stylesheet",
+    "script": "script",
+    "document": "document",
+    "iframe": "document",
+    "frame": "document",
+}
+
+# Fallback when Sec-Fetch-Dest is missing
+EXTENSION_TYPES = {
+    **dict.fromkeys(("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"), "image"),
+    **dict.fromkeys(("woff", "woff2", "ttf", "otf", "eot"), "font"),
+    **dict.fromkeys(("mp4", "webm", "ogg", "mp3", "wav", "m4a", "mov", "m3u8", "ts"), "media"),
+    "css": "stylesheet",
+    "js": "script",
+}
+
+# Rough bytes per request by type (HTTP Archive page weight medians, order of
+# magnitude only). Blocked requests are never downloaded, so what they would
+# have cost can only be estimated.
+TYPICAL_BYTES = {
+    "image": 30_000,
+    "font": 30_000,
+    "media": 250_000,
+    "stylesheet": 15_000,
+    "script": 25_000,
+    "other": 5_000,
+}
+
+
+def resource_type(url: str, headers) -> str:
+    dest = (headers.get("Sec-Fetch-Dest") or "").lower()
+    if dest in FETCH_DEST_TYPES:
+        return FETCH_DEST_TYPES[dest]
+    path = urlsplit(url).path
+    extension = path.rsplit(".", 1)[-1].lower() if "." in path.rsplit("/", 1)[-1] else ""
+    return EXTENSION_TYPES.get(extension, "other")
+
+
+def response_bytes(requests, skip_ids=()) -> int:
+    """
+    Response bytes of selenium-wire's captured requests (`driver.requests`),
+    from Content-Length or the body as received.
+    """
+    total = 0
+    for request in requests:
+        response = getattr(request, "response", None)
+        if response is None or request.id in skip_ids:
+            continue  # not answered, or answered by abort() itself
+        length = response.headers.get("Content-Length")
+        total += int(length) if length and length.isdigit() else len(response.body or b"")
+    return total
+
+
+def host_matches(host: str, domains: Iterable[str]) -> bool:
+    """
+    'cdn.example.com' matches 'example.com' and 'cdn.example.com'.
+    """
+    host = host.lower().rstrip(".")
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+def site_of(host: str) -> str:
+    # Last two labels: good enough to tell first from third parties on most
+    # sites (not for example.co.uk style suffixes)
+    return ".".join(host.lower().rstrip(".").split(".")[-2:])
+
+
+class BlockingStats(BaseModel):
+    requests_allowed: int = 0
+    requests_blocked: int = 0
+    blocked_by_type: Dict[str, int] = Field(default_factory=dict)
+    blocked_by_domain_rule: int = 0
+    bytes_loaded: Optional[int] = None  # response bytes of the allowed requests
+    bytes_saved_estimate: int = 0  # from TYPICAL_BYTES per blocked request
+
+
+class BlockPolicy:
+    """
+    Which requests of a rendered page are not worth loading:
+    - `block_types`: resource types (image, font, media, stylesheet, script, other);
+    - `deny_domains`: hosts (and their subdomains) always blocked, e.g. trackers;
+    - `allow_domains`: when set, third-party hosts not listed are blocked.
+    The page itself (document requests) is never blocked.
+    """
+
+    def __init__(
+        self,
+        block_types: Iterable[str] = settings.RENDER_BLOCK_TYPES,
+        deny_domains: Iterable[str] = settings.RENDER_DENY_DOMAINS,
+        allow_domains: Iterable[str] = settings.RENDER_ALLOW_DOMAINS,
+    ):
+        self.block_types = frozenset(block_types)
+        self.deny_domains = tuple(domain.lower() for domain in deny_domains)
+        self.allow_domains = tuple(domain.lower() for domain in allow_domains)
+
+    def decide(self, url: str, headers, page_site: str) -> Optional[str]:
+        """
+        Why the request should be blocked ("type:<type>" or "domain"), None to let it through.
+        """
+        kind = resource_type(url, headers)
+        if kind == "document":
+            return None
+        host = urlsplit(url).hostname or ""
+        if self.deny_domains and host_matches(host, self.deny_domains):
+            return "domain"
+        if self.allow_domains and site_of(host) != page_site and not host_matches(host, self.allow_domains):
+            return "domain"
+        if kind in self.block_types:
+            return f"type:{kind}"
+        return None
+
+    def recorder(self, page_url: str) -> "BlockingRecorder":
+        """
+        The interceptor that blocks for one render of `page_url`; the
+        selenium-wire proxy aborts blocked requests before they go upstream.
+        Installed behind the browser's HostGuard (see selenium_runner).
+        """
+        return BlockingRecorder(self, site_of(urlsplit(page_url).hostname or ""))
+
+
+class BlockingRecorder:
+    """
+    The request interceptor of one render, counting what it blocked. Called
+    from selenium-wire's proxy threads.
+    """
+
+    def __init__(self, policy: BlockPolicy, page_site: str):
+        self.policy = policy
+        self.page_site = page_site
+        self.stats = BlockingStats()
+        self._blocked_ids = set()
+        self._lock = threading.Lock()
+
+    def intercept(self, request):
+        reason = self.policy.decide(request.url, request.headers, self.page_site)
+        with self._lock:
+            stats = self.stats
+            if reason is None:
+                stats.requests_allowed += 1
+                return
+            stats.requests_blocked += 1
+            self._blocked_ids.add(getattr(request, "id", None))
+            if reason == "domain":
+                stats.blocked_by_domain_rule += 1
+            kind = resource_type(request.url, request.headers)
+            stats.blocked_by_type[kind] = stats.blocked_by_type.get(kind, 0) + 1
+            stats.bytes_saved_estimate += TYPICAL_BYTES.get(kind, TYPICAL_BYTES["other"])
+        request.abort()
+
+    def finish(self, requests=()) -> BlockingStats:
+        """
+        Final stats; `requests` (selenium-wire's `driver.requests`) adds up
+        the bytes that were loaded.
+        """
+        self.stats.bytes_loaded = response_bytes(requests, skip_ids=self._blocked_ids)
+        return self.stats
@@ -0,0 +1,67 @@
+import secrets
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, Tuple, TypeVar
+
+from fastapi import Request
+
+from app import settings
+
+T = TypeVar("T")
+
+
+class ResultCache(Generic[T]):
+    """
+    Small in-memory TTL + LRU cache for results that are expensive to rebuild
+    (e.g. a parsed 50k-URL sitemap served one page at a time).
+
+    Every stored value gets a random snapshot id, so a pagination cursor can
+    tell whether the page it points into still comes from the same parse.
+    """
+
+    def __init__(
+        self,
+        ttl: float = settings.SITEMAP_RESULT_CACHE_TTL,
+        max_entries: int = settings.SITEMAP_RESULT_CACHE_SIZE,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (expires_at, snapshot, value)
+        self._entries: "OrderedDict[Hashable, Tuple[float, str, T]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Tuple[str, T]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1], entry[2]
+
+    def put(self, key: Hashable, value: T) -> str:
+        snapshot = secrets.token_urlsafe(6)
+        if self.ttl <= 0:
+            return snapshot
+        self._entries[key] = (time.monotonic() + self.ttl, snapshot, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return snapshot
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def get_sitemap_results(request: Request) -> ResultCache:
+    """
+    FastAPI dependency returning the shared cache of parsed sitemaps used for pagination.
+    """
+    cache = getattr(request.app.state, "sitemap_results", None)
+    if cache is None:
+        cache = ResultCache()
+        request.app.state.sitemap_results = cache
+    return cache
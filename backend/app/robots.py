@@ -0,0 +1,341 @@
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+import httpx
+from fastapi import Request
+from pydantic import BaseModel
+
+from app import settings
+from app.http_client import TIMEOUTS
+
+# RFC 9309: crawlers must parse at least the first 500 KiB, the rest may be ignored
+ROBOTS_MAX_BYTES = 500 * 1024
+
+# Characters left as they are when normalizing paths and patterns; everything
+# else (spaces, non-ASCII, ...) is percent-encoded so both sides compare alike
+_SAFE_CHARS = "/?=&;:@!$'()*+,%-._~#[]"
+_ESCAPE_RE = re.compile(r"%[0-9a-fA-F]{2}")
+_LINE_RE = re.compile(r"^\s*([A-Za-z-]+)\s*:\s*(.*?)\s*$")
+
+
+def normalize_path(value: str) -> str:
+    """
+    Percent-encodes what needs it and upper-cases existing escapes, so
+    '/café' and '/caf%c3%a9' both become '/caf%C3%A9'.
+    """
+    return _ESCAPE_RE.sub(lambda m: m.group().upper(), quote(value, safe=_SAFE_CHARS))
+
+
+def url_path(url: str) -> str:
+    """
+    The part of a URL robots.txt rules are matched against: path and query.
+    """
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    return normalize_path(path)
+
+
+def robots_origin(url: str) -> str:
+    """
+    'https://Example.com:8443/a?b' -> 'https://example.com:8443'; robots.txt
+    applies per scheme, host and port.
+    """
+    parts = urlsplit(url)
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+class RobotsRule(BaseModel):
+    allow: bool
+    pattern: str
+
+
+class RobotsMatcher:
+    """
+    The Allow/Disallow rules of one user-agent, compiled for fast lookups.
+
+    Rules are sorted the way RFC 9309 picks a winner: longest pattern first,
+    Allow before Disallow on a tie. The first rule that matches is then the
+    deciding one and the scan stops there. Patterns without `*` / `$` are
+    plain prefix checks; only the others go through a regex.
+
+    All patterns are also joined into one regex that is tried first: most
+    paths match no rule at all and are answered by a single C-level match
+    instead of a Python loop over every rule.
+    """
+
+    def __init__(self, rules: List[Tuple[bool, str]]):
+        compiled = []
+        for allow, pattern in rules:
+            pattern = normalize_path(pattern)
+            if not pattern:
+                # "Disallow:" with no value means nothing is disallowed
+                continue
+            compiled.append((len(pattern), allow, pattern, self._compile(pattern)))
+        compiled.sort(key=lambda rule: (-rule[0], not rule[1]))
+        self._rules = [(allow, pattern, test) for _, allow, pattern, test in compiled]
+        any_rule = "|".join(f"(?:{self._regex(pattern)})" for _, _, pattern, _ in compiled)
+        self._any = re.compile(any_rule).match if compiled else lambda path: None
+
+    @staticmethod
+    def _regex(pattern: str) -> str:
+        anchored = pattern.endswith("$")
+        body = pattern[:-1] if anchored else pattern
+        regex = ".*".join(re.escape(part) for part in body.split("*"))
+        return regex + ("$" if anchored else "")
+
+    @classmethod
+    def _compile(cls, pattern: str):
+        if "*" not in pattern and not pattern.endswith("$"):
+            return lambda path: path.startswith(pattern)
+        return re.compile(cls._regex(pattern)).match
+
+    def __len__(self):
+        return len(self._rules)
+
+    def decide(self, path: str) -> Optional[RobotsRule]:
+        """
+        The rule deciding `path` (already normalized, see `url_path`), or
+        None when no rule matches and the path is allowed.
+        """
+        if self._any(path) is None:
+            return None
+        for allow, pattern, test in self._rules:
+            if test(path):
+                return RobotsRule(allow=allow, pattern=pattern)
+        return None
+
+    def allowed(self, path: str) -> bool:
+        if self._any(path) is None:
+            return True
+        for allow, _, test in self._rules:
+            if test(path):
+                return allow
+        return True
+
+
+# Decides everything: "unreachable" robots.txt files block the whole site
+_DISALLOW_ALL = [(False, "/")]
+
+
+class RobotsTxt:
+    """
+    A parsed robots.txt: `Sitemap:` lines plus the rule groups per user-agent.
+
+    `status` follows RFC 9309:
+    - "ok": fetched and parsed;
+    - "unavailable": 4xx (no robots.txt), everything is allowed;
+    - "unreachable": 5xx, 429 or a network error, everything is disallowed.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        status: str = "ok",
+        http_status: Optional[int] = None,
+        groups: Optional[List[Tuple[List[str], List[Tuple[bool, str]]]]] = None,
+        sitemaps: Optional[List[str]] = None,
+        message: str = "",
+    ):
+        self.url = url
+        self.status = status
+        self.http_status = http_status
+        self.groups = groups or []
+        self.sitemaps = sitemaps or []
+        self.message = message
+        self._matchers: Dict[str, RobotsMatcher] = {}
+
+    @classmethod
+    def parse(cls, url: str, text: str, http_status: Optional[int] = 200) -> "RobotsTxt":
+        groups: List[Tuple[List[str], List[Tuple[bool, str]]]] = []
+        sitemaps: List[str] = []
+        agents: List[str] = []
+        rules: List[Tuple[bool, str]] = []
+        in_rules = False
+
+        for line in text.splitlines():
+            match = _LINE_RE.match(line.split("#", 1)[0])
+            if match is None:
+                continue
+            key, value = match.group(1).lower(), match.group(2)
+
+            if key == "sitemap":
+                # Not part of any group
+                if value and value not in sitemaps:
+                    sitemaps.append(value)
+            elif key == "user-agent":
+                if in_rules:
+                    # A user-agent after rules starts a new group
+                    groups.append((agents, rules))
+                    agents, rules, in_rules = [], [], False
+                agents.append(value.split("/", 1)[0].strip().lower())
+            elif key in ("allow", "disallow"):
+                if not agents:
+                    # Rules before any user-agent line belong to no group
+                    continue
+                rules.append((key == "allow", value))
+                in_rules = True
+
+        if agents:
+            groups.append((agents, rules))
+        return cls(url, "ok", http_status, groups, sitemaps)
+
+    def matcher(self, user_agent: str = settings.ROBOTS_USER_AGENT) -> RobotsMatcher:
+        """
+        Compiled rules for `user_agent` (its product token, case-insensitive),
+        falling back to the '*' groups. Groups for the same agent are merged.
+        """
+        token = user_agent.split("/", 1)[0].strip().lower() or "*"
+        matcher = self._matchers.get(token)
+        if matcher is not None:
+            return matcher
+
+        if self.status == "unreachable":
+            rules = _DISALLOW_ALL
+        else:
+            rules = [rule for agents, group in self.groups if token in agents for rule in group]
+            if not rules and not any(token in agents for agents, _ in self.groups):
+                rules = [rule for agents, group in self.groups if "*" in agents for rule in group]
+        matcher = self._matchers[token] = RobotsMatcher(rules)
+        return matcher
+
+    def allowed(self, url: str, user_agent: str = settings.ROBOTS_USER_AGENT) -> bool:
+        return self.matcher(user_agent).allowed(url_path(url))
+
+
+async def fetch_robots(client: httpx.AsyncClient, origin: str, timeout=None) -> RobotsTxt:
+    """
+    Downloads and parses `<origin>/robots.txt`, reading at most
+    ROBOTS_MAX_BYTES. Never raises for HTTP or network errors; they end up
+    in the `status` of the result.
+    """
+    url = origin + "/robots.txt"
+    body = bytearray()
+    try:
+        async with client.stream(
+            "GET",
+            url,
+            timeout=timeout if timeout is not None else TIMEOUTS["robots"],
+            follow_redirects=True
+        ) as response:
+            status_code = response.status_code
+            if status_code == 429 or status_code >= 500:
+                return RobotsTxt(url, "unreachable", status_code, message=f"robots.txt returned status {status_code}.")
+            if status_code >= 400:
+                return RobotsTxt(url, "unavailable", status_code, message=f"robots.txt returned status {status_code}.")
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) >= ROBOTS_MAX_BYTES:
+                    break
+    except httpx.RequestError as exc:
+        return RobotsTxt(url, "unreachable", message=f"Request error: {exc}")
+
+    text = bytes(body[:ROBOTS_MAX_BYTES]).decode("utf-8", errors="replace")
+    robots = RobotsTxt.parse(url, text, status_code)
+    robots.message = f"Parsed {len(robots.groups)} groups and {len(robots.sitemaps)} sitemaps."
+    return robots
+
+
+class RobotsCache:
+    """
+    robots.txt files per origin, kept for `ttl` seconds (`error_ttl` for
+    unreachable ones, so a short outage doesn't block a site for an hour).
+    Concurrent lookups of the same origin share one download.
+    """
+
+    def __init__(
+        self,
+        ttl: float = settings.ROBOTS_CACHE_TTL,
+        error_ttl: float = settings.ROBOTS_ERROR_TTL,
+        max_entries: int = settings.ROBOTS_CACHE_SIZE,
+    ):
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.max_entries = max_entries
+        # origin -> (expires_at, RobotsTxt)
+        self._entries: "OrderedDict[str, Tuple[float, RobotsTxt]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def get(self, client: httpx.AsyncClient, url: str) -> RobotsTxt:
+        """
+        The robots.txt that applies to `url` (any URL on the site).
+        """
+        origin = robots_origin(url)
+        entry = self._entries.get(origin)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(origin)
+                self.hits += 1
+                return entry[1]
+            del self._entries[origin]
+
+        self.misses += 1
+        task = self._pending.get(origin)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(client, origin))
+            self._pending[origin] = task
+            task.add_done_callback(lambda t: self._pending.pop(origin, None))
+        # Shielded so one cancelled caller doesn't cancel the download for everyone
+        return await asyncio.shield(task)
+
+    async def _fetch(self, client: httpx.AsyncClient, origin: str) -> RobotsTxt:
+        robots = await fetch_robots(client, origin)
+        ttl = self.error_ttl if robots.status == "unreachable" else self.ttl
+        if ttl > 0:
+            self._entries[origin] = (time.monotonic() + ttl, robots)
+            self._entries.move_to_end(origin)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return robots
+
+
+class RobotsVerdict(BaseModel):
+    robots_url: str
+    robots_status: str  # "ok" / "unavailable" / "unreachable"
+    allowed: bool
+    rule: Optional[RobotsRule] = None  # the deciding Allow/Disallow line, None if no rule matched
+
+
+async def check_robots(
+    client: httpx.AsyncClient,
+    cache: RobotsCache,
+    url: str,
+    user_agent: str = settings.ROBOTS_USER_AGENT
+) -> RobotsVerdict:
+    """
+    Whether `url` may be crawled by `user_agent`, and which rule says so.
+    """
+    robots = await cache.get(client, url)
+    rule = robots.matcher(user_agent).decide(url_path(url))
+    return RobotsVerdict(
+        robots_url=robots.url,
+        robots_status=robots.status,
+        allowed=rule is None or rule.allow,
+        rule=rule
+    )
+
+
+def get_robots_cache(request: Request) -> RobotsCache:
+    """
+    FastAPI dependency returning the shared robots.txt cache.
+    """
+    cache = getattr(request.app.state, "robots_cache", None)
+    if cache is None:
+        cache = RobotsCache()
+        request.app.state.robots_cache = cache
+    return cache
@@ -1,4 +1,7 @@
+import time
+
 from seleniumwire import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
@@ -6,15 +9,30 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from pyvirtualdisplay import Display
 from app import settings
+from app.page_performance import PERFORMANCE_SCRIPT, summarize_performance
+from app.private_hosts import HostGuard
+from app.resource_blocking import BlockPolicy, response_bytes
 from app.utils import get_user_agent
 
+# Anti-bot tweaks, run before any page script
+ANTI_BOT_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
+    Object.defineProperty(navigator, 'platform', { get: () => 'Win32' });
+    Object.defineProperty(navigator, 'language', { get: () => 'en-US' });
+    Object.defineProperty(navigator, 'languages', { get: () => ['en-US', 'en'] });
+    window.screen = {width:1920, height:1080};
+"""
+
 
-def run_selenium():
-    # Start virtual display
+def create_display():
+    # Virtual display shared by every browser of the pool
     display = Display(visible=0, size=settings.WINDOW_SIZE, backend="xvfb")
     display.start()
     print("✅ Virtual display started")
+    return display
 
+
+def build_chrome_options():
     chrome_options = Options()
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
@@ -30,9 +48,12 @@ def run_selenium():
     # User-Agent
     user_agent = get_user_agent()
     chrome_options.add_argument(f"user-agent={user_agent}")
+    return chrome_options
+
 
+def build_seleniumwire_options():
     # Proxy
-    seleniumwire_options = {
+    return {
         'proxy': {
             'http': f'https://{settings.PROXY_USER}:{settings.PROXY_PASS}@{settings.PROXY_HOST}:{settings.PROXY_PORT}',
             'https': f'https://{settings.PROXY_USER}:{settings.PROXY_PASS}@{settings.PROXY_HOST}:{settings.PROXY_PORT}',
@@ -40,36 +61,140 @@ def run_selenium():
         }
     }
 
-    service = ChromeService(executable_path=settings.CHROMEDRIVER_PATH)
-    driver = webdriver.Chrome(service=service, options=chrome_options, seleniumwire_options=seleniumwire_options)
 
+def create_driver():
+    """
+    Starts one selenium-wire Chrome (the display must already be running).
+    """
+    service = ChromeService(executable_path=settings.CHROMEDRIVER_PATH)
+    driver = webdriver.Chrome(
+        service=service,
+        options=build_chrome_options(),
+        seleniumwire_options=build_seleniumwire_options()
+    )
     try:
-        # Anti-bot tweaks
-        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
-            "source": """
-                Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
-                Object.defineProperty(navigator, 'platform', { get: () => 'Win32' });
-                Object.defineProperty(navigator, 'language', { get: () => 'en-US' });
-                Object.defineProperty(navigator, 'languages', { get: () => ['en-US', 'en'] });
-                window.screen = {width:1920, height:1080};
-            """
-        })
-
-        driver.get("https://www.google.com")
-
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.NAME, "q")))
-        search_box = driver.find_element(By.NAME, "q")
-        search_box.send_keys("python selenium")
-        search_box.submit()
-
-        # driver.save_screenshot("debug.png")
-
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, "h3")))
-
-        title = driver.title
-    finally:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": ANTI_BOT_SCRIPT})
+    except Exception:
         driver.quit()
-        display.stop()
-        print("✅ Browser & display stopped")
+        raise
+    print("✅ Browser started")
+    return driver
+
+
+def run_selenium(driver):
+    """
+    Google search smoke test; a browser task, run on a pooled session.
+    """
+    HostGuard().install(driver)
+    driver.get("https://www.google.com")
+
+    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.NAME, "q")))
+    search_box = driver.find_element(By.NAME, "q")
+    search_box.send_keys("python selenium")
+    search_box.submit()
+
+    # driver.save_screenshot("debug.png")
+
+    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, "h3")))
+
+    return driver.title
+
 
-    return title
+# Counts resources fetched so far; "networkidle" waits until it stops changing
+_RESOURCE_COUNT_SCRIPT = "return performance.getEntriesByType('resource').length"
+
+
+def wait_until_ready(driver, wait: str, timeout: float) -> bool:
+    """
+    Waits for a readiness condition, returns False if it wasn't met in time:
+    - "load": document.readyState is "complete";
+    - "networkidle": loaded, and no new resource for RENDER_IDLE_MS;
+    - anything else: a CSS selector that must match an element.
+    """
+    try:
+        if wait in ("load", "networkidle"):
+            WebDriverWait(driver, timeout).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
+            if wait == "networkidle":
+                idle = settings.RENDER_IDLE_MS / 1000
+                state = {"count": -1, "since": time.monotonic()}
+
+                def settled(d):
+                    count = d.execute_script(_RESOURCE_COUNT_SCRIPT)
+                    if count != state["count"]:
+                        state["count"], state["since"] = count, time.monotonic()
+                    return time.monotonic() - state["since"] >= idle
+
+                WebDriverWait(driver, timeout, poll_frequency=idle / 4).until(settled)
+        else:
+            WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.CSS_SELECTOR, wait)))
+    except TimeoutException:
+        return False
+    return True
+
+
+def render_page(
+    driver,
+    url: str,
+    wait: str = settings.RENDER_WAIT,
+    timeout: float = settings.RENDER_TIMEOUT,
+    block: bool = True,
+):
+    """
+    Browser task: loads `url` and returns the DOM as rendered once `wait`
+    is met (or after `timeout` seconds, with ready=False). With `block`,
+    requests matching the configured BlockPolicy are never sent, and
+    "blocking" reports what that saved. Requests to private hosts are
+    never sent either way (HostGuard).
+    """
+    recorder = BlockPolicy().recorder(url) if block else None
+    HostGuard(then=recorder.intercept if recorder else None).install(driver)
+    started = time.monotonic()
+    driver.set_page_load_timeout(timeout)
+    try:
+        driver.get(url)
+    except TimeoutException:
+        pass  # Still stuck loading: take what has rendered so far
+    ready = wait_until_ready(driver, wait, max(timeout - (time.monotonic() - started), 0.1))
+    return {
+        "final_url": driver.current_url,
+        "html": driver.page_source,
+        "ready": ready,
+        "elapsed": round(time.monotonic() - started, 4),
+        "blocking": recorder.finish(getattr(driver, "requests", ())).model_dump() if recorder else None,
+    }
+
+
+def measure_page(
+    driver,
+    url: str,
+    wait: str = settings.RENDER_WAIT,
+    timeout: float = settings.RENDER_TIMEOUT,
+    settle_ms: int = settings.PERFORMANCE_SETTLE_MS,
+):
+    """
+    Browser task: loads `url` (cold: the pool resets cache and cookies
+    between tasks) and returns its PagePerformance as a dict. Nothing is
+    blocked (except private hosts, see HostGuard), so the numbers are the
+    page's real cost.
+    """
+    HostGuard().install(driver)
+    started = time.monotonic()
+    driver.set_page_load_timeout(timeout)
+    try:
+        driver.get(url)
+    except TimeoutException:
+        pass
+    ready = wait_until_ready(driver, wait, max(timeout - (time.monotonic() - started), 0.1))
+    driver.set_script_timeout(settle_ms / 1000 + 10)
+    raw = driver.execute_async_script(PERFORMANCE_SCRIPT, settle_ms)
+    requests = getattr(driver, "requests", None)
+    return summarize_performance(
+        url,
+        raw,
+        final_url=driver.current_url,
+        ready=ready,
+        proxy_bytes=response_bytes(requests) if requests else None,
+        elapsed=round(time.monotonic() - started, 4),
+    ).model_dump()
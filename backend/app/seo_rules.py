@@ -0,0 +1,222 @@
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from fastapi import Request
+from pydantic import BaseModel, Field
+
+from app import settings
+
+SEVERITIES = ("error", "warning", "info")
+
+
+class SEOCheck(BaseModel):
+    passed: bool
+    severity: str
+    message: str
+
+
+class RuleConfig(BaseModel):
+    """
+    One declared rule. `kind` picks the test applied to `field` (a key of
+    the values passed to `RuleSet.evaluate`); the other settings are
+    used by some kinds only. Messages are `str.format` templates.
+
+    A rule whose field is absent from the values (not collected for that
+    page) is skipped. An empty value (None, "", [], {}) gives `if_missing`
+    with `missing_message`, except for the kinds that test emptiness
+    themselves (present, count, true).
+    """
+    id: str
+    kind: str
+    field: str
+    severity: str = Field("warning", pattern="^(error|warning|info)$")
+    enabled: bool = True
+    min: Optional[float] = None
+    max: Optional[float] = None
+    value: Any = None  # equals_field: the other field; contains: the substring
+    negate: bool = False
+    keys: List[str] = Field(default_factory=list)
+    if_missing: bool = False
+    pass_message: str = "Passed"
+    fail_message: str = "Failed"
+    missing_message: str = "Missing"
+
+
+# kind -> factory(config) -> test(value, values) -> (passed, message variables)
+RULE_KINDS: Dict[str, Callable[[RuleConfig], Callable[[Any, dict], tuple]]] = {}
+
+# Kinds that decide empty values themselves
+_HANDLES_EMPTY = {"present", "count", "true"}
+
+
+def rule_kind(name: str, handles_empty: bool = False):
+    """
+    Registers a rule kind, so rules of that kind can be declared in config:
+
+        @rule_kind("max_words")
+        def max_words(config):
+            return lambda value, values: (len(value.split()) <= config.max, {"words": len(value.split())})
+    """
+    def register(factory):
+        RULE_KINDS[name] = factory
+        if handles_empty:
+            _HANDLES_EMPTY.add(name)
+        return factory
+    return register
+
+
+def _within(config: RuleConfig, number: float) -> bool:
+    return (config.min is None or number >= config.min) and (config.max is None or number <= config.max)
+
+
+@rule_kind("length")
+def _length(config):
+    return lambda value, values: (_within(config, len(value)), {"length": len(value)})
+
+
+@rule_kind("count", handles_empty=True)
+def _count(config):
+    return lambda value, values: (_within(config, len(value or ())), {"count": len(value or ())})
+
+
+@rule_kind("present", handles_empty=True)
+def _present(config):
+    return lambda value, values: (bool(value), {"value": value})
+
+
+@rule_kind("true", handles_empty=True)
+def _true(config):
+    return lambda value, values: (value is True, {})
+
+
+@rule_kind("equals_field")
+def _equals_field(config):
+    other = config.value
+    return lambda value, values: (value == values.get(other), {"other": values.get(other)})
+
+
+@rule_kind("contains")
+def _contains(config):
+    needle = str(config.value).lower()
+    return lambda value, values: (needle in value.lower(), {})
+
+
+@rule_kind("keys")
+def _keys(config):
+    def test(value, values):
+        missing = [key for key in config.keys if key not in value]
+        return not missing, {"missing": ", ".join(missing)}
+    return test
+
+
+# The checks check_url always did, with the same ids, thresholds and messages
+DEFAULT_RULES: List[dict] = [
+    {"id": "title", "kind": "length", "field": "title", "min": 40, "max": 65, "severity": "error",
+     "pass_message": "Length: {length} characters", "fail_message": "Length: {length} characters",
+     "missing_message": "Missing title tag"},
+    {"id": "description", "kind": "length", "field": "description", "min": 50, "max": 160,
+     "pass_message": "Length: {length} characters", "fail_message": "Length: {length} characters",
+     "missing_message": "Missing meta description"},
+    {"id": "h1", "kind": "present", "field": "h1", "severity": "error",
+     "pass_message": "H1 found: {value}", "fail_message": "No H1 tag found"},
+    {"id": "all_h1", "kind": "count", "field": "all_h1", "min": 1, "max": 1,
+     "pass_message": "{count} H1 tags found", "fail_message": "{count} H1 tags found"},
+    {"id": "canonical", "kind": "equals_field", "field": "canonical", "value": "final_url",
+     "pass_message": "Canonical matches final URL", "fail_message": "Canonical does not match final URL",
+     "missing_message": "No canonical tag found"},
+    {"id": "robots_meta_noindex", "kind": "contains", "field": "robots_meta", "value": "noindex", "negate": True,
+     "severity": "error", "if_missing": True, "pass_message": "No noindex found", "fail_message": "Contains noindex",
+     "missing_message": "No robots meta tag found"},
+    {"id": "open_graph", "kind": "keys", "field": "open_graph", "keys": ["og:title", "og:description", "og:image"],
+     "severity": "info", "pass_message": "All required OG tags found", "fail_message": "Missing: {missing}",
+     "missing_message": "Missing: og:title, og:description, og:image"},
+    {"id": "robots_txt", "kind": "true", "field": "robots_txt_allowed", "severity": "error",
+     "pass_message": "Allowed by robots.txt", "fail_message": "Blocked by robots.txt: Disallow: {robots_txt_rule}"},
+]
+
+
+class _Vars(dict):
+    # Unknown template variables stay visible instead of raising
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+
+class CompiledRule:
+    __slots__ = ("config", "test", "handles_empty")
+
+    def __init__(self, config: RuleConfig):
+        factory = RULE_KINDS.get(config.kind)
+        if factory is None:
+            raise ValueError(f"Unknown rule kind {config.kind!r} in rule {config.id!r}")
+        self.config = config
+        self.test = factory(config)
+        self.handles_empty = config.kind in _HANDLES_EMPTY
+
+    def evaluate(self, values: dict) -> SEOCheck:
+        config = self.config
+        value = values[config.field]
+        if not value and not self.handles_empty:
+            return SEOCheck(
+                passed=config.if_missing,
+                severity=config.severity,
+                message=config.missing_message.format_map(_Vars(values))
+            )
+        passed, variables = self.test(value, values)
+        passed = bool(passed) != config.negate
+        template = config.pass_message if passed else config.fail_message
+        return SEOCheck(
+            passed=passed,
+            severity=config.severity,
+            message=template.format_map(_Vars(values, **variables))
+        )
+
+
+class RuleSet:
+    """
+    Rules compiled once (kinds looked up, configs validated) and then
+    evaluated over extracted page values.
+    """
+
+    def __init__(self, rules: Sequence[dict]):
+        self.rules = [CompiledRule(RuleConfig(**rule)) for rule in rules if rule.get("enabled", True)]
+
+    @classmethod
+    def from_config(cls, path: Optional[str] = settings.SEO_RULES_FILE) -> "RuleSet":
+        """
+        DEFAULT_RULES, plus the rules of the JSON file at `path` (a list of
+        rule objects). A rule with the id of a default one replaces it;
+        `"enabled": false` turns it off.
+        """
+        rules = {rule["id"]: rule for rule in DEFAULT_RULES}
+        if path:
+            with open(path, encoding="utf-8") as f:
+                for rule in json.load(f):
+                    rules[rule["id"]] = {**rules.get(rule["id"], {}), **rule}
+        return cls(list(rules.values()))
+
+    def evaluate(self, values: dict) -> Dict[str, SEOCheck]:
+        return self.evaluate_many([values])[0]
+
+    def evaluate_many(self, pages: Sequence[dict]) -> List[Dict[str, SEOCheck]]:
+        """
+        Results for many pages at once, rule by rule: each compiled rule
+        runs over the whole batch before the next one.
+        """
+        results: List[Dict[str, SEOCheck]] = [{} for _ in pages]
+        for rule in self.rules:
+            field, rule_id = rule.config.field, rule.config.id
+            for values, checks in zip(pages, results):
+                if field in values:
+                    checks[rule_id] = rule.evaluate(values)
+        return results
+
+
+def get_rule_set(request: Request) -> RuleSet:
+    """
+    FastAPI dependency returning the SEO rules compiled at startup.
+    """
+    rule_set = getattr(request.app.state, "seo_rules", None)
+    if rule_set is None:
+        rule_set = RuleSet.from_config()
+        request.app.state.seo_rules = rule_set
+    return rule_set
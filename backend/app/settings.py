@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,4 +14,120 @@ PROXY_PASS = os.getenv("PROXY_PASS")
 CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH", "/usr/local/bin/chromedriver")
 
 # Window size
-WINDOW_SIZE = (1920, 1080)
\ No newline at end of file
+WINDOW_SIZE = (1920, 1080)
+
+# Shared HTTP client pool
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 200))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 50))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", 10))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30.0))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Per-endpoint timeout profiles (seconds)
+DOMAIN_TIMEOUT = float(os.getenv("DOMAIN_TIMEOUT", 5.0))
+URL_TIMEOUT = float(os.getenv("URL_TIMEOUT", 15.0))
+SITEMAP_TIMEOUT = float(os.getenv("SITEMAP_TIMEOUT", 30.0))
+ROBOTS_TIMEOUT = float(os.getenv("ROBOTS_TIMEOUT", 10.0))
+
+# DNS resolver cache
+DNS_CACHE_SIZE = int(os.getenv("DNS_CACHE_SIZE", 10000))
+DNS_NEGATIVE_TTL = float(os.getenv("DNS_NEGATIVE_TTL", 60.0))
+DNS_MIN_TTL = float(os.getenv("DNS_MIN_TTL", 0.0))
+DNS_MAX_TTL = float(os.getenv("DNS_MAX_TTL", 3600.0))
+DNS_TIMEOUT = float(os.getenv("DNS_TIMEOUT", 5.0))
+
+# Bulk endpoints
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", 10000))
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", 50))
+BULK_MAX_CONCURRENCY = int(os.getenv("BULK_MAX_CONCURRENCY", 200))
+BULK_PER_HOST_CONCURRENCY = int(os.getenv("BULK_PER_HOST_CONCURRENCY", 2))
+
+# Manual redirect following
+MAX_REDIRECTS = int(os.getenv("MAX_REDIRECTS", 10))
+REDIRECT_CACHE_TTL = float(os.getenv("REDIRECT_CACHE_TTL", 300.0))
+REDIRECT_CACHE_SIZE = int(os.getenv("REDIRECT_CACHE_SIZE", 10000))
+
+# Sitemap index crawl
+SITEMAP_CRAWL_MAX_DEPTH = int(os.getenv("SITEMAP_CRAWL_MAX_DEPTH", 3))
+SITEMAP_CRAWL_MAX_FILES = int(os.getenv("SITEMAP_CRAWL_MAX_FILES", 1000))
+SITEMAP_CRAWL_CONCURRENCY = int(os.getenv("SITEMAP_CRAWL_CONCURRENCY", 10))
+
+# Paginated sitemap results (parsed URL lists kept in memory between pages)
+SITEMAP_RESULT_CACHE_TTL = float(os.getenv("SITEMAP_RESULT_CACHE_TTL", 120.0))
+SITEMAP_RESULT_CACHE_SIZE = int(os.getenv("SITEMAP_RESULT_CACHE_SIZE", 16))
+SITEMAP_PAGE_MAX_LIMIT = int(os.getenv("SITEMAP_PAGE_MAX_LIMIT", 10000))
+
+# On-disk sitemap cache (conditional GET with ETag / Last-Modified)
+SITEMAP_CACHE_ENABLED = os.getenv("SITEMAP_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SITEMAP_CACHE_DIR = os.getenv("SITEMAP_CACHE_DIR", os.path.join(tempfile.gettempdir(), "gleam-lynq-sitemaps"))
+SITEMAP_CACHE_MAX_BYTES = int(os.getenv("SITEMAP_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Sitemap snapshots for diffing (latest URL set per sitemap)
+SITEMAP_SNAPSHOT_DIR = os.getenv("SITEMAP_SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "gleam-lynq-snapshots"))
+SITEMAP_DIFF_MAX_LISTED = int(os.getenv("SITEMAP_DIFF_MAX_LISTED", 1000))
+
+# Sitemap validation: duplicate <loc> detection is sized for this many entries
+SITEMAP_VALIDATION_BLOOM_CAPACITY = int(os.getenv("SITEMAP_VALIDATION_BLOOM_CAPACITY", 1_000_000))
+
+# robots.txt (rules per origin, cached; unreachable files are retried sooner)
+ROBOTS_USER_AGENT = os.getenv("ROBOTS_USER_AGENT", "*")
+ROBOTS_CACHE_TTL = float(os.getenv("ROBOTS_CACHE_TTL", 3600.0))
+ROBOTS_ERROR_TTL = float(os.getenv("ROBOTS_ERROR_TTL", 60.0))
+ROBOTS_CACHE_SIZE = int(os.getenv("ROBOTS_CACHE_SIZE", 10000))
+ROBOTS_MAX_LISTED = int(os.getenv("ROBOTS_MAX_LISTED", 1000))
+
+# Sitemap status sweep (HEAD every URL, ranged GET fallback)
+SWEEP_CONCURRENCY = int(os.getenv("SWEEP_CONCURRENCY", 20))
+SWEEP_HOST_RATE = float(os.getenv("SWEEP_HOST_RATE", 5.0))  # requests per second per host
+SWEEP_HOST_BURST = int(os.getenv("SWEEP_HOST_BURST", 5))
+SWEEP_TIMEOUT = float(os.getenv("SWEEP_TIMEOUT", 10.0))
+SWEEP_MAX_LISTED = int(os.getenv("SWEEP_MAX_LISTED", 1000))
+
+# HTML parsing for check_url: "html.parser" (single pass, same results as before) or "lxml" (faster, if installed)
+HTML_PARSER_BACKEND = os.getenv("HTML_PARSER_BACKEND", "html.parser")
+
+# check_url head-only mode: stop reading after </head> or this many body bytes
+HEAD_ONLY_MAX_BYTES = int(os.getenv("HEAD_ONLY_MAX_BYTES", 512 * 1024))
+
+# HTML parse pool: pages up to the inline cutoff are parsed on the event loop,
+# bigger ones in worker processes (threads with lxml or HTML_PARSE_WORKERS=0)
+HTML_PARSE_WORKERS = int(os.getenv("HTML_PARSE_WORKERS", min(4, os.cpu_count() or 1)))
+HTML_PARSE_INLINE_MAX_BYTES = int(os.getenv("HTML_PARSE_INLINE_MAX_BYTES", 64 * 1024))
+
+# SEO checks: JSON file of extra rules (or overrides of the default ones by id), see app/seo_rules.py
+SEO_RULES_FILE = os.getenv("SEO_RULES_FILE", "")
+
+# Browser pool (warm selenium-wire Chrome sessions, recycled after N uses or above the memory cap)
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", 2))
+BROWSER_POOL_WARM = os.getenv("BROWSER_POOL_WARM", "true").lower() in ("1", "true", "yes")
+BROWSER_MAX_USES = int(os.getenv("BROWSER_MAX_USES", 50))
+BROWSER_MAX_MEMORY_MB = int(os.getenv("BROWSER_MAX_MEMORY_MB", 1024))  # 0 disables the check
+BROWSER_CHECKOUT_TIMEOUT = float(os.getenv("BROWSER_CHECKOUT_TIMEOUT", 60.0))
+
+# Browser job queue (browser tasks run on dedicated worker threads, never the server's thread pool)
+BROWSER_WORKERS = int(os.getenv("BROWSER_WORKERS", BROWSER_POOL_SIZE))
+BROWSER_QUEUE_SIZE = int(os.getenv("BROWSER_QUEUE_SIZE", 20))  # waiting jobs; more get a 429
+BROWSER_JOB_TIMEOUT = float(os.getenv("BROWSER_JOB_TIMEOUT", 60.0))
+BROWSER_JOB_TTL = float(os.getenv("BROWSER_JOB_TTL", 600.0))  # how long finished jobs can be polled
+BROWSER_QUEUE_RETRY_AFTER = int(os.getenv("BROWSER_QUEUE_RETRY_AFTER", 10))  # seconds, sent with 429
+BROWSER_QUEUE_WAIT = float(os.getenv("BROWSER_QUEUE_WAIT", 60.0))  # how long a batch render waits for room in the queue
+# Let the browser load localhost and hosts on private/reserved IP addresses, also via DNS or redirects
+# (off: its HTML is returned to callers)
+BROWSER_ALLOW_PRIVATE_HOSTS = os.getenv("BROWSER_ALLOW_PRIVATE_HOSTS", "false").lower() in ("1", "true", "yes")
+
+# check_url render mode: readiness ("load", "networkidle" or a CSS selector) and its time limit
+RENDER_WAIT = os.getenv("RENDER_WAIT", "load")
+RENDER_TIMEOUT = float(os.getenv("RENDER_TIMEOUT", 20.0))
+RENDER_IDLE_MS = int(os.getenv("RENDER_IDLE_MS", 500))
+
+# Render mode request blocking (comma-separated): resource types (image, font, media, stylesheet, script, other),
+# domains always blocked, and, if set, the only third-party domains allowed
+RENDER_BLOCK_TYPES = [t.strip() for t in os.getenv("RENDER_BLOCK_TYPES", "image,font,media").split(",") if t.strip()]
+RENDER_DENY_DOMAINS = [d.strip() for d in os.getenv(
+    "RENDER_DENY_DOMAINS",
+    "google-analytics.com,googletagmanager.com,doubleclick.net,facebook.net,hotjar.com,clarity.ms"
+).split(",") if d.strip()]
+RENDER_ALLOW_DOMAINS = [d.strip() for d in os.getenv("RENDER_ALLOW_DOMAINS", "").split(",") if d.strip()]
+
+# Page performance capture: extra time after readiness for late LCP and layout shift entries
+PERFORMANCE_SETTLE_MS = int(os.getenv("PERFORMANCE_SETTLE_MS", 1000))
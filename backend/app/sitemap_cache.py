@@ -0,0 +1,319 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+from fastapi import Request
+
+from app import settings
+from app.sitemap_stream import ParsedSitemap, SitemapStream, collect_sitemap, open_sitemap
+
+
+class SitemapCacheWriter:
+    """
+    Writes the <loc> values of a sitemap to a temporary gzip file while it is
+    parsed; `commit()` moves it into the cache, `abort()` throws it away.
+    """
+
+    def __init__(self, cache: "SitemapDiskCache", url: str, etag: Optional[str], last_modified: Optional[str]):
+        self.cache = cache
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.count = 0
+        self._tmp_path = f"{cache.data_path(url)}.{uuid.uuid4().hex}.tmp"
+        self._file = gzip.open(self._tmp_path, "wt", encoding="utf-8", compresslevel=6)
+        self._broken = False
+        self._done = False
+
+    def add(self, loc: str):
+        if self._broken:
+            return
+        if "\n" in loc:
+            # One value per line in the stored form, such a file can't be cached
+            self._broken = True
+            return
+        self._file.write(loc + "\n")
+        self.count += 1
+
+    def finish(self, parsed: ParsedSitemap) -> bool:
+        """
+        Commits a successfully parsed file, discards anything else.
+        """
+        if parsed.ok:
+            return self.commit(parsed.kind)
+        self.abort()
+        return False
+
+    def commit(self, kind: Optional[str]) -> bool:
+        if self._done:
+            return False
+        self._done = True
+        self._file.close()
+        if self._broken:
+            self._remove_tmp()
+            return False
+        self.cache.install(self.url, self._tmp_path, {
+            "url": self.url,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "kind": kind,
+            "count": self.count,
+        })
+        return True
+
+    def abort(self):
+        if self._done:
+            return
+        self._done = True
+        self._file.close()
+        self._remove_tmp()
+
+    def _remove_tmp(self):
+        try:
+            os.remove(self._tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+class SitemapDiskCache:
+    """
+    On-disk cache of parsed sitemaps, used for conditional GETs.
+
+    For every sitemap URL served with an ETag or Last-Modified header, the
+    <loc> values are stored as a gzipped one-per-line file next to a small JSON
+    file with the validators. A refetch sends If-None-Match /
+    If-Modified-Since, and a 304 is answered from the stored list without
+    downloading or parsing the sitemap again.
+
+    The total size of the stored lists is kept under `max_bytes` by evicting
+    the least recently used entries (access time survives restarts via mtime).
+    """
+
+    def __init__(self, directory: str = settings.SITEMAP_CACHE_DIR, max_bytes: int = settings.SITEMAP_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # key -> metadata (incl. "size"), least recently used first
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def data_path(self, url: str) -> str:
+        return os.path.join(self.directory, self.key(url) + ".txt.gz")
+
+    def meta_path(self, url: str) -> str:
+        return os.path.join(self.directory, self.key(url) + ".json")
+
+    def _scan(self):
+        """
+        Rebuilds the index from the files left by a previous run.
+        """
+        found = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".tmp"):
+                os.remove(path)
+                continue
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    meta = json.load(f)
+                data = os.stat(self.data_path(meta["url"]))
+            except (OSError, ValueError, KeyError):
+                os.remove(path)
+                continue
+            meta["size"] = data.st_size
+            found.append((data.st_mtime, meta))
+
+        for _, meta in sorted(found, key=lambda item: item[0]):
+            self._entries[self.key(meta["url"])] = meta
+            self.total_bytes += meta["size"]
+        self._evict()
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        meta = self._entries.get(self.key(url))
+        if meta is None:
+            return {}
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def writer(self, url: str, response: httpx.Response) -> Optional[SitemapCacheWriter]:
+        """
+        Returns a writer for a 200 response that can be revalidated later, or None.
+        """
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code != 200 or not (etag or last_modified):
+            return None
+        return SitemapCacheWriter(self, url, etag, last_modified)
+
+    def install(self, url: str, tmp_path: str, meta: dict):
+        key = self.key(url)
+        self.discard(url)
+        os.replace(tmp_path, self.data_path(url))
+        meta["size"] = os.path.getsize(self.data_path(url))
+        with open(self.meta_path(url), "w", encoding="utf-8") as f:
+            json.dump({k: v for k, v in meta.items() if k != "size"}, f)
+        self._entries[key] = meta
+        self.total_bytes += meta["size"]
+        self._evict()
+
+    async def load(self, url: str, status_code: int = 304) -> Optional[ParsedSitemap]:
+        """
+        Reads a stored list back into a ParsedSitemap, or None if it's gone.
+        """
+        key = self.key(url)
+        meta = self._entries.get(key)
+        if meta is None:
+            return None
+        try:
+            locs = await asyncio.to_thread(self._read_locs, self.data_path(url))
+        except (OSError, EOFError):
+            self.discard(url)
+            return None
+
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        parsed = ParsedSitemap(url, status_code)
+        parsed.kind = meta["kind"]
+        parsed.locs = locs
+        return parsed
+
+    def _read_locs(self, path: str):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            # Values can't contain "\n" (see SitemapCacheWriter.add), other line breaks are data
+            locs = f.read().split("\n")[:-1]
+        # Keeps LRU order across restarts
+        os.utime(path)
+        return locs
+
+    def discard(self, url: str):
+        meta = self._entries.pop(self.key(url), None)
+        if meta is not None:
+            self.total_bytes -= meta["size"]
+        for path in (self.data_path(url), self.meta_path(url)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._entries:
+            _, meta = next(iter(self._entries.items()))
+            self.discard(meta["url"])
+
+    def clear(self):
+        for meta in list(self._entries.values()):
+            self.discard(meta["url"])
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+@asynccontextmanager
+async def open_sitemap_cached(
+    client: httpx.AsyncClient,
+    cache: Optional[SitemapDiskCache],
+    url: str,
+    timeout=None,
+    **parser_options
+) -> AsyncIterator[Tuple[Optional[ParsedSitemap], Optional[SitemapStream], Optional[SitemapCacheWriter]]]:
+    """
+    `open_sitemap` with revalidation against the disk cache.
+
+    Yields `(cached, sitemap, writer)`:
+    - on a 304 with a stored list: `cached` is that list (cache_status "hit");
+    - otherwise `sitemap` is the live stream, and `writer` (if the response
+      can be cached) should get every <loc> and then `finish(parsed)`.
+      Unfinished writers are discarded.
+    """
+    headers = cache.conditional_headers(url) if cache is not None else {}
+
+    if headers:
+        async with open_sitemap(client, url, timeout=timeout, headers=headers, **parser_options) as sitemap:
+            if sitemap.status_code == 304:
+                cached = await cache.load(url)
+                if cached is not None:
+                    cache.hits += 1
+                    cached.cache_status = "hit"
+                    yield cached, None, None
+                    return
+                # Stored list vanished since the request was sent: fetch it for real below
+            else:
+                async with _cache_miss(cache, url, sitemap) as writer:
+                    yield None, sitemap, writer
+                return
+
+    async with open_sitemap(client, url, timeout=timeout, **parser_options) as sitemap:
+        async with _cache_miss(cache, url, sitemap) as writer:
+            yield None, sitemap, writer
+
+
+@asynccontextmanager
+async def _cache_miss(cache: Optional[SitemapDiskCache], url: str, sitemap: SitemapStream):
+    if cache is None:
+        yield None
+        return
+    cache.misses += 1
+    writer = cache.writer(url, sitemap.response)
+    try:
+        yield writer
+    finally:
+        if writer is not None:
+            writer.abort()
+
+
+async def read_sitemap_cached(
+    client: httpx.AsyncClient,
+    cache: Optional[SitemapDiskCache],
+    url: str,
+    timeout=None
+) -> ParsedSitemap:
+    """
+    Like `read_sitemap`, but revalidates against the disk cache.
+
+    `cache_status` on the result is "hit" when the server answered 304 and the
+    stored list was used, "miss" otherwise (None without a cache).
+    """
+    async with open_sitemap_cached(client, cache, url, timeout=timeout) as (cached, sitemap, writer):
+        if cached is not None:
+            return cached
+        parsed = await collect_sitemap(sitemap, on_loc=writer.add if writer else None)
+        if writer is not None:
+            writer.finish(parsed)
+        if cache is not None:
+            parsed.cache_status = "miss"
+        return parsed
+
+
+def get_sitemap_cache(request: Request) -> Optional[SitemapDiskCache]:
+    """
+    FastAPI dependency returning the shared disk cache, or None when disabled.
+    """
+    if not settings.SITEMAP_CACHE_ENABLED:
+        return None
+    cache = getattr(request.app.state, "sitemap_cache", None)
+    if cache is None:
+        cache = SitemapDiskCache()
+        request.app.state.sitemap_cache = cache
+    return cache
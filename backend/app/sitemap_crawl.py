@@ -0,0 +1,178 @@
+import xml.etree.ElementTree as ET
+from typing import Callable, List, Optional, Tuple
+
+import httpx
+from pydantic import BaseModel
+
+from app import settings
+from app.concurrency import run_bounded
+from app.sitemap_snapshot import url_hash
+from app.sitemap_stream import SitemapDecompressionError, UnsupportedSitemapError, describe_error, open_sitemap
+
+
+class SitemapFileResult(BaseModel):
+    sitemap_url: str
+    parent: Optional[str]  # index that listed this file, None for the root
+    depth: int
+    sitemap_status: str
+    http_status: Optional[int]
+    kind: Optional[str]  # 'urlset' or 'sitemapindex'
+    url_count: int = 0  # <loc> entries in a <urlset>
+    new_url_count: int = 0  # of those, not already seen in another file
+    sitemap_count: int = 0  # nested files listed by a <sitemapindex>
+    message: str
+
+
+class SitemapCrawl:
+    """
+    Expands a sitemap (index) into all of its URLs.
+
+    Nested indexes are followed level by level up to `max_depth`, each level
+    fetched concurrently (at most `concurrency` files at once). A file is
+    fetched only once even if several indexes list it, and URLs are deduped
+    across files (by 64-bit hash) in first-seen order.
+
+    Every new URL is appended to `urls` when `keep_urls` is set, and passed
+    with its lastmod to `on_url(loc, lastmod)` when given.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        max_depth: int = settings.SITEMAP_CRAWL_MAX_DEPTH,
+        max_files: int = settings.SITEMAP_CRAWL_MAX_FILES,
+        concurrency: int = settings.SITEMAP_CRAWL_CONCURRENCY,
+        timeout=None,
+        keep_urls: bool = True,
+        on_url: Optional[Callable[[str, Optional[str]], None]] = None,
+    ):
+        self.client = client
+        self.max_depth = max_depth
+        self.max_files = max_files
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.files: List[SitemapFileResult] = []
+        self.keep_urls = keep_urls
+        self.on_url = on_url
+        self.urls: List[str] = []
+        self.unique_urls = 0
+        self.duplicate_urls = 0
+        self._seen_urls = set()
+        self._seen_files = set()
+
+    async def run(self, sitemap_url: str) -> "SitemapCrawl":
+        self._seen_files.add(sitemap_url)
+        level: List[Tuple[str, Optional[str]]] = [(sitemap_url, None)]
+        depth = 0
+
+        while level:
+            children: List[Tuple[str, Optional[str]]] = []
+            results = run_bounded(
+                level,
+                lambda item, depth=depth: self._fetch(item[0], item[1], depth),
+                self.concurrency
+            )
+            async for result, nested in results:
+                self.files.append(result)
+                for child in nested:
+                    if child not in self._seen_files:
+                        self._seen_files.add(child)
+                        children.append((child, result.sitemap_url))
+
+            depth += 1
+            level = []
+            for child, parent in children:
+                if depth > self.max_depth:
+                    self.files.append(self._skipped(child, parent, depth, "Max depth reached, not fetched."))
+                elif self.fetched_files + len(level) >= self.max_files:
+                    self.files.append(self._skipped(child, parent, depth, "Max files reached, not fetched."))
+                else:
+                    level.append((child, parent))
+
+        return self
+
+    def _add_url(self, loc: str, lastmod: Optional[str]) -> bool:
+        key = url_hash(loc)
+        if key in self._seen_urls:
+            self.duplicate_urls += 1
+            return False
+        self._seen_urls.add(key)
+        self.unique_urls += 1
+        if self.keep_urls:
+            self.urls.append(loc)
+        if self.on_url is not None:
+            self.on_url(loc, lastmod)
+        return True
+
+    @property
+    def fetched_files(self) -> int:
+        return sum(1 for file in self.files if file.sitemap_status != "Skipped")
+
+    @property
+    def failed_files(self) -> int:
+        return sum(1 for file in self.files if file.sitemap_status not in ("Parsed", "Skipped"))
+
+    @property
+    def skipped_files(self) -> int:
+        return sum(1 for file in self.files if file.sitemap_status == "Skipped")
+
+    @staticmethod
+    def _skipped(sitemap_url: str, parent: str, depth: int, message: str) -> SitemapFileResult:
+        return SitemapFileResult(
+            sitemap_url=sitemap_url,
+            parent=parent,
+            depth=depth,
+            sitemap_status="Skipped",
+            http_status=None,
+            kind=None,
+            message=message
+        )
+
+    async def _fetch(self, sitemap_url: str, parent: Optional[str], depth: int) -> Tuple[SitemapFileResult, List[str]]:
+        """
+        Fetches one file. Returns its result and, for an index, the files it lists.
+        """
+        result = SitemapFileResult(
+            sitemap_url=sitemap_url,
+            parent=parent,
+            depth=depth,
+            sitemap_status="Parsed",
+            http_status=None,
+            kind=None,
+            message=""
+        )
+        nested: List[str] = []
+
+        try:
+            async with open_sitemap(self.client, sitemap_url, timeout=self.timeout, with_lastmod=True) as sitemap:
+                result.http_status = sitemap.status_code
+                if sitemap.status_code >= 400:
+                    result.sitemap_status = "Not Found"
+                    result.message = f"Sitemap file returned status {sitemap.status_code}."
+                    return result, nested
+
+                try:
+                    async for loc, lastmod in sitemap:
+                        result.kind = sitemap.kind
+                        if sitemap.kind == "urlset":
+                            result.url_count += 1
+                            if self._add_url(loc, lastmod):
+                                result.new_url_count += 1
+                        else:
+                            result.sitemap_count += 1
+                            nested.append(loc)
+                    result.kind = sitemap.kind
+                except (ET.ParseError, SitemapDecompressionError, UnsupportedSitemapError) as e:
+                    result.sitemap_status, result.message = describe_error(e)
+                    return result, nested
+
+        except httpx.RequestError as exc:
+            result.sitemap_status = "Error"
+            result.message = f"Request error: {exc}"
+            return result, nested
+
+        if result.kind == "urlset":
+            result.message = f"Parsed {result.url_count} URLs ({result.new_url_count} new)."
+        else:
+            result.message = f"Found {len(nested)} nested sitemap files."
+        return result, nested
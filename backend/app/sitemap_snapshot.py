@@ -0,0 +1,236 @@
+import gzip
+import hashlib
+import json
+import operator
+import os
+import time
+import uuid
+from array import array
+from itertools import islice
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi import Request
+
+from app import settings
+
+
+def url_hash(value: str) -> int:
+    """
+    64-bit hash of a string; collisions are negligible at millions of URLs.
+    """
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class Snapshot:
+    """
+    A sitemap's URL set, stored as parallel arrays sorted by URL hash:
+
+    - `hashes`: 64-bit URL hashes (unique, ascending)
+    - `lastmods`: 64-bit hash of each URL's lastmod (0 when missing)
+    - `lines`: line number of the URL in `urls_path`
+
+    The URL strings themselves stay on disk (`loc\\tlastmod` per line, in the
+    order they were seen) and are only read back for the entries a diff
+    actually reports. That keeps a million-URL snapshot at ~24 MB of arrays
+    instead of a set of Python strings.
+    """
+
+    def __init__(self, hashes: array, lastmods: array, lines: array, urls_path: str, created_at: float):
+        self.hashes = hashes
+        self.lastmods = lastmods
+        self.lines = lines
+        self.urls_path = urls_path
+        self.created_at = created_at
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def read(self, positions: Iterable[int], limit: Optional[int] = None) -> List[Tuple[str, Optional[str]]]:
+        """
+        Returns `(loc, lastmod)` for the given positions (at most `limit`,
+        in file order), with one sequential pass over the URL file.
+        """
+        wanted = sorted(self.lines[position] for position in positions)
+        if limit is not None:
+            wanted = wanted[:limit]
+        if not wanted:
+            return []
+
+        entries = []
+        targets = iter(wanted)
+        target = next(targets)
+        with gzip.open(self.urls_path, "rt", encoding="utf-8") as f:
+            for number, line in enumerate(f):
+                if number != target:
+                    continue
+                loc, _, lastmod = line.rstrip("\n").partition("\t")
+                entries.append((loc, lastmod or None))
+                target = next(targets, None)
+                if target is None:
+                    break
+        return entries
+
+
+class SnapshotBuilder:
+    """
+    Collects `(loc, lastmod)` entries into a new Snapshot. URLs are written
+    straight to a gzip file; only their hashes are kept in memory. Repeated
+    URLs keep their first lastmod.
+    """
+
+    def __init__(self, directory: str):
+        self.urls_path = os.path.join(directory, f"{uuid.uuid4().hex}.urls.tmp.gz")
+        self._file = gzip.open(self.urls_path, "wt", encoding="utf-8", compresslevel=6)
+        self._hashes = array("Q")
+        self._lastmods = array("Q")
+        # Few distinct lastmod values per sitemap, don't hash them again and again
+        self._lastmod_hashes = {}
+        self.skipped = 0
+
+    def add(self, loc: str, lastmod: Optional[str] = None):
+        if "\n" in loc or "\t" in loc or (lastmod and ("\n" in lastmod or "\t" in lastmod)):
+            # Not a valid URL / W3C date anyway, and would break the line format
+            self.skipped += 1
+            return
+        self._file.write(f"{loc}\t{lastmod or ''}\n")
+        self._hashes.append(url_hash(loc))
+        if not lastmod:
+            self._lastmods.append(0)
+            return
+        value = self._lastmod_hashes.get(lastmod)
+        if value is None:
+            if len(self._lastmod_hashes) >= 4096:
+                self._lastmod_hashes.clear()
+            value = self._lastmod_hashes[lastmod] = url_hash(lastmod)
+        self._lastmods.append(value)
+
+    def finish(self) -> Snapshot:
+        self._file.close()
+        # Stable sort by hash: the first occurrence of a repeated URL comes first
+        order = sorted(range(len(self._hashes)), key=self._hashes.__getitem__)
+        hashes = array("Q", map(self._hashes.__getitem__, order))
+
+        if any(map(operator.eq, hashes, islice(hashes, 1, None))):
+            order = [line for i, line in enumerate(order) if i == 0 or hashes[i] != hashes[i - 1]]
+            hashes = array("Q", map(self._hashes.__getitem__, order))
+
+        lastmods = array("Q", map(self._lastmods.__getitem__, order))
+        return Snapshot(hashes, lastmods, array("Q", order), self.urls_path, time.time())
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self.urls_path)
+        except FileNotFoundError:
+            pass
+
+
+class SnapshotDiff:
+    """
+    Positions of added / changed entries (in the new snapshot) and of removed
+    entries (in the old one).
+    """
+
+    def __init__(self):
+        self.added = array("Q")
+        self.removed = array("Q")
+        self.changed_new = array("Q")
+        self.changed_old = array("Q")
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> SnapshotDiff:
+    """
+    Single merge pass over both sorted hash arrays: O(n + m), no extra
+    per-URL objects.
+    """
+    result = SnapshotDiff()
+    old_hashes, new_hashes = old.hashes, new.hashes
+    i = j = 0
+    while i < len(old_hashes) and j < len(new_hashes):
+        a, b = old_hashes[i], new_hashes[j]
+        if a == b:
+            if old.lastmods[i] != new.lastmods[j]:
+                result.changed_old.append(i)
+                result.changed_new.append(j)
+            i += 1
+            j += 1
+        elif a < b:
+            result.removed.append(i)
+            i += 1
+        else:
+            result.added.append(j)
+            j += 1
+    result.removed.extend(range(i, len(old_hashes)))
+    result.added.extend(range(j, len(new_hashes)))
+    return result
+
+
+class SnapshotStore:
+    """
+    Keeps the latest Snapshot per sitemap URL on disk:
+    `<key>.urls.gz` (URL lines), `<key>.idx` (the three arrays) and
+    `<key>.json` (metadata).
+    """
+
+    def __init__(self, directory: str = settings.SITEMAP_SNAPSHOT_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, sitemap_url: str, suffix: str) -> str:
+        key = hashlib.sha256(sitemap_url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key + suffix)
+
+    def builder(self) -> SnapshotBuilder:
+        return SnapshotBuilder(self.directory)
+
+    def load(self, sitemap_url: str) -> Optional[Snapshot]:
+        try:
+            with open(self._path(sitemap_url, ".json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            arrays = []
+            with open(self._path(sitemap_url, ".idx"), "rb") as f:
+                for _ in range(3):
+                    values = array("Q")
+                    values.fromfile(f, meta["count"])
+                    arrays.append(values)
+        except (OSError, ValueError, KeyError, EOFError):
+            return None
+        return Snapshot(*arrays, self._path(sitemap_url, ".urls.gz"), meta["created_at"])
+
+    def save(self, sitemap_url: str, snapshot: Snapshot):
+        """
+        Replaces the stored snapshot. `snapshot` must come from `builder()`.
+        """
+        urls_path = self._path(sitemap_url, ".urls.gz")
+        os.replace(snapshot.urls_path, urls_path)
+        snapshot.urls_path = urls_path
+
+        tmp = self._path(sitemap_url, ".idx.tmp")
+        with open(tmp, "wb") as f:
+            for values in (snapshot.hashes, snapshot.lastmods, snapshot.lines):
+                values.tofile(f)
+        os.replace(tmp, self._path(sitemap_url, ".idx"))
+
+        with open(self._path(sitemap_url, ".json"), "w", encoding="utf-8") as f:
+            json.dump({"sitemap_url": sitemap_url, "count": len(snapshot), "created_at": snapshot.created_at}, f)
+
+    def discard(self, snapshot: Snapshot):
+        """
+        Deletes an unsaved snapshot's URL file.
+        """
+        if snapshot.urls_path.endswith(".tmp.gz"):
+            try:
+                os.remove(snapshot.urls_path)
+            except FileNotFoundError:
+                pass
+
+
+def get_snapshot_store(request: Request) -> SnapshotStore:
+    """
+    FastAPI dependency returning the shared sitemap snapshot store.
+    """
+    store = getattr(request.app.state, "sitemap_snapshots", None)
+    if store is None:
+        store = SnapshotStore()
+        request.app.state.sitemap_snapshots = store
+    return store
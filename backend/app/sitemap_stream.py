@@ -0,0 +1,352 @@
+import math
+import xml.etree.ElementTree as ET
+import zlib
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Max bytes produced per decompress() call, keeps zip bombs from blowing up memory
+DECOMPRESS_CHUNK = 64 * 1024
+
+SUPPORTED_ROOTS = ("urlset", "sitemapindex")
+
+
+class SitemapDecompressionError(Exception):
+    pass
+
+
+class UnsupportedSitemapError(Exception):
+    pass
+
+
+def describe_error(error: Exception) -> Tuple[str, str]:
+    """
+    Maps a sitemap parsing error to the (sitemap_status, message) pair
+    reported for a single sitemap file.
+    """
+    if isinstance(error, SitemapDecompressionError):
+        return "Decompression Failed", f"Failed to decompress gzip sitemap: {error}"
+    if isinstance(error, UnsupportedSitemapError):
+        return "Unsupported format", f"Sitemap XML has unsupported root element <{error}>."
+    return "Parse Error", f"Failed to parse sitemap XML: {error}"
+
+
+class SitemapEntry(NamedTuple):
+    loc: str
+    lastmod: Optional[str] = None
+    changefreq: Optional[str] = None
+    priority: Optional[float] = None
+    images: Tuple[str, ...] = ()  # <image:image><image:loc>
+    alternates: Tuple[Tuple[Optional[str], str], ...] = ()  # <xhtml:link rel="alternate">: (hreflang, href)
+
+
+def parse_w3c_datetime(value: str) -> Optional[datetime]:
+    """
+    Parses a sitemap <lastmod> (W3C Datetime: YYYY, YYYY-MM, YYYY-MM-DD or a
+    full timestamp). Values without a timezone are taken as UTC. Returns
+    None for anything unparseable.
+    """
+    value = value.strip()
+    if len(value) == 4:
+        value += "-01-01"
+    elif len(value) == 7:
+        value += "-01"
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def local_name(tag: str) -> str:
+    """
+    '{http://www.sitemaps.org/schemas/sitemap/0.9}loc' -> 'loc'
+    """
+    return tag.rpartition('}')[2]
+
+
+class _GzipStream:
+    """
+    Incremental gzip decompressor (handles multi-member files).
+    """
+
+    def __init__(self):
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def decompress(self, data: bytes):
+        try:
+            while data:
+                out = self._decompressor.decompress(data, DECOMPRESS_CHUNK)
+                if out:
+                    yield out
+                data = self._decompressor.unconsumed_tail
+                if self._decompressor.eof and self._decompressor.unused_data:
+                    data = self._decompressor.unused_data
+                    self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        except zlib.error as e:
+            raise SitemapDecompressionError(str(e)) from e
+
+    def flush(self) -> bytes:
+        if not self._decompressor.eof:
+            raise SitemapDecompressionError("Compressed data ended before the end-of-stream marker")
+        return self._decompressor.flush()
+
+
+class SitemapParser:
+    """
+    Push parser for sitemap files: feed raw body chunks, get <loc> values back.
+
+    Gzip is detected from the magic bytes and decompressed incrementally, and
+    each <url>/<sitemap> element is dropped from the tree as soon as it has
+    been read, so memory stays flat whatever the file size.
+
+    `kind` is set to the local name of the root element once it is seen.
+    What comes back per entry:
+    - by default the <loc> string;
+    - with `with_lastmod=True` a `(loc, lastmod)` tuple;
+    - with `full=True` a SitemapEntry (lastmod, changefreq, priority, images,
+      hreflang alternates), all read in the same pass.
+
+    With `modified_since`, entries whose <lastmod> is older are dropped while
+    parsing (counted in `filtered`); entries without a usable lastmod are kept
+    unless `keep_undated=False`.
+    """
+
+    def __init__(
+        self,
+        with_lastmod: bool = False,
+        full: bool = False,
+        modified_since: Optional[datetime] = None,
+        keep_undated: bool = True,
+    ):
+        self.with_lastmod = with_lastmod
+        self.full = full
+        if modified_since is not None and modified_since.tzinfo is None:
+            modified_since = modified_since.replace(tzinfo=timezone.utc)
+        self.modified_since = modified_since
+        self.keep_undated = keep_undated
+        self.filtered = 0
+        self.kind: Optional[str] = None
+        self.bytes_received = 0
+        self.bytes_parsed = 0
+        self._gzip: Optional[_GzipStream] = None
+        self._sniffed = False
+        self._head = b''
+        self._xml = ET.XMLPullParser(events=("start", "end"))
+        self._root = None
+        self._entry_tag = None
+
+    def feed(self, chunk: bytes) -> List[str]:
+        self.bytes_received += len(chunk)
+        if not self._sniffed:
+            self._head += chunk
+            if len(self._head) < len(GZIP_MAGIC):
+                return []
+            self._sniffed = True
+            if self._head.startswith(GZIP_MAGIC):
+                self._gzip = _GzipStream()
+            chunk, self._head = self._head, b''
+
+        if self._gzip is None:
+            return self._feed_xml(chunk)
+
+        locs = []
+        for data in self._gzip.decompress(chunk):
+            locs.extend(self._feed_xml(data))
+        return locs
+
+    def close(self) -> List[str]:
+        locs = []
+        if not self._sniffed and self._head:
+            self._sniffed = True
+            locs.extend(self._feed_xml(self._head))
+        if self._gzip is not None:
+            locs.extend(self._feed_xml(self._gzip.flush()))
+        self._xml.close()
+        locs.extend(self._drain())
+        if self.kind not in SUPPORTED_ROOTS:
+            # Reported only once the document is known to be well-formed
+            raise UnsupportedSitemapError(self.kind)
+        return locs
+
+    def _feed_xml(self, data: bytes) -> List[str]:
+        if not data:
+            return []
+        self.bytes_parsed += len(data)
+        self._xml.feed(data)
+        return self._drain()
+
+    def _drain(self) -> List[str]:
+        locs = []
+        for event, elem in self._xml.read_events():
+            if self._root is None:
+                self._root = elem
+                self.kind = local_name(elem.tag)
+                if self.kind in SUPPORTED_ROOTS:
+                    self._entry_tag = "url" if self.kind == "urlset" else "sitemap"
+                continue
+
+            if event != "end":
+                continue
+            if self._entry_tag is None:
+                # Unsupported root: keep checking well-formedness, keep nothing
+                self._root.clear()
+            elif local_name(elem.tag) == self._entry_tag:
+                entry = self._entry(elem)
+                if entry:
+                    locs.append(entry)
+                # Drop processed entries so the tree never grows
+                self._root.clear()
+        return locs
+
+    def _entry(self, elem):
+        loc = lastmod = changefreq = priority = None
+        images, alternates = [], []
+        for child in elem:
+            name = local_name(child.tag)
+            if name == "loc":
+                if loc is None:
+                    loc = (child.text or "").strip()
+            elif name == "lastmod":
+                if lastmod is None:
+                    lastmod = (child.text or "").strip() or None
+            elif not self.full:
+                continue
+            elif name == "changefreq":
+                changefreq = (child.text or "").strip() or None
+            elif name == "priority":
+                priority = self._priority(child.text)
+            elif name == "image":
+                for part in child:
+                    if local_name(part.tag) == "loc" and (part.text or "").strip():
+                        images.append(part.text.strip())
+            elif name == "link" and child.get("rel") == "alternate" and child.get("href"):
+                alternates.append((child.get("hreflang"), child.get("href").strip()))
+
+        if not loc:
+            return None
+        if self.modified_since is not None and not self._modified(lastmod):
+            self.filtered += 1
+            return None
+        if self.full:
+            return SitemapEntry(loc, lastmod, changefreq, priority, tuple(images), tuple(alternates))
+        return (loc, lastmod) if self.with_lastmod else loc
+
+    def _modified(self, lastmod: Optional[str]) -> bool:
+        parsed = parse_w3c_datetime(lastmod) if lastmod else None
+        if parsed is None:
+            return self.keep_undated
+        return parsed >= self.modified_since
+
+    @staticmethod
+    def _priority(text: Optional[str]) -> Optional[float]:
+        try:
+            value = float(text)
+        except (TypeError, ValueError):
+            return None
+        return value if math.isfinite(value) else None
+
+
+class SitemapStream:
+    """
+    A sitemap response being parsed while it downloads.
+
+    Iterate it to get <loc> values; `kind` is known after the first one
+    (or after iteration for empty files).
+    """
+
+    def __init__(self, response: httpx.Response, **parser_options):
+        self.response = response
+        self.parser = SitemapParser(**parser_options)
+
+    @property
+    def status_code(self) -> int:
+        return self.response.status_code
+
+    @property
+    def kind(self) -> Optional[str]:
+        return self.parser.kind
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        async for chunk in self.response.aiter_bytes():
+            for loc in self.parser.feed(chunk):
+                yield loc
+        for loc in self.parser.close():
+            yield loc
+
+
+@asynccontextmanager
+async def open_sitemap(
+    client: httpx.AsyncClient,
+    url: str,
+    timeout=None,
+    headers: Optional[dict] = None,
+    **parser_options
+):
+    """
+    Opens a streamed GET for a sitemap file. The body is only read while the
+    returned SitemapStream is iterated. `parser_options` go to SitemapParser.
+    """
+    async with client.stream(
+        "GET",
+        url,
+        timeout=timeout if timeout is not None else client.timeout,
+        headers=headers
+    ) as response:
+        yield SitemapStream(response, **parser_options)
+
+
+class ParsedSitemap:
+    """
+    A fully read sitemap file: HTTP status, root kind and all <loc> values.
+
+    Parse/decompression failures are kept in `error` (with whatever was parsed
+    before them in `locs`) instead of being raised.
+    """
+
+    def __init__(self, url: str, status_code: int):
+        self.url = url
+        self.status_code = status_code
+        self.kind: Optional[str] = None
+        self.locs: List[str] = []
+        self.error: Optional[Exception] = None
+        self.cache_status: Optional[str] = None  # "hit" / "miss" when the disk cache was used
+        self.validation = None  # SitemapValidation when read with validation
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400 and self.error is None
+
+
+async def read_sitemap(client: httpx.AsyncClient, url: str, timeout=None) -> ParsedSitemap:
+    """
+    Downloads and parses a whole sitemap file. Error responses (>= 400) are
+    not parsed. httpx.RequestError is propagated.
+    """
+    async with open_sitemap(client, url, timeout=timeout) as sitemap:
+        return await collect_sitemap(sitemap)
+
+
+async def collect_sitemap(sitemap: SitemapStream, on_loc=None) -> ParsedSitemap:
+    """
+    Reads the rest of an opened sitemap into a ParsedSitemap, calling
+    `on_loc(loc)` for every value on the way.
+    """
+    parsed = ParsedSitemap(str(sitemap.response.url), sitemap.status_code)
+    if sitemap.status_code >= 400:
+        return parsed
+    try:
+        async for loc in sitemap:
+            parsed.locs.append(loc)
+            if on_loc is not None:
+                on_loc(loc)
+    except (ET.ParseError, SitemapDecompressionError, UnsupportedSitemapError) as e:
+        parsed.error = e
+    parsed.kind = sitemap.kind
+    return parsed
@@ -0,0 +1,188 @@
+import hashlib
+import math
+import re
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from pydantic import BaseModel, Field
+
+from app import settings
+from app.sitemap_stream import (
+    ParsedSitemap,
+    SitemapDecompressionError,
+    UnsupportedSitemapError,
+    open_sitemap,
+    parse_w3c_datetime,
+)
+
+# sitemaps.org protocol limits, per file
+MAX_URLS = 50_000
+MAX_UNCOMPRESSED_BYTES = 50 * 1024 * 1024
+
+# W3C Datetime as allowed in <lastmod>: YYYY, YYYY-MM, YYYY-MM-DD, or a
+# timestamp with minutes (optionally seconds and fractions) and a timezone
+LASTMOD_RE = re.compile(
+    r"^\d{4}(-\d{2}(-\d{2}(T\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:\d{2}))?)?)?$"
+)
+# Anything outside RFC 3986 reserved/unreserved characters must be percent-encoded
+UNESCAPED_RE = re.compile(r"[^A-Za-z0-9\-._~:/?#\[\]@!$&'()*+,;=%]")
+BAD_PERCENT_RE = re.compile(r"%(?![0-9A-Fa-f]{2})")
+
+
+class BloomFilter:
+    """
+    Fixed-size set membership with no false negatives and about
+    `error_rate` false positives once `capacity` items were added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, value: str) -> bool:
+        """
+        Adds `value`; returns True if it was (probably) already there.
+        """
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        seen = True
+        for i in range(self.hashes):
+            bit = (h1 + i * h2) % self.size
+            byte, mask = bit >> 3, 1 << (bit & 7)
+            if not self._bits[byte] & mask:
+                seen = False
+                self._bits[byte] |= mask
+        return seen
+
+
+class ValidationIssue(BaseModel):
+    code: str
+    count: int
+    message: str
+    examples: List[str] = Field(default_factory=list)
+
+
+class SitemapValidation(BaseModel):
+    valid: bool
+    entry_count: int
+    uncompressed_bytes: int
+    duplicates_approximate: bool = True  # duplicate detection uses a Bloom filter
+    issues: List[ValidationIssue] = Field(default_factory=list)
+
+
+class SitemapValidator:
+    """
+    Checks a sitemap against the sitemaps.org protocol while it is parsed:
+    fed one `(loc, lastmod)` at a time, it keeps only counters, a few
+    examples per problem and a fixed-size Bloom filter for duplicates, so
+    memory stays bounded whatever the file size.
+    """
+
+    MESSAGES = {
+        "too_many_urls": f"More than {MAX_URLS:,} entries in one file.",
+        "file_too_large": f"Uncompressed size over {MAX_UNCOMPRESSED_BYTES // (1024 * 1024)} MB.",
+        "duplicate_loc": "Same <loc> listed more than once.",
+        "foreign_host": "<loc> on a different host than the sitemap.",
+        "not_absolute": "<loc> is not an absolute http(s) URL.",
+        "malformed_url": "<loc> can't be parsed as a URL (e.g. an unclosed [ in the host).",
+        "bad_escaping": "<loc> has unescaped or badly percent-encoded characters.",
+        "invalid_lastmod": "<lastmod> is not a valid W3C Datetime.",
+    }
+
+    def __init__(
+        self,
+        sitemap_url: str,
+        max_examples: int = 10,
+        bloom_capacity: int = settings.SITEMAP_VALIDATION_BLOOM_CAPACITY,
+    ):
+        self.host = (urlsplit(sitemap_url).hostname or "").rstrip(".")
+        self.max_examples = max_examples
+        self.entry_count = 0
+        self._seen = BloomFilter(bloom_capacity)
+        self._counts: Dict[str, int] = {}
+        self._examples: Dict[str, List[str]] = {}
+
+    def _flag(self, code: str, example: str):
+        self._counts[code] = self._counts.get(code, 0) + 1
+        examples = self._examples.setdefault(code, [])
+        if len(examples) < self.max_examples:
+            examples.append(example)
+
+    def add(self, loc: str, lastmod: Optional[str] = None):
+        self.entry_count += 1
+
+        if self._seen.add(loc):
+            self._flag("duplicate_loc", loc)
+
+        try:
+            parts = urlsplit(loc)
+            hostname = parts.hostname
+        except ValueError:
+            self._flag("malformed_url", loc)
+        else:
+            if parts.scheme not in ("http", "https") or not parts.netloc:
+                self._flag("not_absolute", loc)
+            elif (hostname or "").rstrip(".") != self.host:
+                self._flag("foreign_host", loc)
+
+        if UNESCAPED_RE.search(loc) or BAD_PERCENT_RE.search(loc):
+            self._flag("bad_escaping", loc)
+
+        if lastmod is not None and (not LASTMOD_RE.match(lastmod) or parse_w3c_datetime(lastmod) is None):
+            self._flag("invalid_lastmod", f"{loc} ({lastmod})")
+
+    def result(self, uncompressed_bytes: int) -> SitemapValidation:
+        if self.entry_count > MAX_URLS and "too_many_urls" not in self._counts:
+            self._flag("too_many_urls", f"{self.entry_count} entries")
+        if uncompressed_bytes > MAX_UNCOMPRESSED_BYTES and "file_too_large" not in self._counts:
+            self._flag("file_too_large", f"{uncompressed_bytes} bytes")
+
+        issues = [
+            ValidationIssue(
+                code=code,
+                count=self._counts[code],
+                message=message,
+                examples=self._examples.get(code, [])
+            )
+            for code, message in self.MESSAGES.items()
+            if code in self._counts
+        ]
+        return SitemapValidation(
+            valid=not issues,
+            entry_count=self.entry_count,
+            uncompressed_bytes=uncompressed_bytes,
+            issues=issues
+        )
+
+
+async def read_sitemap_validated(
+    client: httpx.AsyncClient,
+    url: str,
+    timeout=None,
+    keep_locs: bool = True
+) -> ParsedSitemap:
+    """
+    `read_sitemap` with protocol validation in the same pass; the result is
+    in `parsed.validation` (None for error responses). With
+    `keep_locs=False` nothing per entry is kept and memory stays bounded.
+    """
+    async with open_sitemap(client, url, timeout=timeout, with_lastmod=True) as sitemap:
+        parsed = ParsedSitemap(url, sitemap.status_code)
+        if sitemap.status_code >= 400:
+            return parsed
+
+        validator = SitemapValidator(url)
+        try:
+            async for loc, lastmod in sitemap:
+                validator.add(loc, lastmod)
+                if keep_locs:
+                    parsed.locs.append(loc)
+        except (ET.ParseError, SitemapDecompressionError, UnsupportedSitemapError) as e:
+            parsed.error = e
+        parsed.kind = sitemap.kind
+        parsed.validation = validator.result(sitemap.parser.bytes_parsed)
+        return parsed
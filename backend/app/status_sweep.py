@@ -0,0 +1,234 @@
+import asyncio
+import math
+import time
+import xml.etree.ElementTree as ET
+from array import array
+from typing import AsyncIterator, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from pydantic import BaseModel, Field
+
+from app import settings
+from app.concurrency import KeyedRateLimiter
+from app.sitemap_stream import SitemapDecompressionError, UnsupportedSitemapError, describe_error, open_sitemap
+
+# HEAD answers that often mean "HEAD not supported" rather than a real status
+HEAD_FALLBACK_STATUSES = {400, 403, 405, 406, 501}
+
+STATUS_CLASSES = ("2xx", "3xx", "4xx", "5xx", "error")
+
+
+class StatusResult(BaseModel):
+    url: str
+    http_status: Optional[int]
+    method: Optional[str] = None  # "HEAD", or "GET" for the ranged fallback
+    location: Optional[str] = None  # Location header of a redirect
+    latency: Optional[float] = None  # seconds until the response headers
+    error: Optional[str] = None
+
+    @property
+    def status_class(self) -> str:
+        if self.http_status is None:
+            return "error"
+        return f"{min(max(self.http_status // 100, 2), 5)}xx"
+
+
+class LatencyStats(BaseModel):
+    """
+    Seconds until the response headers, over every URL that got a response.
+    """
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+    max: Optional[float] = None
+    mean: Optional[float] = None
+
+
+def latency_stats(values) -> LatencyStats:
+    """
+    Nearest-rank percentiles.
+    """
+    if not values:
+        return LatencyStats()
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return round(ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)], 4)
+
+    return LatencyStats(
+        p50=rank(50),
+        p90=rank(90),
+        p95=rank(95),
+        p99=rank(99),
+        max=round(ordered[-1], 4),
+        mean=round(sum(ordered) / len(ordered), 4)
+    )
+
+
+async def _request_status(client: httpx.AsyncClient, method: str, url: str, timeout, headers=None) -> httpx.Response:
+    # Streamed and closed right away: only the status line and headers are read
+    request = client.build_request(method, url, timeout=timeout, headers=headers)
+    response = await client.send(request, stream=True, follow_redirects=False)
+    await response.aclose()
+    return response
+
+
+async def check_status(client: httpx.AsyncClient, url: str, timeout=None) -> StatusResult:
+    """
+    Status of `url` without downloading it: a HEAD request, or a GET for the
+    first byte when the server doesn't handle HEAD. Redirects are reported,
+    not followed. Never raises for request errors.
+    """
+    timeout = timeout if timeout is not None else client.timeout
+    method = "HEAD"
+    started = time.perf_counter()
+    try:
+        response = await _request_status(client, method, url, timeout)
+        if response.status_code in HEAD_FALLBACK_STATUSES:
+            method = "GET"
+            started = time.perf_counter()
+            response = await _request_status(client, method, url, timeout, headers={"Range": "bytes=0-0"})
+    except (httpx.RequestError, httpx.InvalidURL) as exc:
+        return StatusResult(url=url, http_status=None, method=method, error=str(exc) or type(exc).__name__)
+
+    return StatusResult(
+        url=url,
+        http_status=response.status_code,
+        method=method,
+        location=response.headers.get("Location") if response.is_redirect else None,
+        latency=round(time.perf_counter() - started, 4)
+    )
+
+
+class StatusSweep:
+    """
+    Checks the HTTP status of every <loc> of a sitemap file.
+
+    The sitemap is streamed, and URLs are queued as soon as they are parsed
+    (the download doesn't wait for the checks). `concurrency` workers take
+    them from the queue. Each worker waits for a token from its host's bucket
+    (`host_rate` requests per second, bursts of `host_burst`) before it sends
+    the request.
+
+    Every result is counted per status class. Up to `max_listed` are kept
+    per non-2xx class, and the latencies are kept for percentiles.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        concurrency: int = settings.SWEEP_CONCURRENCY,
+        host_rate: float = settings.SWEEP_HOST_RATE,
+        host_burst: int = settings.SWEEP_HOST_BURST,
+        timeout=None,
+        max_listed: int = settings.SWEEP_MAX_LISTED,
+    ):
+        self.client = client
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_listed = max_listed
+        self._limiter = KeyedRateLimiter(host_rate, host_burst)
+        self.sitemap_status = "Parsed"
+        self.http_status: Optional[int] = None
+        self.kind: Optional[str] = None
+        self.message = ""
+        self.skipped = 0  # <loc> values that aren't http(s) URLs
+        self.counts: Dict[str, int] = dict.fromkeys(STATUS_CLASSES, 0)
+        self.listed: Dict[str, List[StatusResult]] = {name: [] for name in STATUS_CLASSES if name != "2xx"}
+        self._latencies = array("d")
+
+    @property
+    def checked(self) -> int:
+        return sum(self.counts.values())
+
+    def latency(self) -> LatencyStats:
+        return latency_stats(self._latencies)
+
+    async def run(self, sitemap_url: str) -> "StatusSweep":
+        async for _ in self.results(sitemap_url):
+            pass
+        return self
+
+    async def results(self, sitemap_url: str) -> AsyncIterator[StatusResult]:
+        """
+        Yields every StatusResult as it completes. Closing the iterator
+        cancels the download and the pending checks.
+        """
+        urls: asyncio.Queue = asyncio.Queue()
+        done: asyncio.Queue = asyncio.Queue()
+        reader = asyncio.ensure_future(self._read(sitemap_url, urls))
+        workers = [asyncio.ensure_future(self._work(urls, done)) for _ in range(self.concurrency)]
+        try:
+            remaining = len(workers)
+            while remaining:
+                result = await done.get()
+                if result is None:
+                    remaining -= 1
+                    continue
+                yield result
+            # Unexpected errors of the reader surface here
+            await reader
+        finally:
+            for task in (reader, *workers):
+                task.cancel()
+
+    async def _read(self, sitemap_url: str, urls: asyncio.Queue):
+        try:
+            async with open_sitemap(self.client, sitemap_url, timeout=self.timeout) as sitemap:
+                self.http_status = sitemap.status_code
+                if sitemap.status_code >= 400:
+                    self.sitemap_status = "Not Found"
+                    self.message = f"Sitemap file returned status {sitemap.status_code}."
+                    return
+                try:
+                    async for loc in sitemap:
+                        if loc.startswith(("http://", "https://")):
+                            urls.put_nowait(loc)
+                        else:
+                            self.skipped += 1
+                    self.kind = sitemap.kind
+                except (ET.ParseError, SitemapDecompressionError, UnsupportedSitemapError) as e:
+                    # URLs queued before the error are still checked
+                    self.sitemap_status, self.message = describe_error(e)
+        except httpx.RequestError as exc:
+            self.sitemap_status = "Error"
+            self.message = f"Request error: {exc}"
+        finally:
+            for _ in range(self.concurrency):
+                urls.put_nowait(None)
+
+    async def _work(self, urls: asyncio.Queue, done: asyncio.Queue):
+        try:
+            while True:
+                url = await urls.get()
+                if url is None:
+                    return
+                result = await self._check(url)
+                self._record(result)
+                done.put_nowait(result)
+        finally:
+            done.put_nowait(None)
+
+    async def _check(self, url: str) -> StatusResult:
+        # Any failure is this URL's result: a worker must outlive every URL
+        # still queued, or they would silently go unchecked
+        try:
+            host = urlsplit(url).netloc.lower()
+        except ValueError as exc:
+            return StatusResult(url=url, http_status=None, error=f"Malformed URL: {exc}")
+        try:
+            await self._limiter.acquire(host)
+            return await check_status(self.client, url, timeout=self.timeout)
+        except Exception as exc:
+            return StatusResult(url=url, http_status=None, error=f"{type(exc).__name__}: {exc}")
+
+    def _record(self, result: StatusResult):
+        status_class = result.status_class
+        self.counts[status_class] += 1
+        if result.latency is not None:
+            self._latencies.append(result.latency)
+        listed = self.listed.get(status_class)
+        if listed is not None and len(listed) < self.max_listed:
+            listed.append(result)
@@ -0,0 +1,96 @@
+import socket
+
+import httpx
+import pytest
+
+from app.http_client import get_http_client
+from app.main import app
+from app.sitemap_cache import SitemapDiskCache, get_sitemap_cache
+from app.sitemap_snapshot import SnapshotStore, get_snapshot_store
+
+
+@pytest.fixture(autouse=True)
+def reset_app_caches():
+    """
+    Shared caches live on app.state; start every test with them empty.
+    """
+    for name in ("dns_resolver", "redirect_resolver", "robots_cache", "sitemap_results"):
+        cache = getattr(app.state, name, None)
+        if cache is not None:
+            cache.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def sitemap_cache(tmp_path):
+    """
+    Per-test on-disk sitemap cache in a temporary directory.
+    """
+    cache = SitemapDiskCache(directory=str(tmp_path / "sitemap-cache"))
+    app.dependency_overrides[get_sitemap_cache] = lambda: cache
+    yield cache
+    app.dependency_overrides.pop(get_sitemap_cache, None)
+
+
+@pytest.fixture(autouse=True)
+def sitemap_snapshots(tmp_path):
+    """
+    Per-test sitemap snapshot store in a temporary directory.
+    """
+    store = SnapshotStore(directory=str(tmp_path / "sitemap-snapshots"))
+    app.dependency_overrides[get_snapshot_store] = lambda: store
+    yield store
+    app.dependency_overrides.pop(get_snapshot_store, None)
+
+
+@pytest.fixture
+def mock_http():
+    """
+    Routes the shared HTTP client to canned responses.
+
+    Usage: `mock_http["https://example.com"] = httpx.Response(200)`, an
+    exception instance to raise it, or a callable taking the request and
+    returning a response. Unknown URLs get a 404.
+    `mock_http.requests` lists every request that was sent.
+    """
+
+    class Routes(dict):
+        requests = []
+
+    routes = Routes()
+
+    def handler(request: httpx.Request):
+        routes.requests.append(request)
+        result = routes.get(str(request.url))
+        if result is None:
+            return httpx.Response(404)
+        if isinstance(result, Exception):
+            raise result
+        if callable(result):
+            return result(request)
+        # Fresh object per request, the same route may be hit more than once
+        return httpx.Response(result.status_code, headers=result.headers, content=result.content)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    app.dependency_overrides[get_http_client] = lambda: client
+    yield routes
+    app.dependency_overrides.pop(get_http_client, None)
+
+
+@pytest.fixture
+def fake_dns(monkeypatch):
+    """
+    Answers socket.getaddrinfo (the system resolver the browser guard uses)
+    from a dict: `fake_dns["internal.example"] = "10.0.0.5"`. Unknown
+    names don't resolve.
+    """
+    names = {}
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        if host not in names:
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        family = socket.AF_INET6 if ":" in names[host] else socket.AF_INET
+        return [(family, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", (names[host], port or 0))]
+
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+    return names
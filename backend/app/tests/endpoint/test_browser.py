@@ -0,0 +1,140 @@
+import threading
+
+import pytest
+from pydantic import BaseModel
+from httpx import AsyncClient, ASGITransport
+
+from app.browser_jobs import BrowserJobQueue, get_browser_jobs
+from app.endpoint import browser
+from app.main import app
+from app.tests.test_browser_jobs import fake_pool
+
+
+class EchoParams(BaseModel):
+    text: str = ""
+
+
+@pytest.fixture
+def browser_jobs(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setitem(browser.BROWSER_TASKS, "echo", browser.BrowserTaskSpec(lambda driver, text="": text, EchoParams))
+    monkeypatch.setitem(browser.BROWSER_TASKS, "block", browser.BrowserTaskSpec(lambda driver: release.wait(5), browser.GoogleSearchParams))
+    jobs = BrowserJobQueue(fake_pool(), workers=1, max_queued=1, job_timeout=5)
+    app.dependency_overrides[get_browser_jobs] = lambda: jobs
+    yield jobs
+    release.set()
+    jobs.close()
+    app.dependency_overrides.pop(get_browser_jobs, None)
+
+
+@pytest.mark.asyncio
+async def test_browser_job_lifecycle(browser_jobs):
+    """
+    🧭 POST /browser/jobs queues a task, GET polls it.
+    """
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        created = await ac.post("/browser/jobs", json={"task": "echo", "params": {"text": "hi"}, "wait": 5})
+        polled = await ac.get(f"/browser/jobs/{created.json()['id']}")
+        missing = await ac.get("/browser/jobs/nope")
+        unknown = await ac.post("/browser/jobs", json={"task": "nope"})
+
+    assert created.status_code == 202 and created.json()["status"] == "done"
+    assert polled.json()["result"] == "hi"
+    assert missing.status_code == 404
+    assert unknown.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_browser_queue_full_returns_429(browser_jobs):
+    """
+    🚦 Beyond the workers and the queue, jobs are refused with 429 and Retry-After.
+    """
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        statuses = [(await ac.post("/browser/jobs", json={"task": "block"})).status_code for _ in range(2)]
+        refused = await ac.post("/browser/jobs", json={"task": "block"})
+        status = (await ac.get("/browser/status")).json()
+
+    assert statuses == [202, 202]
+    assert refused.status_code == 429 and "Retry-After" in refused.headers
+    assert status["running"] + status["queued"] == 2
+
+
+@pytest.mark.asyncio
+async def test_page_performance_endpoint(browser_jobs, monkeypatch):
+    """
+    ⏱️ POST /browser/performance runs the performance task and returns its metrics.
+    """
+    def fake_measure(driver, url, wait, settle_ms):
+        if "broken" in url:
+            raise RuntimeError("net::ERR_NAME_NOT_RESOLVED")
+        return {"url": url, "final_url": url, "ready": True, "largest_contentful_paint": 812.0, "transfer_bytes": 1234}
+
+    monkeypatch.setitem(browser.BROWSER_TASKS, "performance", browser.BrowserTaskSpec(fake_measure, browser.PerformanceInput))
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        measured = await ac.post("/browser/performance", json={"url": "https://example.com", "settle_ms": 0})
+        failed = await ac.post("/browser/performance", json={"url": "https://broken.example"})
+
+    assert measured.status_code == 200
+    data = measured.json()
+    assert data["url"] == "https://example.com/" and data["largest_contentful_paint"] == 812.0
+    assert data["transfer_bytes"] == 1234 and data["cumulative_layout_shift"] == 0
+    assert failed.status_code == 502 and "ERR_NAME_NOT_RESOLVED" in failed.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_browser_job_params_are_validated(browser_jobs, monkeypatch):
+    """
+    🛡️ Task params are checked against the task's model: only public http(s)
+    URLs, bounded timeouts, no unknown keys.
+    """
+    from app.browser_jobs import BrowserJob
+
+    submitted = []
+
+    def submit(name, task, **params):
+        submitted.append(params)
+        return BrowserJob(id="job", task=name, created_at=0)
+
+    monkeypatch.setattr(browser_jobs, "submit", submit)
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        refused = [
+            (await ac.post("/browser/jobs", json={"task": task, "params": params})).status_code
+            for task, params in [
+                ("render", {"url": "file:///etc/passwd"}),
+                ("render", {"url": "http://127.0.0.1:8000/admin"}),
+                ("render", {"url": "http://169.254.169.254/latest/meta-data/"}),
+                ("render", {"url": "http://localhost/"}),
+                ("render", {"url": "https://example.com", "timeout": 3600}),
+                ("render", {"url": "https://example.com", "driver": "x"}),
+                ("google_search", {"query": "x"}),
+                ("performance", {"url": "http://[::1]/"}),
+            ]
+        ]
+        accepted = await ac.post("/browser/jobs", json={"task": "render", "params": {"url": "https://example.com", "wait": "networkidle"}})
+
+    assert refused == [422] * 8
+    assert accepted.status_code == 202
+    assert submitted == [{"url": "https://example.com/", "wait": "networkidle", "timeout": 20.0, "block": True}]
+
+
+@pytest.mark.asyncio
+async def test_hosts_resolving_to_private_addresses_are_not_queued(browser_jobs, fake_dns, monkeypatch):
+    """
+    🛡️ Host names are resolved before queueing: names pointing at loopback,
+    private or metadata addresses are refused with 400.
+    """
+    fake_dns.update({"127.0.0.1.nip.io": "127.0.0.1", "metadata.google.internal": "169.254.169.254"})
+    submitted = []
+    monkeypatch.setattr(browser_jobs, "submit", lambda name, task, **params: submitted.append(params))
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        job = await ac.post("/browser/jobs", json={"task": "render", "params": {"url": "http://127.0.0.1.nip.io:8000/admin"}})
+        measured = await ac.post("/browser/performance", json={"url": "http://metadata.google.internal/computeMetadata/v1/"})
+
+    assert job.status_code == measured.status_code == 400
+    assert "127.0.0.1" in job.json()["detail"] and "169.254.169.254" in measured.json()["detail"]
+    assert submitted == []
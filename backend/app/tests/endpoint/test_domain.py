@@ -1,3 +1,4 @@
+import json
 import pytest
 import httpx
 import dns.resolver
@@ -9,38 +10,33 @@ from unittest.mock import patch, AsyncMock
 
 
 @pytest.mark.asyncio
-async def test_check_domain_success():
+async def test_check_domain_success(mock_http):
     # Mock DNS resolve to work fine
-    with patch("app.endpoint.domain.dns.resolver.resolve") as mock_resolve:
-        mock_resolve.return_value = True
+    with patch("app.endpoint.domain.CachingResolver.resolve", new_callable=AsyncMock) as mock_resolve:
+        mock_resolve.return_value = ["93.184.216.34"]
 
         # Mock HTTP GET to return 200
-        with patch("app.endpoint.domain.httpx.AsyncClient.get", new_callable=AsyncMock) as mock_get:
-            mock_response = AsyncMock()
-            mock_response.status_code = 200
-            mock_response.history = []
-            mock_response.url = "https://example.com"
-            mock_get.return_value = mock_response
-
-            transport = ASGITransport(app=app)
-            async with AsyncClient(transport=transport, base_url="http://test") as ac:
-                response = await ac.post("/domain/check-domain", json={"domain": "example.com"})
-
-            data = response.json()
-            assert response.status_code == 200
-            assert data["dns_status"] == "ok"
-            assert data["http_status"] == 200
-            assert data["is_live"] is True
-            assert data["redirected"] is False
-            assert data["final_url"] == "https://example.com"
-            assert data["redirect_chain"] == []
-            assert "Domain is live" in data["message"]
+        mock_http["https://example.com"] = httpx.Response(200)
+
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            response = await ac.post("/domain/check-domain", json={"domain": "example.com"})
+
+        data = response.json()
+        assert response.status_code == 200
+        assert data["dns_status"] == "ok"
+        assert data["http_status"] == 200
+        assert data["is_live"] is True
+        assert data["redirected"] is False
+        assert data["final_url"] == "https://example.com"
+        assert data["redirect_chain"] == []
+        assert "Domain is live" in data["message"]
 
 
 @pytest.mark.asyncio
 async def test_check_domain_dns_nxdomain():
     # Mock DNS to raise NXDOMAIN
-    with patch("app.endpoint.domain.dns.resolver.resolve") as mock_resolve:
+    with patch("app.endpoint.domain.CachingResolver.resolve", new_callable=AsyncMock) as mock_resolve:
         mock_resolve.side_effect = dns.resolver.NXDOMAIN()
 
         transport = ASGITransport(app=app)
@@ -56,80 +52,136 @@ async def test_check_domain_dns_nxdomain():
 
 
 @pytest.mark.asyncio
-async def test_check_domain_http_connection_error():
+async def test_check_domain_http_connection_error(mock_http):
     # Mock DNS to work fine
-    with patch("app.endpoint.domain.dns.resolver.resolve") as mock_resolve:
-        mock_resolve.return_value = True
+    with patch("app.endpoint.domain.CachingResolver.resolve", new_callable=AsyncMock) as mock_resolve:
+        mock_resolve.return_value = ["93.184.216.34"]
 
         # Mock HTTP GET to raise RequestError
-        with patch("app.endpoint.domain.httpx.AsyncClient.get", new_callable=AsyncMock) as mock_get:
-            mock_get.side_effect = httpx.RequestError("Connection failed")
+        mock_http["https://fail.com"] = httpx.ConnectError("Connection failed")
 
-            transport = ASGITransport(app=app)
-            async with AsyncClient(transport=transport, base_url="http://test") as ac:
-                response = await ac.post("/domain/check-domain", json={"domain": "fail.com"})
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            response = await ac.post("/domain/check-domain", json={"domain": "fail.com"})
 
-            data = response.json()
-            assert response.status_code == 200
-            assert data["dns_status"] == "ok"
-            assert data["is_live"] is False
-            assert data["http_status"] is None
-            assert "Connection error" in data["message"]
+        data = response.json()
+        assert response.status_code == 200
+        assert data["dns_status"] == "ok"
+        assert data["is_live"] is False
+        assert data["http_status"] is None
+        assert "Connection error" in data["message"]
 
 
 @pytest.mark.asyncio
-async def test_check_domain_redirected():
+async def test_check_domain_redirected(mock_http):
     # Mock DNS to work fine
-    with patch("app.endpoint.domain.dns.resolver.resolve") as mock_resolve:
-        mock_resolve.return_value = True
+    with patch("app.endpoint.domain.CachingResolver.resolve", new_callable=AsyncMock) as mock_resolve:
+        mock_resolve.return_value = ["93.184.216.34"]
 
         # Mock HTTP GET to simulate redirect
-        with patch("app.endpoint.domain.httpx.AsyncClient.get", new_callable=AsyncMock) as mock_get:
-            mock_response = AsyncMock()
-            mock_response.status_code = 200
-            mock_response.history = [
-                AsyncMock(url="https://google.com"),
-                AsyncMock(url="https://www.google.com")
-            ]
-            mock_response.url = "https://www.google.com/final"
-            mock_get.return_value = mock_response
-
-            transport = ASGITransport(app=app)
-            async with AsyncClient(transport=transport, base_url="http://google.com") as ac:
-                response = await ac.post("/domain/check-domain", json={"domain": "google.com"})
-
-            data = response.json()
-            assert response.status_code == 200
-            assert data["redirected"] is True
-            assert data["final_url"] == "https://www.google.com/final"
-            assert data["redirect_chain"] == [
-                "https://google.com",
-                "https://www.google.com"
-            ]
+        mock_http["https://google.com"] = httpx.Response(301, headers={"Location": "https://www.google.com"})
+        mock_http["https://www.google.com"] = httpx.Response(302, headers={"Location": "/final"})
+        mock_http["https://www.google.com/final"] = httpx.Response(200)
+
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://google.com") as ac:
+            response = await ac.post("/domain/check-domain", json={"domain": "google.com"})
+
+        data = response.json()
+        assert response.status_code == 200
+        assert data["redirected"] is True
+        assert data["final_url"] == "https://www.google.com/final"
+        assert data["redirect_chain"] == [
+            "https://google.com",
+            "https://www.google.com"
+        ]
+        assert [(hop["status_code"], hop["location"]) for hop in data["redirect_hops"]] == [
+            (301, "https://www.google.com"),
+            (302, "/final")
+        ]
 
 @pytest.mark.asyncio
-async def test_check_domain_no_redirect():
+async def test_check_domain_no_redirect(mock_http):
     # Mock DNS to resolve successfully
-    with patch("app.endpoint.domain.dns.resolver.resolve") as mock_resolve:
-        mock_resolve.return_value = True
+    with patch("app.endpoint.domain.CachingResolver.resolve", new_callable=AsyncMock) as mock_resolve:
+        mock_resolve.return_value = ["93.184.216.34"]
 
         # Mock HTTP GET to return 200 without redirect
-        with patch("app.endpoint.domain.httpx.AsyncClient.get", new_callable=AsyncMock) as mock_get:
-            mock_response = AsyncMock()
-            mock_response.status_code = 200
-            mock_response.history = []  # No redirect history
-            mock_response.url = "https://www.google.com"
-            mock_get.return_value = mock_response
-
-            transport = ASGITransport(app=app)
-            async with AsyncClient(transport=transport, base_url="https://www.google.com") as ac:
-                response = await ac.post("/domain/check-domain", json={"domain": "https://www.google.com"})
-
-            data = response.json()
-            assert response.status_code == 200
-            assert data["redirected"] is False
-            assert data["final_url"] == "https://www.google.com"
-            assert data["redirect_chain"] == []
-            assert data["http_status"] == 200
-            assert data["is_live"] is True
-            assert "Domain is live" in data["message"]
\ No newline at end of file
+        mock_http["https://www.google.com"] = httpx.Response(200)
+
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="https://www.google.com") as ac:
+            response = await ac.post("/domain/check-domain", json={"domain": "https://www.google.com"})
+
+        data = response.json()
+        assert response.status_code == 200
+        assert data["redirected"] is False
+        assert data["final_url"] == "https://www.google.com"
+        assert data["redirect_chain"] == []
+        assert data["http_status"] == 200
+        assert data["is_live"] is True
+        assert "Domain is live" in data["message"]
+
+
+@pytest.mark.asyncio
+async def test_check_domain_redirect_loop(mock_http):
+    """
+    🔁 A redirect loop is stopped instead of followed until the redirect limit.
+    """
+    with patch("app.endpoint.domain.CachingResolver.resolve", new_callable=AsyncMock) as mock_resolve:
+        mock_resolve.return_value = ["93.184.216.34"]
+
+        mock_http["https://loop.com"] = httpx.Response(301, headers={"Location": "https://www.loop.com"})
+        mock_http["https://www.loop.com"] = httpx.Response(301, headers={"Location": "https://loop.com"})
+
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            response = await ac.post("/domain/check-domain", json={"domain": "loop.com"})
+
+        data = response.json()
+        assert data["is_live"] is False
+        assert data["http_status"] == 301
+        assert len(data["redirect_hops"]) == 2
+        assert "Redirect loop detected" in data["message"]
+
+
+@pytest.mark.asyncio
+async def test_check_domains_streams_ndjson_results(mock_http):
+    """
+    📤 /check-domains streams one DomainCheckResponse per line, with the same
+    normalization and fields as /check-domain.
+    """
+    async def fake_resolve(host, rdtype='A'):
+        if host == "missing.com":
+            raise dns.resolver.NXDOMAIN()
+        return ["93.184.216.34"]
+
+    with patch("app.endpoint.domain.CachingResolver.resolve", new_callable=AsyncMock) as mock_resolve:
+        mock_resolve.side_effect = fake_resolve
+
+        mock_http["https://example.com"] = httpx.Response(200)
+        mock_http["http://example.org"] = httpx.Response(200)
+
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            response = await ac.post(
+                "/domain/check-domains",
+                json={"domains": ["example.com", "missing.com", "http://example.org"]}
+            )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    results = {item["fixed_domain"]: item for item in map(json.loads, response.text.splitlines())}
+    assert set(results) == {"https://example.com", "https://missing.com", "http://example.org"}
+    assert results["https://example.com"]["is_live"] is True
+    assert results["https://missing.com"]["dns_status"] == "NXDOMAIN"
+    assert results["https://missing.com"]["http_status"] is None
+
+
+@pytest.mark.asyncio
+async def test_check_domains_rejects_empty_list():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/domain/check-domains", json={"domains": []})
+
+    assert response.status_code == 422
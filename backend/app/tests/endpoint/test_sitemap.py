@@ -1,5 +1,6 @@
+import json
+import os
 import pytest
-from unittest.mock import patch, AsyncMock, MagicMock
 from httpx import AsyncClient, ASGITransport
 import httpx
 import gzip
@@ -16,7 +17,7 @@ app.include_router(sitemap.router)
 # ===============================
 
 @pytest.mark.asyncio
-async def test_check_sitemap_urlset_success():
+async def test_check_sitemap_urlset_success(mock_http):
     """
     ✅ Test the /check-sitemap endpoint with a valid <urlset> sitemap.
 
@@ -37,21 +38,12 @@ async def test_check_sitemap_urlset_success():
     </urlset>
     """
 
-    # Mock httpx.AsyncClient.get to return the above XML content
-    with patch("app.endpoint.sitemap.httpx.AsyncClient") as mock_client:
-        mock_instance = AsyncMock()
-        mock_client.return_value.__aenter__.return_value = mock_instance
+    # Mocked response: status 200 and content as sitemap XML
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, content=sitemap_xml.encode("utf-8"))
 
-        # Mocked response: status 200 and content as sitemap XML
-        mock_response = AsyncMock()
-        mock_response.status_code = 200
-        mock_response.content = sitemap_xml.encode("utf-8")
-        mock_instance.get.return_value = mock_response
-
-        # Make the request using ASGITransport to simulate FastAPI server
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as ac:
-            response = await ac.post("/check-sitemap", json={"domain": "example.com"})
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/check-sitemap", json={"domain": "example.com"})
 
     data = response.json()
     assert response.status_code == 200
@@ -64,7 +56,7 @@ async def test_check_sitemap_urlset_success():
 
 
 @pytest.mark.asyncio
-async def test_check_sitemap_sitemapindex_success():
+async def test_check_sitemap_sitemapindex_success(mock_http):
     """
     ✅ Test the /check-sitemap endpoint with a valid <sitemapindex> sitemap.
 
@@ -85,18 +77,11 @@ async def test_check_sitemap_sitemapindex_success():
     </sitemapindex>
     """
 
-    with patch("app.endpoint.sitemap.httpx.AsyncClient") as mock_client:
-        mock_instance = AsyncMock()
-        mock_client.return_value.__aenter__.return_value = mock_instance
-
-        mock_response = AsyncMock()
-        mock_response.status_code = 200
-        mock_response.content = sitemap_index_xml.encode("utf-8")
-        mock_instance.get.return_value = mock_response
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, content=sitemap_index_xml.encode("utf-8"))
 
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as ac:
-            response = await ac.post("/check-sitemap", json={"domain": "example.com"})
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/check-sitemap", json={"domain": "example.com"})
 
     data = response.json()
     assert response.status_code == 200
@@ -109,7 +94,7 @@ async def test_check_sitemap_sitemapindex_success():
 
 
 @pytest.mark.asyncio
-async def test_check_sitemap_parse_error():
+async def test_check_sitemap_parse_error(mock_http):
     """
     ❌ Test the /check-sitemap endpoint with invalid (broken) XML.
 
@@ -120,18 +105,11 @@ async def test_check_sitemap_parse_error():
     """
     invalid_xml = "<invalid><xml>"
 
-    with patch("app.endpoint.sitemap.httpx.AsyncClient") as mock_client:
-        mock_instance = AsyncMock()
-        mock_client.return_value.__aenter__.return_value = mock_instance
-
-        mock_response = AsyncMock()
-        mock_response.status_code = 200
-        mock_response.content = invalid_xml.encode("utf-8")
-        mock_instance.get.return_value = mock_response
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, content=invalid_xml.encode("utf-8"))
 
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as ac:
-            response = await ac.post("/check-sitemap", json={"domain": "example.com"})
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/check-sitemap", json={"domain": "example.com"})
 
     data = response.json()
     assert response.status_code == 200
@@ -140,7 +118,7 @@ async def test_check_sitemap_parse_error():
 
 
 @pytest.mark.asyncio
-async def test_check_sitemap_not_found():
+async def test_check_sitemap_not_found(mock_http):
     """
     🔍 Test the /check-sitemap endpoint when the sitemap is missing (404).
 
@@ -150,18 +128,11 @@ async def test_check_sitemap_not_found():
     - http_status: 404
     - message: contains 'Sitemap returned status 404'
     """
-    with patch("app.endpoint.sitemap.httpx.AsyncClient") as mock_client:
-        mock_instance = AsyncMock()
-        mock_client.return_value.__aenter__.return_value = mock_instance
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(404, content=b"")
 
-        mock_response = AsyncMock()
-        mock_response.status_code = 404
-        mock_response.content = b""
-        mock_instance.get.return_value = mock_response
-
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as ac:
-            response = await ac.post("/check-sitemap", json={"domain": "example.com"})
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/check-sitemap", json={"domain": "example.com"})
 
     data = response.json()
     assert response.status_code == 200
@@ -170,7 +141,7 @@ async def test_check_sitemap_not_found():
 
 
 @pytest.mark.asyncio
-async def test_check_sitemap_request_error():
+async def test_check_sitemap_request_error(mock_http):
     """
     🚫 Test the /check-sitemap endpoint when a network request error occurs (e.g., connection failure).
 
@@ -180,16 +151,12 @@ async def test_check_sitemap_request_error():
     - http_status: None
     - message: contains 'Request error'
     """
-    with patch("app.endpoint.sitemap.httpx.AsyncClient") as mock_client:
-        mock_instance = AsyncMock()
-        mock_client.return_value.__aenter__.return_value = mock_instance
-
-        # Simulate network failure
-        mock_instance.get.side_effect = httpx.RequestError("Connection failed")
+    # Simulate network failure
+    mock_http["https://example.com/sitemap.xml"] = httpx.ConnectError("Connection failed")
 
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as ac:
-            response = await ac.post("/check-sitemap", json={"domain": "example.com"})
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/check-sitemap", json={"domain": "example.com"})
 
     data = response.json()
     assert response.status_code == 200
@@ -201,7 +168,7 @@ async def test_check_sitemap_request_error():
 # ===============================
 
 @pytest.mark.asyncio
-async def test_fetch_sitemap_urls_success():
+async def test_fetch_sitemap_urls_success(mock_http):
     """
     ✅ Test the /fetch-sitemap-urls endpoint with a valid XML sitemap.
 
@@ -218,18 +185,11 @@ async def test_fetch_sitemap_urls_success():
     </urlset>
     """
 
-    with patch("app.endpoint.sitemap.httpx.AsyncClient") as mock_client:
-        mock_instance = AsyncMock()
-        mock_client.return_value.__aenter__.return_value = mock_instance
-
-        mock_response = AsyncMock()
-        mock_response.status_code = 200
-        mock_response.content = sitemap_xml.encode("utf-8")
-        mock_instance.get.return_value = mock_response
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, content=sitemap_xml.encode("utf-8"))
 
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as ac:
-            response = await ac.post("/fetch-sitemap-urls", json={"sitemap_url": "https://example.com/sitemap.xml"})
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/fetch-sitemap-urls", json={"sitemap_url": "https://example.com/sitemap.xml"})
 
     data = response.json()
     assert response.status_code == 200
@@ -238,7 +198,7 @@ async def test_fetch_sitemap_urls_success():
 
 
 @pytest.mark.asyncio
-async def test_fetch_sitemap_urls_gzip_success():
+async def test_fetch_sitemap_urls_gzip_success(mock_http):
     """
     ✅ Test the /fetch-sitemap-urls endpoint with a valid gzipped XML sitemap.
 
@@ -260,20 +220,671 @@ async def test_fetch_sitemap_urls_gzip_success():
         f.write(sitemap_xml.encode("utf-8"))
     gzipped_content = buffer.getvalue()
 
-    with patch("app.endpoint.sitemap.httpx.AsyncClient") as mock_client:
-        mock_instance = AsyncMock()
-        mock_client.return_value.__aenter__.return_value = mock_instance
+    mock_http["https://example.com/sitemap.xml.gz"] = httpx.Response(200, content=gzipped_content)
 
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.content = gzipped_content
-        mock_instance.get.return_value = mock_response
-
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as ac:
-            response = await ac.post("/fetch-sitemap-urls", json={"sitemap_url": "https://example.com/sitemap.xml.gz"})
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/fetch-sitemap-urls", json={"sitemap_url": "https://example.com/sitemap.xml.gz"})
 
     data = response.json()
     assert response.status_code == 200
     assert data["sitemap_status"] == "Parsed"
     assert data["urls"] == ["https://example.com/page1"]
+
+
+# ===============================
+# Tests for /crawl-sitemap endpoint
+# ===============================
+
+def sitemap_index(*locs):
+    entries = "".join(f"<sitemap><loc>{loc}</loc></sitemap>" for loc in locs)
+    return f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>'.encode("utf-8")
+
+
+def urlset(*locs):
+    entries = "".join(f"<url><loc>{loc}</loc></url>" for loc in locs)
+    return f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>'.encode("utf-8")
+
+
+@pytest.mark.asyncio
+async def test_crawl_sitemap_expands_nested_indexes(mock_http):
+    """
+    🌳 Test /crawl-sitemap on a nested index with a gzipped child, a broken
+    child, a duplicate URL and an index that lists the root again.
+
+    Expected:
+    - every file fetched once, with its own status and counts
+    - URLs deduped across files, in first-seen order
+    """
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, content=sitemap_index(
+        "https://example.com/posts.xml.gz",
+        "https://example.com/nested.xml",
+        "https://example.com/missing.xml",
+    ))
+    mock_http["https://example.com/posts.xml.gz"] = httpx.Response(200, content=gzip.compress(urlset(
+        "https://example.com/a", "https://example.com/b"
+    )))
+    mock_http["https://example.com/nested.xml"] = httpx.Response(200, content=sitemap_index(
+        "https://example.com/pages.xml",
+        "https://example.com/sitemap.xml",
+    ))
+    mock_http["https://example.com/pages.xml"] = httpx.Response(200, content=urlset(
+        "https://example.com/b", "https://example.com/c"
+    ))
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/crawl-sitemap", json={"sitemap_url": "https://example.com/sitemap.xml"})
+
+    data = response.json()
+    assert response.status_code == 200
+    assert data["sitemap_status"] == "Parsed"
+    assert sorted(data["urls"]) == ["https://example.com/a", "https://example.com/b", "https://example.com/c"]
+    assert data["total_urls"] == 3
+    assert data["duplicate_urls"] == 1
+    assert (data["files_fetched"], data["files_failed"], data["files_skipped"]) == (5, 1, 0)
+
+    files = {file["sitemap_url"]: file for file in data["files"]}
+    assert files["https://example.com/sitemap.xml"]["sitemap_count"] == 3
+    assert files["https://example.com/posts.xml.gz"]["url_count"] == 2
+    assert files["https://example.com/pages.xml"]["depth"] == 2
+    assert files["https://example.com/pages.xml"]["parent"] == "https://example.com/nested.xml"
+    assert files["https://example.com/missing.xml"]["sitemap_status"] == "Not Found"
+    assert len(mock_http.requests) == 5
+
+
+@pytest.mark.asyncio
+async def test_crawl_sitemap_respects_max_depth(mock_http):
+    """
+    🛑 Files below max_depth are reported as skipped and not fetched.
+    """
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, content=sitemap_index(
+        "https://example.com/nested.xml"
+    ))
+    mock_http["https://example.com/nested.xml"] = httpx.Response(200, content=sitemap_index(
+        "https://example.com/pages.xml"
+    ))
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/crawl-sitemap", json={
+            "sitemap_url": "https://example.com/sitemap.xml",
+            "max_depth": 1
+        })
+
+    data = response.json()
+    assert data["files_skipped"] == 1
+    assert data["files"][-1]["sitemap_url"] == "https://example.com/pages.xml"
+    assert data["files"][-1]["sitemap_status"] == "Skipped"
+    assert len(mock_http.requests) == 2
+
+
+# ===============================
+# Pagination and streaming
+# ===============================
+
+@pytest.mark.asyncio
+async def test_fetch_sitemap_urls_cursor_pagination(mock_http):
+    """
+    📄 Pages are served from the cached parse: the file is downloaded once,
+    and following `next_cursor` walks the whole list.
+    """
+    all_urls = [f"https://example.com/page{i}" for i in range(5)]
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, content=urlset(*all_urls))
+
+    pages = []
+    body = {"sitemap_url": "https://example.com/sitemap.xml", "limit": 2}
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        while True:
+            data = (await ac.post("/fetch-sitemap-urls", json=body)).json()
+            pages.append(data["urls"])
+            if data["next_cursor"] is None:
+                break
+            body = {"sitemap_url": "https://example.com/sitemap.xml", "limit": 2, "cursor": data["next_cursor"]}
+
+        offset_page = (await ac.post("/fetch-sitemap-urls", json={
+            "sitemap_url": "https://example.com/sitemap.xml", "offset": 3, "limit": 10
+        })).json()
+
+    assert pages == [all_urls[0:2], all_urls[2:4], all_urls[4:]]
+    assert data["total_count"] == 5
+    assert offset_page["urls"] == all_urls[3:]
+    assert len(mock_http.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_check_sitemap_pagination_after_cache_expiry(mock_http):
+    """
+    ♻️ A cursor whose cached snapshot is gone still works: the file is parsed
+    again and the message says so.
+    """
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, content=urlset("https://example.com/a", "https://example.com/b"))
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        first = (await ac.post("/check-sitemap", json={"domain": "example.com", "limit": 1})).json()
+        app.state.sitemap_results.clear()
+        second = (await ac.post("/check-sitemap", json={"domain": "example.com", "cursor": first["next_cursor"]})).json()
+
+    assert first["urls"] == ["https://example.com/a"]
+    assert second["urls"] == ["https://example.com/b"]
+    assert second["next_cursor"] is None
+    assert "parsed again" in second["message"]
+    # robots.txt (looked up for discovery) is fetched once and cached
+    assert [r.url.path for r in mock_http.requests] == ["/robots.txt", "/sitemap.xml", "/sitemap.xml"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_sitemap_urls_stream(mock_http):
+    """
+    📤 stream=true sends one NDJSON line per URL, then a summary line.
+    """
+    mock_http["https://example.com/sitemap.xml.gz"] = httpx.Response(200, content=gzip.compress(urlset(
+        "https://example.com/a", "https://example.com/b"
+    )))
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/fetch-sitemap-urls", json={
+            "sitemap_url": "https://example.com/sitemap.xml.gz", "stream": True
+        })
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert lines[:2] == [{"url": "https://example.com/a"}, {"url": "https://example.com/b"}]
+    assert lines[2]["sitemap_status"] == "Parsed"
+    assert lines[2]["total_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_sitemap_urls_stream_rejects_pagination():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/fetch-sitemap-urls", json={
+            "sitemap_url": "https://example.com/sitemap.xml", "stream": True, "limit": 10
+        })
+
+    assert response.status_code == 422
+
+
+# ===============================
+# Conditional GET disk cache
+# ===============================
+
+@pytest.mark.asyncio
+async def test_fetch_sitemap_urls_served_from_disk_cache_on_304(mock_http, sitemap_cache):
+    """
+    💾 The second fetch sends If-None-Match / If-Modified-Since; the 304 is
+    answered with the stored URL list.
+    """
+    body = urlset("https://example.com/a", "https://example.com/b")
+    validators = {"ETag": '"v1"', "Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"}
+
+    def server(request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304, headers=validators)
+        return httpx.Response(200, headers=validators, content=gzip.compress(body))
+
+    mock_http["https://example.com/sitemap.xml.gz"] = server
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        first = (await ac.post("/fetch-sitemap-urls", json={"sitemap_url": "https://example.com/sitemap.xml.gz"})).json()
+        second = (await ac.post("/fetch-sitemap-urls", json={"sitemap_url": "https://example.com/sitemap.xml.gz"})).json()
+        streamed = await ac.post("/fetch-sitemap-urls", json={"sitemap_url": "https://example.com/sitemap.xml.gz", "stream": True})
+
+    assert first["cache_status"] == "miss"
+    assert second["cache_status"] == "hit"
+    assert second["http_status"] == 304
+    assert second["urls"] == first["urls"] == ["https://example.com/a", "https://example.com/b"]
+    assert mock_http.requests[1].headers["If-Modified-Since"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+
+    lines = [json.loads(line) for line in streamed.text.splitlines()]
+    assert [line["url"] for line in lines[:-1]] == first["urls"]
+    assert lines[-1]["cache_status"] == "hit"
+    assert sitemap_cache.hits == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_sitemap_urls_refetches_when_changed(mock_http, sitemap_cache):
+    """
+    🔄 A 200 on revalidation replaces the stored list; parse errors are never stored.
+    """
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, headers={"ETag": '"v1"'}, content=urlset("https://example.com/a"))
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.post("/fetch-sitemap-urls", json={"sitemap_url": "https://example.com/sitemap.xml"})
+        mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, headers={"ETag": '"v2"'}, content=urlset("https://example.com/b"))
+        changed = (await ac.post("/fetch-sitemap-urls", json={"sitemap_url": "https://example.com/sitemap.xml"})).json()
+        mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, headers={"ETag": '"v3"'}, content=b"<urlset><url>")
+        await ac.post("/fetch-sitemap-urls", json={"sitemap_url": "https://example.com/sitemap.xml"})
+
+    assert changed["cache_status"] == "miss"
+    assert changed["urls"] == ["https://example.com/b"]
+    assert sitemap_cache.conditional_headers("https://example.com/sitemap.xml") == {"If-None-Match": '"v2"'}
+
+
+# ===============================
+# Tests for /diff-sitemap endpoint
+# ===============================
+
+def urlset_with_lastmod(*entries):
+    body = "".join(
+        f"<url><loc>{loc}</loc>" + (f"<lastmod>{lastmod}</lastmod>" if lastmod else "") + "</url>"
+        for loc, lastmod in entries
+    )
+    return f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{body}</urlset>'.encode("utf-8")
+
+
+@pytest.mark.asyncio
+async def test_diff_sitemap_reports_added_removed_and_changed(mock_http):
+    """
+    🔍 First run stores a baseline, the second reports what changed across
+    the whole index.
+    """
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, content=sitemap_index(
+        "https://example.com/a.xml", "https://example.com/b.xml.gz"
+    ))
+    mock_http["https://example.com/a.xml"] = httpx.Response(200, content=urlset_with_lastmod(
+        ("https://example.com/keep", "2024-01-01"),
+        ("https://example.com/edit", "2024-01-01"),
+    ))
+    mock_http["https://example.com/b.xml.gz"] = httpx.Response(200, content=gzip.compress(urlset_with_lastmod(
+        ("https://example.com/gone", None),
+    )))
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        baseline = (await ac.post("/diff-sitemap", json={"sitemap_url": "https://example.com/sitemap.xml"})).json()
+
+        mock_http["https://example.com/a.xml"] = httpx.Response(200, content=urlset_with_lastmod(
+            ("https://example.com/keep", "2024-01-01"),
+            ("https://example.com/edit", "2024-02-01"),
+            ("https://example.com/new", None),
+        ))
+        mock_http["https://example.com/b.xml.gz"] = httpx.Response(200, content=gzip.compress(urlset_with_lastmod()))
+        diff = (await ac.post("/diff-sitemap", json={"sitemap_url": "https://example.com/sitemap.xml"})).json()
+
+    assert baseline["previous_snapshot_at"] is None
+    assert baseline["snapshot_saved"] is True
+    assert baseline["total_urls"] == 3
+
+    assert diff["previous_total_urls"] == 3
+    assert diff["added"] == ["https://example.com/new"]
+    assert diff["removed"] == ["https://example.com/gone"]
+    assert diff["changed"] == [{
+        "url": "https://example.com/edit",
+        "old_lastmod": "2024-01-01",
+        "new_lastmod": "2024-02-01"
+    }]
+    assert (diff["added_count"], diff["removed_count"], diff["changed_count"]) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_diff_sitemap_does_not_save_partial_snapshots(mock_http, sitemap_snapshots):
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, content=sitemap_index(
+        "https://example.com/a.xml", "https://example.com/missing.xml"
+    ))
+    mock_http["https://example.com/a.xml"] = httpx.Response(200, content=urlset_with_lastmod(("https://example.com/a", None)))
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        data = (await ac.post("/diff-sitemap", json={"sitemap_url": "https://example.com/sitemap.xml"})).json()
+
+    assert data["files_failed"] == 1
+    assert data["snapshot_saved"] is False
+    assert sitemap_snapshots.load("https://example.com/sitemap.xml") is None
+    assert os.listdir(sitemap_snapshots.directory) == []
+
+
+# ===============================
+# Tests for /fetch-sitemap-entries endpoint
+# ===============================
+
+ENTRIES_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
+        xmlns:image="http://www.google.com/schemas/sitemap-image/1.1"
+        xmlns:xhtml="http://www.w3.org/1999/xhtml">
+    <url>
+        <loc>https://example.com/en/</loc>
+        <lastmod>2024-05-01T10:00:00+00:00</lastmod>
+        <changefreq>daily</changefreq>
+        <priority>0.8</priority>
+        <image:image><image:loc>https://example.com/hero.jpg</image:loc></image:image>
+        <image:image><image:loc>https://example.com/logo.png</image:loc></image:image>
+        <xhtml:link rel="alternate" hreflang="de" href="https://example.com/de/"/>
+        <xhtml:link rel="alternate" hreflang="x-default" href="https://example.com/"/>
+    </url>
+    <url>
+        <loc>https://example.com/old</loc>
+        <lastmod>2023-01</lastmod>
+    </url>
+    <url>
+        <loc>https://example.com/undated</loc>
+        <priority>high</priority>
+    </url>
+</urlset>"""
+
+
+@pytest.mark.asyncio
+async def test_fetch_sitemap_entries_columns(mock_http):
+    """
+    🗂 Every field is extracted into columns, one row per <url>.
+    """
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, content=ENTRIES_XML)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/fetch-sitemap-entries", json={"sitemap_url": "https://example.com/sitemap.xml"})
+
+    data = response.json()
+    columns = data["columns"]
+    assert data["sitemap_status"] == "Parsed"
+    assert data["total_count"] == 3
+    assert columns["loc"] == ["https://example.com/en/", "https://example.com/old", "https://example.com/undated"]
+    assert columns["lastmod"] == ["2024-05-01T10:00:00+00:00", "2023-01", None]
+    assert columns["changefreq"] == ["daily", None, None]
+    assert columns["priority"] == [0.8, None, None]
+    assert columns["images"] == [["https://example.com/hero.jpg", "https://example.com/logo.png"], None, None]
+    assert columns["alternates"] == [[["de", "https://example.com/de/"], ["x-default", "https://example.com/"]], None, None]
+
+
+@pytest.mark.asyncio
+async def test_fetch_sitemap_entries_modified_since_stream(mock_http):
+    """
+    ⏱ modified_since drops older entries while parsing; undated ones are kept
+    unless keep_undated is false.
+    """
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, content=ENTRIES_XML)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        streamed = await ac.post("/fetch-sitemap-entries", json={
+            "sitemap_url": "https://example.com/sitemap.xml",
+            "modified_since": "2024-01-01",
+            "stream": True
+        })
+        strict = (await ac.post("/fetch-sitemap-entries", json={
+            "sitemap_url": "https://example.com/sitemap.xml",
+            "modified_since": "2024-01-01T00:00:00Z",
+            "keep_undated": False
+        })).json()
+
+    lines = [json.loads(line) for line in streamed.text.splitlines()]
+    assert [line["loc"] for line in lines[:-1]] == ["https://example.com/en/", "https://example.com/undated"]
+    assert lines[0]["images"] == ["https://example.com/hero.jpg", "https://example.com/logo.png"]
+    assert lines[-1]["filtered_count"] == 1
+    assert lines[-1]["columns"] is None
+
+    assert strict["columns"]["loc"] == ["https://example.com/en/"]
+    assert strict["filtered_count"] == 2
+
+
+# ===============================
+# Protocol validation
+# ===============================
+
+@pytest.mark.asyncio
+async def test_validate_sitemap_and_validation_flag(mock_http):
+    """
+    ✅ /validate-sitemap reports protocol issues; validation=true adds the
+    same report to /fetch-sitemap-urls, streamed or not.
+    """
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, content=urlset_with_lastmod(
+        ("https://example.com/a", "2024-01-01"),
+        ("https://example.com/a", "2024-01-01"),
+        ("https://cdn.example.com/b", "last week"),
+    ))
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        report = (await ac.post("/validate-sitemap", json={"sitemap_url": "https://example.com/sitemap.xml"})).json()
+        fetched = (await ac.post("/fetch-sitemap-urls", json={
+            "sitemap_url": "https://example.com/sitemap.xml", "validation": True
+        })).json()
+        streamed = await ac.post("/fetch-sitemap-urls", json={
+            "sitemap_url": "https://example.com/sitemap.xml", "validation": True, "stream": True
+        })
+
+    assert report["sitemap_status"] == "Invalid"
+    assert {issue["code"] for issue in report["validation"]["issues"]} == {"duplicate_loc", "foreign_host", "invalid_lastmod"}
+    assert fetched["urls"] == ["https://example.com/a", "https://example.com/a", "https://cdn.example.com/b"]
+    assert fetched["validation"] == report["validation"]
+    assert json.loads(streamed.text.splitlines()[-1])["validation"] == report["validation"]
+
+
+
+@pytest.mark.asyncio
+async def test_validation_reports_malformed_locs(mock_http):
+    """
+    🧱 A <loc> that can't be parsed as a URL is reported, not a 500.
+    """
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, content=urlset_with_lastmod(
+        ("https://[bad/x", "2024-01-01"),
+        ("https://example.com/a", "2024-01-01"),
+    ))
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        report = await ac.post("/validate-sitemap", json={"sitemap_url": "https://example.com/sitemap.xml"})
+        fetched = await ac.post("/fetch-sitemap-urls", json={
+            "sitemap_url": "https://example.com/sitemap.xml", "validation": True
+        })
+
+    assert report.status_code == fetched.status_code == 200
+    issues = {issue["code"]: issue for issue in report.json()["validation"]["issues"]}
+    assert issues["malformed_url"]["examples"] == ["https://[bad/x"]
+    assert fetched.json()["validation"] == report.json()["validation"]
+
+@pytest.mark.asyncio
+async def test_paginated_validation_and_plain_fetches_do_not_share_results(mock_http):
+    """
+    📄 Paging the same sitemap with and without validation keeps two cached
+    results: each mode gets its own report and cursors.
+    """
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, content=urlset_with_lastmod(
+        ("https://example.com/a", "2024-01-01"),
+        ("https://example.com/a", "2024-01-01"),
+        ("https://example.com/b", "2024-01-02"),
+    ))
+    url = "https://example.com/sitemap.xml"
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        plain = (await ac.post("/fetch-sitemap-urls", json={"sitemap_url": url, "limit": 2})).json()
+        validated = (await ac.post("/fetch-sitemap-urls", json={"sitemap_url": url, "limit": 2, "validation": True})).json()
+        plain_next = (await ac.post("/fetch-sitemap-urls", json={"sitemap_url": url, "cursor": plain["next_cursor"]})).json()
+        validated_next = (await ac.post("/fetch-sitemap-urls", json={
+            "sitemap_url": url, "cursor": validated["next_cursor"], "validation": True
+        })).json()
+
+    assert plain["validation"] is None
+    assert {issue["code"] for issue in validated["validation"]["issues"]} == {"duplicate_loc"}
+    assert plain["next_cursor"].split(":")[0] != validated["next_cursor"].split(":")[0]
+    assert plain_next["urls"] == validated_next["urls"] == ["https://example.com/b"]
+    assert plain_next["validation"] is None and validated_next["validation"] == validated["validation"]
+    assert "expired" not in plain_next["message"] and "expired" not in validated_next["message"]
+
+# ===============================
+# robots.txt
+# ===============================
+
+@pytest.mark.asyncio
+async def test_check_sitemap_discovers_sitemap_from_robots(mock_http):
+    """
+    🤖 A Sitemap: line in robots.txt wins over the /sitemap.xml guess.
+    """
+    mock_http["https://example.com/robots.txt"] = httpx.Response(200, text=(
+        "User-agent: *\nDisallow: /private\n\n"
+        "Sitemap: https://example.com/sitemaps/main.xml\n"
+        "Sitemap: https://example.com/sitemaps/news.xml\n"
+    ))
+    mock_http["https://example.com/sitemaps/main.xml"] = httpx.Response(200, content=urlset("https://example.com/a"))
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        discovered = (await ac.post("/check-sitemap", json={"domain": "example.com"})).json()
+        guessed = (await ac.post("/check-sitemap", json={"domain": "example.com", "discover": False})).json()
+
+    assert discovered["sitemap_url"] == "https://example.com/sitemaps/main.xml"
+    assert discovered["sitemap_source"] == "robots.txt"
+    assert discovered["robots_sitemaps"] == [
+        "https://example.com/sitemaps/main.xml",
+        "https://example.com/sitemaps/news.xml",
+    ]
+    assert discovered["urls"] == ["https://example.com/a"]
+
+    assert guessed["sitemap_url"] == "https://example.com/sitemap.xml"
+    assert guessed["sitemap_source"] == "default"
+    assert guessed["sitemap_status"] == "Not Found"
+
+
+@pytest.mark.asyncio
+async def test_check_sitemap_robots(mock_http):
+    """
+    🚫 Every sitemap URL is matched against the robots.txt of its host;
+    blocked ones are listed with the deciding rule.
+    """
+    mock_http["https://example.com/robots.txt"] = httpx.Response(200, text=(
+        "User-agent: *\nDisallow: /private/\nAllow: /private/public-*\n\n"
+        "User-agent: Googlebot\nDisallow: /\n"
+    ))
+    mock_http["https://cdn.example.com/robots.txt"] = httpx.Response(503)
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, content=urlset(
+        "https://example.com/",
+        "https://example.com/private/a",
+        "https://example.com/private/public-b",
+        "https://cdn.example.com/c",
+        "/relative",
+    ))
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        default = (await ac.post("/check-sitemap-robots", json={"sitemap_url": "https://example.com/sitemap.xml"})).json()
+        google = (await ac.post("/check-sitemap-robots", json={
+            "sitemap_url": "https://example.com/sitemap.xml", "user_agent": "Googlebot/2.1", "max_listed": 1
+        })).json()
+
+    assert default["sitemap_allowed"] is True
+    assert default["total_urls"] == 4
+    assert default["skipped_count"] == 1
+    assert default["blocked_count"] == 2
+    assert default["blocked"] == [
+        {"url": "https://example.com/private/a", "rule": {"allow": False, "pattern": "/private/"}},
+        {"url": "https://cdn.example.com/c", "rule": {"allow": False, "pattern": "/"}},
+    ]
+    assert {f["robots_url"]: f["robots_status"] for f in default["robots_files"]} == {
+        "https://example.com/robots.txt": "ok",
+        "https://cdn.example.com/robots.txt": "unreachable",
+    }
+
+    assert google["sitemap_allowed"] is False
+    assert google["blocked_count"] == 4
+    assert len(google["blocked"]) == 1
+    # Each robots.txt was downloaded once for both requests
+    assert sum(r.url.path == "/robots.txt" for r in mock_http.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_check_sitemap_robots_skips_malformed_locs(mock_http):
+    """
+    🧱 An unparseable <loc> is counted as skipped, the other URLs are still checked.
+    """
+    mock_http["https://example.com/robots.txt"] = httpx.Response(200, text="User-agent: *\nDisallow: /private/\n")
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, content=urlset(
+        "https://[bad/x",
+        "https://example.com/private/a",
+    ))
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/check-sitemap-robots", json={"sitemap_url": "https://example.com/sitemap.xml"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["skipped_count"] == 1 and data["total_urls"] == 1 and data["blocked_count"] == 1
+
+
+def test_validate_sitemap_schema_has_only_its_own_options():
+    """
+    📄 /validate-sitemap documents only the options it uses.
+    """
+    app.openapi_schema = None  # routers were added by the tests after it was built
+    schema = app.openapi()["components"]["schemas"]["SitemapValidateInput"]
+    assert set(schema["properties"]) == {"sitemap_url"}
+
+
+# ===============================
+# Status sweep
+# ===============================
+
+def sweep_routes(mock_http):
+    mock_http["https://example.com/sitemap.xml"] = httpx.Response(200, content=urlset(
+        "https://example.com/ok",
+        "https://example.com/moved",
+        "https://example.com/gone",
+        "https://example.com/no-head",
+        "https://example.com/broken",
+        "https://example.com/down",
+        "mailto:someone@example.com",
+    ))
+    mock_http["https://example.com/ok"] = httpx.Response(200)
+    mock_http["https://example.com/moved"] = httpx.Response(301, headers={"Location": "https://example.com/new"})
+    mock_http["https://example.com/broken"] = httpx.Response(503)
+    mock_http["https://example.com/down"] = httpx.ConnectError("connection refused")
+    mock_http["https://example.com/no-head"] = lambda request: (
+        httpx.Response(405) if request.method == "HEAD" else httpx.Response(206, content=b"<")
+    )
+
+
+@pytest.mark.asyncio
+async def test_sweep_sitemap_status(mock_http):
+    """
+    🚦 Every URL gets a HEAD (GET for one byte where HEAD is refused);
+    non-2xx URLs are listed per class with latency percentiles.
+    """
+    sweep_routes(mock_http)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        data = (await ac.post("/sweep-sitemap-status", json={"sitemap_url": "https://example.com/sitemap.xml"})).json()
+
+    assert data["sitemap_status"] == "Parsed"
+    assert data["total_urls"] == 6
+    assert data["skipped_count"] == 1
+    assert data["counts"] == {"2xx": 2, "3xx": 1, "4xx": 1, "5xx": 1, "error": 1}
+    assert data["redirects"][0]["location"] == "https://example.com/new"
+    assert [r["url"] for r in data["client_errors"]] == ["https://example.com/gone"]
+    assert [r["url"] for r in data["server_errors"]] == ["https://example.com/broken"]
+    assert data["failed"][0]["error"] == "connection refused"
+    assert data["latency"]["p50"] is not None
+
+    page_requests = [r for r in mock_http.requests if r.url.path != "/sitemap.xml"]
+    assert {r.method for r in page_requests if r.url.path != "/no-head"} == {"HEAD"}
+    fallback = [r for r in page_requests if r.url.path == "/no-head"]
+    assert [r.method for r in fallback] == ["HEAD", "GET"]
+    assert fallback[1].headers["Range"] == "bytes=0-0"
+
+
+@pytest.mark.asyncio
+async def test_sweep_sitemap_status_stream(mock_http):
+    """
+    📤 stream=true sends each non-2xx result as it is known, then the summary.
+    """
+    sweep_routes(mock_http)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/sweep-sitemap-status", json={"sitemap_url": "https://example.com/sitemap.xml", "stream": True})
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["url"] for line in lines[:-1]) == [
+        "https://example.com/broken",
+        "https://example.com/down",
+        "https://example.com/gone",
+        "https://example.com/moved",
+    ]
+    assert lines[-1]["counts"]["2xx"] == 2
+    assert lines[-1]["client_errors"] == []
@@ -1,5 +1,8 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
 import pytest
-from unittest.mock import patch, AsyncMock
 from httpx import AsyncClient, ASGITransport
 import httpx
 
@@ -10,7 +13,7 @@ from app.endpoint import url  # assuming your file is named url.py
 app.include_router(url.router)
 
 @pytest.mark.asyncio
-async def test_check_url_basic_success():
+async def test_check_url_basic_success(mock_http):
     """
     ✅ Test /check-url endpoint with a simple valid HTML page.
 
@@ -38,26 +41,19 @@ async def test_check_url_basic_success():
     </html>
     """
 
-    with patch("app.endpoint.url.httpx.AsyncClient") as mock_client:
-        mock_instance = AsyncMock()
-        mock_client.return_value.__aenter__.return_value = mock_instance
-
-        mock_response = AsyncMock()
-        mock_response.status_code = 200
-        mock_response.text = html_content
-        mock_response.content = html_content.encode("utf-8")
-        mock_response.headers = {
+    mock_http["https://example.com/page"] = httpx.Response(
+        200,
+        headers={
             "Content-Type": "text/html; charset=UTF-8",
             "Content-Length": str(len(html_content)),
             "X-Robots-Tag": "noindex"
-        }
-        mock_response.history = []
-        mock_response.url = "https://example.com/page"
-        mock_instance.get.return_value = mock_response
+        },
+        content=html_content.encode("utf-8")
+    )
 
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as ac:
-            response = await ac.post("/check-url", json={"url": "https://example.com/page"})
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/check-url", json={"url": "https://example.com/page"})
 
     data = response.json()
     assert response.status_code == 200
@@ -83,29 +79,22 @@ async def test_check_url_basic_success():
     assert "URL checked successfully" in data["message"]
 
 @pytest.mark.asyncio
-async def test_check_url_redirected():
+async def test_check_url_redirected(mock_http):
     """
     🔄 Test /check-url endpoint when the URL is redirected (with history).
     """
     html_content = "<html><head><title>Redirected Page</title></head><body></body></html>"
 
-    with patch("app.endpoint.url.httpx.AsyncClient") as mock_client:
-        mock_instance = AsyncMock()
-        mock_client.return_value.__aenter__.return_value = mock_instance
-
-        redirect_history = [httpx.Response(301, headers={"Location": "https://example.com/page"})]
-        mock_response = AsyncMock()
-        mock_response.status_code = 200
-        mock_response.text = html_content
-        mock_response.content = html_content.encode("utf-8")
-        mock_response.headers = {"Content-Type": "text/html"}
-        mock_response.history = redirect_history
-        mock_response.url = "https://example.com/page"
-        mock_instance.get.return_value = mock_response
+    mock_http["https://example.com/start"] = httpx.Response(301, headers={"Location": "https://example.com/page"})
+    mock_http["https://example.com/page"] = httpx.Response(
+        200,
+        headers={"Content-Type": "text/html"},
+        content=html_content.encode("utf-8")
+    )
 
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as ac:
-            response = await ac.post("/check-url", json={"url": "https://example.com/start"})
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/check-url", json={"url": "https://example.com/start"})
 
     data = response.json()
     assert response.status_code == 200
@@ -114,7 +103,7 @@ async def test_check_url_redirected():
     assert data["title"] == "Redirected Page"
 
 @pytest.mark.asyncio
-async def test_check_url_no_content_type_but_html():
+async def test_check_url_no_content_type_but_html(mock_http):
     """
     🧐 Test edge case where Content-Type is missing but the content is HTML.
 
@@ -123,29 +112,22 @@ async def test_check_url_no_content_type_but_html():
     """
     html_content = "<!doctype html><html><head><title>HTML No Type</title></head><body></body></html>"
 
-    with patch("app.endpoint.url.httpx.AsyncClient") as mock_client:
-        mock_instance = AsyncMock()
-        mock_client.return_value.__aenter__.return_value = mock_instance
-
-        mock_response = AsyncMock()
-        mock_response.status_code = 200
-        mock_response.text = html_content
-        mock_response.content = html_content.encode("utf-8")
-        mock_response.headers = {}  # No Content-Type header
-        mock_response.history = []
-        mock_response.url = "https://example.com/no-type"
-        mock_instance.get.return_value = mock_response
+    mock_http["https://example.com/no-type"] = httpx.Response(
+        200,
+        headers={},  # No Content-Type header
+        content=html_content.encode("utf-8")
+    )
 
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as ac:
-            response = await ac.post("/check-url", json={"url": "https://example.com/no-type"})
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/check-url", json={"url": "https://example.com/no-type"})
 
     data = response.json()
     assert response.status_code == 200
     assert data["title"] == "HTML No Type"
 
 @pytest.mark.asyncio
-async def test_check_url_invalid_content_length():
+async def test_check_url_invalid_content_length(mock_http):
     """
     🧪 Test edge case where Content-Length header is invalid (non-numeric).
 
@@ -154,32 +136,25 @@ async def test_check_url_invalid_content_length():
     """
     html_content = "<html><head><title>Invalid Length</title></head><body></body></html>"
 
-    with patch("app.endpoint.url.httpx.AsyncClient") as mock_client:
-        mock_instance = AsyncMock()
-        mock_client.return_value.__aenter__.return_value = mock_instance
-
-        mock_response = AsyncMock()
-        mock_response.status_code = 200
-        mock_response.text = html_content
-        mock_response.content = html_content.encode("utf-8")
-        mock_response.headers = {
+    mock_http["https://example.com/invalid-length"] = httpx.Response(
+        200,
+        headers={
             "Content-Type": "text/html",
             "Content-Length": "abc"  # invalid
-        }
-        mock_response.history = []
-        mock_response.url = "https://example.com/invalid-length"
-        mock_instance.get.return_value = mock_response
+        },
+        content=html_content.encode("utf-8")
+    )
 
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as ac:
-            response = await ac.post("/check-url", json={"url": "https://example.com/invalid-length"})
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/check-url", json={"url": "https://example.com/invalid-length"})
 
     data = response.json()
     assert response.status_code == 200
     assert data["content_length"] is None
 
 @pytest.mark.asyncio
-async def test_check_url_empty_robots_meta():
+async def test_check_url_empty_robots_meta(mock_http):
     """
     🦾 Test edge case where <meta name="robots" content=""> is empty.
 
@@ -196,54 +171,327 @@ async def test_check_url_empty_robots_meta():
     </html>
     """
 
-    with patch("app.endpoint.url.httpx.AsyncClient") as mock_client:
-        mock_instance = AsyncMock()
-        mock_client.return_value.__aenter__.return_value = mock_instance
-
-        mock_response = AsyncMock()
-        mock_response.status_code = 200
-        mock_response.text = html_content
-        mock_response.content = html_content.encode("utf-8")
-        mock_response.headers = {"Content-Type": "text/html"}
-        mock_response.history = []
-        mock_response.url = "https://example.com/robots-empty"
-        mock_instance.get.return_value = mock_response
+    mock_http["https://example.com/robots-empty"] = httpx.Response(
+        200,
+        headers={"Content-Type": "text/html"},
+        content=html_content.encode("utf-8")
+    )
 
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as ac:
-            response = await ac.post("/check-url", json={"url": "https://example.com/robots-empty"})
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/check-url", json={"url": "https://example.com/robots-empty"})
 
     data = response.json()
     assert response.status_code == 200
     assert data["robots_meta"] == ""  # Should return empty string
 
 @pytest.mark.asyncio
-async def test_check_url_204_no_content():
+async def test_check_url_204_no_content(mock_http):
     """
     🚫 Test edge case where server responds with 204 No Content.
 
     Expected:
     - No parsing happens, all SEO fields stay None/empty.
     """
-    with patch("app.endpoint.url.httpx.AsyncClient") as mock_client:
-        mock_instance = AsyncMock()
-        mock_client.return_value.__aenter__.return_value = mock_instance
-
-        mock_response = AsyncMock()
-        mock_response.status_code = 204
-        mock_response.text = ""
-        mock_response.content = b""
-        mock_response.headers = {"Content-Type": "text/html"}
-        mock_response.history = []
-        mock_response.url = "https://example.com/no-content"
-        mock_instance.get.return_value = mock_response
+    mock_http["https://example.com/no-content"] = httpx.Response(
+        204,
+        headers={"Content-Type": "text/html"},
+        content=b""
+    )
 
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as ac:
-            response = await ac.post("/check-url", json={"url": "https://example.com/no-content"})
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/check-url", json={"url": "https://example.com/no-content"})
 
     data = response.json()
     assert response.status_code == 200
     assert data["http_status"] == 204
     assert data["title"] is None
     assert data["description"] is None
+
+
+@pytest.mark.asyncio
+async def test_check_url_robots_txt(mock_http):
+    """
+    🤖 check_robots=true adds the robots.txt verdict and an SEO check.
+    """
+    mock_http["https://example.com/robots.txt"] = httpx.Response(200, text="User-agent: *\nDisallow: /drafts/\n")
+    mock_http["https://example.com/drafts/post"] = httpx.Response(
+        200, headers={"Content-Type": "text/html"}, text="<html><title>Draft</title></html>"
+    )
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        data = (await ac.post("/check-url", json={"url": "https://example.com/drafts/post", "check_robots": True})).json()
+        plain = (await ac.post("/check-url", json={"url": "https://example.com/drafts/post"})).json()
+
+    assert data["robots_txt"] == {
+        "robots_url": "https://example.com/robots.txt",
+        "robots_status": "ok",
+        "allowed": False,
+        "rule": {"allow": False, "pattern": "/drafts/"},
+    }
+    assert data["seo_checks"]["robots_txt"]["passed"] is False
+    assert plain["robots_txt"] is None
+    assert "robots_txt" not in plain["seo_checks"]
+
+
+@pytest.mark.asyncio
+async def test_check_url_head_only(mock_http):
+    """
+    ✂️ head_only=true stops downloading at </head> and skips the H1 checks.
+    """
+    served = []
+
+    def page(request):
+        async def body():
+            for chunk in [b"<html><head><title>Fast</title></head>", b"<body><h1>Heading</h1>"] + [b"<p>x</p>" * 500] * 20:
+                served.append(chunk)
+                yield chunk
+        return httpx.Response(200, headers={"Content-Type": "text/html"}, content=body())
+
+    mock_http["https://example.com/big"] = page
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        data = (await ac.post("/check-url", json={"url": "https://example.com/big", "head_only": True})).json()
+        served.clear()
+        full = (await ac.post("/check-url", json={"url": "https://example.com/big", "head_only": True, "with_headings": True})).json()
+
+    assert data["title"] == "Fast"
+    assert data["headings"] == [] and "h1" not in data["seo_checks"]
+    assert data["read_stopped"] == "head_end"
+    assert data["body_bytes_read"] == len(b"<html><head><title>Fast</title></head>")
+    assert full["h1"] == "Heading" and full["seo_checks"]["h1"]["passed"] is True
+    assert full["read_stopped"] is None and len(served) == 22
+
+
+@pytest.mark.asyncio
+async def test_check_url_fields(mock_http):
+    """
+    🎯 fields=[...] returns only those fields and skips the work the others need.
+    """
+    served = []
+
+    def page(request):
+        async def body():
+            served.append(request.url.path)
+            yield b"<html><head><title>Picked</title><link rel=canonical href=https://example.com/c></head><h1>H</h1></html>"
+        return httpx.Response(200, headers={"Content-Type": "text/html", "X-Test": "1"}, content=body())
+
+    mock_http["https://example.com/page"] = page
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        slim = (await ac.post("/check-url", json={"url": "https://example.com/page", "fields": ["http_status", "title", "canonical"]})).json()
+        status_only = (await ac.post("/check-url", json={"url": "https://example.com/page", "fields": ["http_status", "content_type"]})).json()
+        unknown = await ac.post("/check-url", json={"url": "https://example.com/page", "fields": ["title", "nope"]})
+
+    assert slim == {
+        "url": "https://example.com/page",
+        "http_status": 200,
+        "title": "Picked",
+        "canonical": "https://example.com/c",
+        "message": "URL checked successfully. Status: 200",
+    }
+    assert status_only["content_type"] == "text/html" and set(status_only) == {"url", "http_status", "content_type", "message"}
+    # The status-only check never read the body
+    assert served == ["/page"]
+    assert unknown.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_check_urls_streams_results(mock_http):
+    """
+    📤 /check-urls streams one URLCheckResponse per line, at most per_host_concurrency per host at a time.
+    """
+    running = {"now": 0, "max": 0}
+
+    async def slow_page(request):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        return httpx.Response(200, headers={"Content-Type": "text/html"}, text=f"<title>{request.url.path}</title>")
+
+    urls = [f"https://example.com/p{i}" for i in range(6)] + ["https://other.com/missing"]
+    for url in urls[:-1]:
+        mock_http[url] = slow_page
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/check-urls", json={"urls": urls, "per_host_concurrency": 2, "fields": ["http_status", "title"]})
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    results = {item["url"]: item for item in map(json.loads, response.text.splitlines())}
+    assert set(results) == set(urls)
+    assert results["https://example.com/p3"]["title"] == "/p3"
+    assert results["https://other.com/missing"] == {
+        "url": "https://other.com/missing", "http_status": 404, "title": None, "message": "URL checked successfully. Status: 404"
+    }
+    assert running["max"] == 2
+
+
+@pytest.mark.asyncio
+async def test_check_url_render(mock_http, monkeypatch):
+    """
+    🖥️ render=true takes page fields from the browser DOM and lists what differs from the raw HTML.
+    """
+    from app.browser_jobs import BrowserJobQueue, get_browser_jobs
+    from app.tests.test_browser_jobs import fake_pool
+
+    def fake_render(driver, url, wait, block, **kwargs):
+        html = "<html><head><title>Rendered title</title><link rel=canonical href=https://example.com/spa></head><h1>App</h1></html>"
+        blocking = {"requests_allowed": 3, "requests_blocked": 2, "blocked_by_type": {"image": 2}, "bytes_saved_estimate": 60000}
+        return {"final_url": url, "html": html, "ready": True, "elapsed": 0.5, "blocking": blocking if block else None}
+
+    monkeypatch.setattr(url, "render_page", fake_render)
+    jobs = BrowserJobQueue(fake_pool(), workers=1, max_queued=1, job_timeout=5)
+    app.dependency_overrides[get_browser_jobs] = lambda: jobs
+    mock_http["https://example.com/spa"] = httpx.Response(
+        200, headers={"Content-Type": "text/html"}, text="<html><head><title>Loading…</title></head><div id=app></div></html>"
+    )
+
+    try:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            data = (await ac.post("/check-url", json={"url": "https://example.com/spa", "render": True, "render_wait": "#app h1"})).json()
+            raw = (await ac.post("/check-url", json={"url": "https://example.com/spa"})).json()
+    finally:
+        app.dependency_overrides.pop(get_browser_jobs, None)
+        jobs.close()
+
+    assert data["title"] == "Rendered title" and data["h1"] == "App"
+    assert data["canonical_matches"] is True
+    rendered = data["rendered"]
+    assert rendered["status"] == "done" and rendered["ready"] is True and rendered["wait"] == "#app h1"
+    assert rendered["blocking"]["requests_blocked"] == 2 and rendered["blocking"]["blocked_by_type"] == {"image": 2}
+    differences = {item["field"]: item for item in rendered["differences"]}
+    assert set(differences) == {"title", "canonical", "headings", "all_h1", "h1"}
+    assert differences["title"] == {"field": "title", "raw": "Loading…", "rendered": "Rendered title"}
+    assert raw["title"] == "Loading…" and raw["rendered"] is None
+
+
+@pytest.mark.asyncio
+async def test_check_url_render_refuses_private_hosts(mock_http, fake_dns, monkeypatch):
+    """
+    🛡️ A page whose host resolves to a private address is checked from the
+    raw HTML only: the browser never loads it.
+    """
+    from app.browser_jobs import get_browser_jobs
+
+    fake_dns["intranet.example.com"] = "10.0.0.7"
+    submitted = []
+    jobs = SimpleNamespace(submit=lambda *args, **kwargs: submitted.append(kwargs))
+    app.dependency_overrides[get_browser_jobs] = lambda: jobs
+    mock_http["https://intranet.example.com/"] = httpx.Response(
+        200, headers={"Content-Type": "text/html"}, text="<html><head><title>Raw</title></head></html>"
+    )
+
+    try:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            data = (await ac.post("/check-url", json={"url": "https://intranet.example.com/", "render": True})).json()
+    finally:
+        app.dependency_overrides.pop(get_browser_jobs, None)
+
+    assert data["title"] == "Raw"
+    assert data["rendered"]["status"] == "refused" and "10.0.0.7" in data["rendered"]["error"]
+    assert submitted == []
+
+
+@pytest.mark.asyncio
+async def test_check_url_failed_reads_do_not_leak_host_slots():
+    """
+    🔓 Body reads that time out (full and head-only) still free the host's
+    connection slot, so the next check of that host completes.
+    """
+    from app.http_client import HostLimitedTransport, get_http_client
+    from app.tests.test_redirects import FailingStream
+
+    def handler(request):
+        if request.url.path == "/broken":
+            return httpx.Response(200, headers={"Content-Type": "text/html"}, stream=FailingStream())
+        return httpx.Response(200, headers={"Content-Type": "text/html"}, text="<title>Fine</title>")
+
+    client = httpx.AsyncClient(transport=HostLimitedTransport(httpx.MockTransport(handler), max_per_host=2))
+    app.dependency_overrides[get_http_client] = lambda: client
+    try:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            for head_only in (False, True):
+                for _ in range(2):
+                    failed = await ac.post("/check-url", json={"url": "https://example.com/broken", "head_only": head_only})
+                    assert failed.json()["message"].startswith("Request failed")
+            ok = await asyncio.wait_for(ac.post("/check-url", json={"url": "https://example.com/ok"}), 2)
+    finally:
+        app.dependency_overrides.pop(get_http_client, None)
+        await client.aclose()
+
+    assert ok.json()["title"] == "Fine"
+
+
+@pytest.mark.asyncio
+async def test_check_urls_evaluates_rules_per_chunk(mock_http, monkeypatch):
+    """
+    📏 /check-urls runs the SEO rules with evaluate_many over chunks of finished pages, never page by page.
+    """
+    from app.seo_rules import RuleSet
+
+    batches = []
+    evaluate_many = RuleSet.evaluate_many
+
+    def spy(self, pages):
+        batches.append(len(pages))
+        return evaluate_many(self, pages)
+
+    monkeypatch.setattr(RuleSet, "evaluate_many", spy)
+    monkeypatch.setattr(RuleSet, "evaluate", lambda self, values: pytest.fail("evaluated one page at a time"))
+    urls = [f"https://example.com/{i}" for i in range(4)]
+    for page_url in urls:
+        mock_http[page_url] = httpx.Response(200, headers={"Content-Type": "text/html"}, text="<title>Short</title>")
+    mock_http["https://example.com/broken"] = httpx.ConnectError("refused")
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/check-urls", json={"urls": urls + ["https://example.com/broken"]})
+
+    lines = {line["url"]: line for line in map(json.loads, response.text.splitlines())}
+    assert all(lines[page_url]["seo_checks"]["title"]["passed"] is False for page_url in urls)
+    assert lines["https://example.com/broken"]["seo_checks"] is None
+    assert sum(batches) == 4 and len(batches) < 4
+
+
+@pytest.mark.asyncio
+async def test_render_respects_browser_queue_backpressure(mock_http, monkeypatch):
+    """
+    🚦 With the browser queue full, /check-url render=true answers 429 right
+    away; /check-urls waits BROWSER_QUEUE_WAIT at most and reports queue_full.
+    """
+    import threading
+
+    from app import settings
+    from app.browser_jobs import BrowserJobQueue, get_browser_jobs
+    from app.tests.test_browser_jobs import fake_pool
+
+    release = threading.Event()
+    jobs = BrowserJobQueue(fake_pool(), workers=1, max_queued=0, job_timeout=5)
+    app.dependency_overrides[get_browser_jobs] = lambda: jobs
+    monkeypatch.setattr(settings, "BROWSER_QUEUE_WAIT", 0.1)
+    mock_http["https://example.com/spa"] = httpx.Response(200, headers={"Content-Type": "text/html"}, text="<title>Raw</title>")
+
+    try:
+        busy = jobs.submit("block", lambda driver: release.wait(5))
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            single = await asyncio.wait_for(ac.post("/check-url", json={"url": "https://example.com/spa", "render": True}), 2)
+            batch = await asyncio.wait_for(ac.post("/check-urls", json={"urls": ["https://example.com/spa"], "render": True}), 2)
+    finally:
+        release.set()
+        await jobs.wait(busy, timeout=5)
+        app.dependency_overrides.pop(get_browser_jobs, None)
+        jobs.close()
+
+    assert single.status_code == 429 and "Retry-After" in single.headers
+    line = json.loads(batch.text.splitlines()[0])
+    assert line["rendered"]["status"] == "queue_full" and line["title"] == "Raw"
@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.browser_jobs import BrowserJobQueue, QueueClosedError, QueueFullError
+from app.browser_pool import BrowserPool
+from app.tests.test_browser_pool import FakeDriver
+
+
+def fake_pool(size=1):
+    return BrowserPool(size=size, max_memory_mb=0, driver_factory=FakeDriver, display_factory=lambda: None)
+
+
+@pytest.mark.asyncio
+async def test_jobs_run_and_can_be_polled():
+    jobs = BrowserJobQueue(fake_pool(), workers=1, max_queued=5, job_timeout=5)
+    try:
+        first = jobs.submit("title", lambda driver, url: f"visited {url}", url="https://example.com/")
+        failing = jobs.submit("broken", lambda driver: 1 / 0)
+        assert jobs.get(failing.id).status == "queued"
+
+        await jobs.wait(first, timeout=5)
+        await jobs.wait(failing, timeout=5)
+    finally:
+        jobs.close()
+
+    assert first.status == "done" and first.result == "visited https://example.com/"
+    assert failing.status == "failed" and failing.error.startswith("ZeroDivisionError")
+    assert jobs.get(first.id) is first
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_refused():
+    release = threading.Event()
+    jobs = BrowserJobQueue(fake_pool(), workers=1, max_queued=1, job_timeout=5)
+    try:
+        running = jobs.submit("block", lambda driver: release.wait(5))
+        queued = jobs.submit("block", lambda driver: release.wait(5))
+        with pytest.raises(QueueFullError):
+            jobs.submit("block", lambda driver: None)
+
+        await asyncio.sleep(0.05)
+        assert jobs.stats()["running"] == 1 and jobs.get(queued.id).queue_position == 1
+        release.set()
+        await jobs.wait(queued, timeout=5)
+        assert running.status == queued.status == "done"
+    finally:
+        release.set()
+        jobs.close()
+
+    with pytest.raises(QueueClosedError):
+        jobs.submit("late", lambda driver: None)
+
+
+@pytest.mark.asyncio
+async def test_timed_out_jobs_replace_their_browser():
+    pool = fake_pool()
+    jobs = BrowserJobQueue(pool, workers=1, max_queued=1, job_timeout=0.1)
+
+    def stuck(driver):
+        # Stands for a blocking WebDriver call that fails once the browser is quit
+        while not driver.quit_called:
+            time.sleep(0.01)
+        driver.dead = True
+        raise RuntimeError("browser went away")
+
+    try:
+        job = await jobs.wait(jobs.submit("stuck", stuck), timeout=5)
+        assert job.status == "timeout"
+        follow_up = await jobs.wait(jobs.submit("ok", lambda driver: "fine"), timeout=5)
+    finally:
+        jobs.close()
+
+    assert follow_up.result == "fine"
+    assert pool.started == 2 and pool.recycled == 1
+
+
+@pytest.mark.asyncio
+async def test_job_timing_out_before_it_gets_a_browser_never_runs():
+    """
+    A job that times out while its worker still waits for a browser is
+    cancelled: the task never starts, and the worker counts as busy until
+    it has actually let go.
+    """
+    pool = BrowserPool(size=1, max_memory_mb=0, checkout_timeout=5, driver_factory=FakeDriver, display_factory=lambda: None)
+    jobs = BrowserJobQueue(pool, workers=1, max_queued=0, job_timeout=0.1)
+    ran = threading.Event()
+    held = pool.session()
+    held.__enter__()  # the only browser is busy elsewhere
+    try:
+        job = await jobs.wait(jobs.submit("late", lambda driver: ran.set()), timeout=5)
+        assert job.status == "timeout"
+        # The worker is still blocked in the pool checkout: no room yet
+        assert jobs.stats()["running"] == 1
+        with pytest.raises(QueueFullError):
+            jobs.submit("more", lambda driver: None)
+
+        held.__exit__(None, None, None)
+        for _ in range(100):
+            if jobs.stats()["running"] == 0:
+                break
+            await asyncio.sleep(0.02)
+        follow_up = await jobs.run("ok", lambda driver: "fine")
+    finally:
+        jobs.close()
+
+    assert not ran.is_set()
+    assert follow_up.result == "fine"
+
+
+@pytest.mark.asyncio
+async def test_jobs_still_queued_at_close_fail_instead_of_hanging():
+    release = threading.Event()
+    jobs = BrowserJobQueue(fake_pool(), workers=1, max_queued=1, job_timeout=5)
+    try:
+        running = jobs.submit("block", lambda driver: release.wait(5))
+        waiting = jobs.submit("late", lambda driver: "never")
+        await asyncio.sleep(0.05)  # both handed to the executor, one of them waiting
+        jobs.close()  # cancels the waiting one
+        await asyncio.wait_for(jobs.wait(waiting), 5)
+
+        unscheduled = BrowserJobQueue(fake_pool(), workers=1, max_queued=1, job_timeout=5)
+        refused = unscheduled.submit("late", lambda driver: "never")
+        unscheduled.close()  # before the job got to the executor at all
+        await asyncio.wait_for(unscheduled.wait(refused), 5)
+    finally:
+        release.set()
+
+    assert waiting.status == "failed" and waiting.result is None
+    assert refused.status == "failed" and refused.error.startswith("RuntimeError")
+    assert jobs.stats()["queued"] == unscheduled.stats()["queued"] == 0
+    assert (await jobs.wait(running, timeout=5)).status == "done"
@@ -0,0 +1,113 @@
+import os
+import threading
+
+import pytest
+
+from app.browser_pool import BrowserPool, process_tree_rss
+
+
+class FakeDriver:
+    def __init__(self):
+        self.calls = []
+        self.dead = False
+        self.quit_called = False
+        self.request_interceptor = lambda request: None
+        self.scopes = [".*example.com.*"]
+
+    def execute_script(self, script):
+        if self.dead:
+            raise RuntimeError("chrome not reachable")
+        return 1
+
+    def execute_cdp_cmd(self, command, params):
+        self.calls.append(command)
+
+    def get(self, url):
+        self.calls.append(url)
+
+    def quit(self):
+        self.quit_called = True
+
+
+def make_pool(**kwargs):
+    drivers = []
+
+    def factory():
+        drivers.append(FakeDriver())
+        return drivers[-1]
+
+    kwargs.setdefault("max_memory_mb", 0)
+    return BrowserPool(driver_factory=factory, display_factory=lambda: None, **kwargs), drivers
+
+
+def test_sessions_are_reused_and_reset():
+    pool, drivers = make_pool(size=2, max_uses=10)
+
+    with pool.session() as first:
+        first.get("https://example.com/")
+    with pool.session() as second:
+        pass
+
+    assert first is second and len(drivers) == 1
+    assert "Network.clearBrowserCookies" in first.calls and first.calls[-1] == "about:blank"
+    assert not hasattr(first, "request_interceptor") and first.scopes == []
+
+
+def test_sessions_are_recycled_after_max_uses_and_crashes():
+    pool, drivers = make_pool(size=1, max_uses=2)
+
+    for _ in range(2):
+        with pool.session():
+            pass
+    assert drivers[0].quit_called and pool.recycled == 1
+
+    with pytest.raises(RuntimeError):
+        with pool.session() as driver:
+            driver.dead = True
+            raise RuntimeError("task failed")
+    assert drivers[1].quit_called
+
+    # A task error with a healthy browser keeps the session
+    with pytest.raises(ValueError):
+        with pool.session():
+            raise ValueError("bad selector")
+    with pool.session() as driver:
+        assert driver is drivers[2]
+
+
+def test_pool_size_caps_sessions():
+    pool, drivers = make_pool(size=1)
+    checked_out = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with pool.session():
+            checked_out.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    checked_out.wait(5)
+    with pytest.raises(TimeoutError):
+        with pool.session(timeout=0.1):
+            pass
+    release.set()
+    thread.join()
+
+    with pool.session(timeout=1):
+        pass
+    assert len(drivers) == 1
+
+
+def test_warm_and_close():
+    pool, drivers = make_pool(size=3)
+    pool.warm()
+    assert len(drivers) == 3 and pool.stats()["idle"] == 3
+
+    pool.close()
+    assert all(driver.quit_called for driver in drivers)
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/stat"), reason="needs /proc")
+def test_process_tree_rss_counts_own_process():
+    assert process_tree_rss(os.getpid()) > 0
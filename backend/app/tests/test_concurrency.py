@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from app.concurrency import TokenBucket, run_bounded, run_bounded_chunks
+
+
+@pytest.mark.asyncio
+async def test_run_bounded_respects_global_and_per_key_limits():
+    """
+    🚦 No more than `concurrency` workers overall and `per_key_concurrency` per key.
+    """
+    running = {"total": 0}
+    peak = {"total": 0}
+
+    async def worker(item):
+        host, _ = item
+        for key in ("total", host):
+            running[key] = running.get(key, 0) + 1
+            peak[key] = max(peak.get(key, 0), running[key])
+        await asyncio.sleep(0.01)
+        for key in ("total", host):
+            running[key] -= 1
+        return item
+
+    items = [("a", i) for i in range(10)] + [("b", i) for i in range(10)] + [("c", i) for i in range(10)]
+    results = [r async for r in run_bounded(items, worker, concurrency=4, per_key_concurrency=2, key=lambda i: i[0])]
+
+    assert sorted(results) == sorted(items)
+    assert peak["total"] == 4
+    assert max(peak[h] for h in "abc") == 2
+
+
+@pytest.mark.asyncio
+async def test_run_bounded_yields_in_completion_order_and_cancels_on_close():
+    """
+    ⏩ Fast items come out first; closing the iterator cancels what is still pending.
+    """
+    async def worker(delay):
+        await asyncio.sleep(delay)
+        return delay
+
+    results = run_bounded([0.5, 0.0, 0.5], worker, concurrency=3)
+    assert await results.__anext__() == 0.0
+    await results.aclose()
+
+    await asyncio.sleep(0)
+    assert all(t.done() for t in asyncio.all_tasks() if t is not asyncio.current_task())
+
+
+@pytest.mark.asyncio
+async def test_run_bounded_chunks_groups_results_finished_together():
+    """
+    📦 Results that finish at the same time come out as one chunk, in input order.
+    """
+    async def worker(item):
+        delay, value = item
+        await asyncio.sleep(delay)
+        return value
+
+    items = [(0.05, "c"), (0, "a"), (0, "b"), (0.05, "d")]
+    chunks = [chunk async for chunk in run_bounded_chunks(items, worker, concurrency=4)]
+
+    assert chunks == [["a", "b"], ["c", "d"]]
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_allows_burst_then_rate():
+    """
+    🪣 `burst` acquisitions go through at once, the rest are spaced by 1/rate.
+    """
+    bucket = TokenBucket(rate=50, burst=3)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    times = []
+    for _ in range(6):
+        await bucket.acquire()
+        times.append(loop.time() - started)
+
+    assert times[2] < 0.01
+    assert times[5] >= 0.05
+    assert times[5] < 0.5
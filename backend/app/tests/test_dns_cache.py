@@ -0,0 +1,142 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import dns.resolver
+import httpcore
+import pytest
+
+from app.dns_cache import CachedDNSNetworkBackend, CachingResolver
+
+
+class FakeRdata:
+    def __init__(self, address):
+        self.address = address
+
+    def to_text(self):
+        return self.address
+
+
+class FakeAnswer:
+    def __init__(self, addresses, ttl=300):
+        self.rrset = SimpleNamespace(ttl=ttl)
+        self._rdata = [FakeRdata(a) for a in addresses]
+
+    def __iter__(self):
+        return iter(self._rdata)
+
+
+def make_resolver(**kwargs):
+    backend = MagicMock()
+    backend.resolve = AsyncMock(return_value=FakeAnswer(["93.184.216.34"]))
+    return CachingResolver(resolver=backend, **kwargs), backend
+
+
+@pytest.mark.asyncio
+async def test_positive_answer_is_cached_until_ttl_expires():
+    """
+    ⏱ A cached answer is served until its TTL runs out, then re-queried.
+    """
+    resolver, backend = make_resolver()
+
+    with patch("app.dns_cache.time.monotonic", return_value=1000.0):
+        assert await resolver.resolve("Example.com") == ["93.184.216.34"]
+        assert await resolver.resolve("example.com.") == ["93.184.216.34"]
+    assert backend.resolve.await_count == 1
+    assert resolver.stats()["hits"] == 1
+    assert resolver.stats()["misses"] == 1
+
+    with patch("app.dns_cache.time.monotonic", return_value=1301.0):
+        await resolver.resolve("example.com")
+    assert backend.resolve.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_nxdomain_and_noanswer_are_negatively_cached():
+    """
+    🚫 NXDOMAIN and NoAnswer are cached for negative_ttl; timeouts are not cached.
+    """
+    resolver, backend = make_resolver(negative_ttl=60)
+    backend.resolve.side_effect = dns.resolver.NXDOMAIN()
+
+    for _ in range(2):
+        with pytest.raises(dns.resolver.NXDOMAIN):
+            await resolver.resolve("missing.example")
+    assert backend.resolve.await_count == 1
+
+    backend.resolve.side_effect = dns.resolver.NoAnswer()
+    for _ in range(2):
+        with pytest.raises(dns.resolver.NoAnswer):
+            await resolver.resolve("no-a.example")
+    assert backend.resolve.await_count == 2
+
+    backend.resolve.side_effect = dns.resolver.LifetimeTimeout(timeout=1.0, errors=[])
+    for _ in range(2):
+        with pytest.raises(dns.resolver.Timeout):
+            await resolver.resolve("slow.example")
+    assert backend.resolve.await_count == 4
+
+
+@pytest.mark.asyncio
+async def test_cache_is_bounded_with_lru_eviction():
+    """
+    📦 Least recently used entries are evicted once max_size is reached.
+    """
+    resolver, backend = make_resolver(max_size=2)
+
+    await resolver.resolve("a.example")
+    await resolver.resolve("b.example")
+    await resolver.resolve("a.example")  # a is now most recently used
+    await resolver.resolve("c.example")  # evicts b
+
+    assert resolver.stats()["size"] == 2
+    backend.resolve.reset_mock()
+    await resolver.resolve("a.example")
+    assert backend.resolve.await_count == 0
+    await resolver.resolve("b.example")
+    assert backend.resolve.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_query():
+    """
+    🤝 Concurrent lookups of the same name only send one query.
+    """
+    resolver, backend = make_resolver()
+
+    async def slow_resolve(host, rdtype):
+        await asyncio.sleep(0.01)
+        return FakeAnswer(["10.0.0.1"])
+
+    backend.resolve.side_effect = slow_resolve
+    results = await asyncio.gather(*(resolver.resolve("example.com") for _ in range(5)))
+
+    assert results == [["10.0.0.1"]] * 5
+    assert backend.resolve.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_network_backend_connects_to_cached_address():
+    """
+    🔌 The httpx transport backend connects to the address from the cache.
+    """
+    resolver, _ = make_resolver()
+    inner = MagicMock()
+    inner.connect_tcp = AsyncMock(return_value="stream")
+    backend = CachedDNSNetworkBackend(resolver, backend=inner)
+
+    assert await backend.connect_tcp("example.com", 443) == "stream"
+    inner.connect_tcp.assert_awaited_once_with("93.184.216.34", 443, None, None, None)
+
+    # IP literals skip the resolver
+    await backend.connect_tcp("127.0.0.1", 80)
+    assert inner.connect_tcp.await_args.args[:2] == ("127.0.0.1", 80)
+
+
+@pytest.mark.asyncio
+async def test_network_backend_maps_dns_errors_to_connect_error():
+    resolver, backend = make_resolver()
+    backend.resolve.side_effect = dns.resolver.NXDOMAIN()
+
+    with pytest.raises(httpcore.ConnectError):
+        await CachedDNSNetworkBackend(resolver, backend=MagicMock()).connect_tcp("missing.example", 443)
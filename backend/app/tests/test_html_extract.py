@@ -0,0 +1,155 @@
+import random
+
+import httpx
+import pytest
+
+from app.html_extract import extract_page, extract_single_pass, extract_soup, read_head
+
+PAGE = """<!DOCTYPE html>
+<html lang=" en ">
+<head>
+  <title> Shoes &amp; Boots </title>
+  <meta name="description" content=" Best shoes ">
+  <meta name="description" content="ignored, only the first one counts">
+  <meta name="robots" content="noindex">
+  <meta property="og:title" content="OG title">
+  <meta name="twitter:card" content="summary">
+  <link rel="canonical" href=" https://example.com/shoes ">
+  <link rel="alternate" hreflang="de" href="https://example.com/de/shoes">
+  <link rel="shortcut icon" href="/favicon.ico">
+  <script type="application/ld+json"> {"@type": "Product"} </script>
+</head>
+<body>
+  <h1>Shoes <span>&amp; boots</span></h1>
+  <h2>Sizes<script>ignored()</script></h2>
+  <h1>Second</h1>
+</body>
+</html>"""
+
+# Markup where BeautifulSoup's tree rules decide the result
+TRICKY = [
+    "<title>a<!--c-->b</title>",
+    "<title><b>x</b></title>",
+    "<title><!----></title>",
+    "<title> </title><title>second</title>",
+    "<h1>outer<h1>inner</h1>after</h1>",
+    "<br><p>a</br>b</p><h1>x<br/>y</h1><h3>z</h3>",
+    "<h1>&#150;&#x41;&nbsp;&unknown;&amp&lt</h1>",
+    "<h1><![CDATA[cd]]>x<!--c--></h1>",
+    "<h2><rt>r</rt>s<rp>p</rp></h2>",
+    "<h1><template>t</template>z<style>s</style></h1>",
+    "<h4>a</h4 ><h5>b</h6>c</h5>",
+    "<h1>unclosed<div>more",
+    "<meta><h1>in<meta/>side</h1>after",
+    "<link rel='nofollow canonical' href=' y '><link rel=canonical href=z>",
+    "<link rel='alternate stylesheet' hreflang=de href=/de><link rel='apple-touch-icon' href=a.png>",
+    "<script type='application/ld+json'></script><script type='application/ld+json'>{}</script>",
+    "<textarea><h1>t</h1></textarea><pre>  </pre><h1>  </h1>",
+    "<svg><title>svg title</title></svg><title>real</title>",
+]
+
+
+def test_single_pass_extracts_every_field():
+    page = extract_single_pass(PAGE)
+
+    assert page.title == "Shoes & Boots"
+    assert page.description == "Best shoes"
+    assert page.robots_meta == "noindex"
+    assert page.canonical == "https://example.com/shoes"
+    assert page.open_graph == {"og:title": "OG title"}
+    assert page.twitter_meta == {"twitter:card": "summary"}
+    assert page.headings == [("h1", "Shoes& boots"), ("h2", "Sizes"), ("h1", "Second")]
+    assert page.h1 == "Shoes& boots" and page.all_h1 == ["Shoes& boots", "Second"]
+    assert page.schema_json_ld == '{"@type": "Product"}'
+    assert page.alternate_hreflang == [("de", "https://example.com/de/shoes")]
+    assert page.lang == "en"
+    assert page.favicon_url == "/favicon.ico"
+
+
+@pytest.mark.parametrize("html", [PAGE] + TRICKY)
+def test_single_pass_matches_soup(html):
+    assert extract_single_pass(html).as_dict() == extract_soup(html).as_dict()
+
+
+def test_single_pass_matches_soup_on_random_markup():
+    tags = ["h1", "h2", "title", "meta", "link", "br", "script", "style", "div", "span", "html", "rt", "pre"]
+    attrs = [
+        "name=description content='d{}'", "rel=canonical href=c{}", "rel=alternate hreflang=x href=h{}",
+        "rel='shortcut icon' href=i{}", "property=og:t content=o{}", "type=application/ld+json", "lang=l{}", "",
+    ]
+    texts = ["hello", " ", "\n", "&amp;", "&#169;", "<!--c-->", "<!---->", "<![CDATA[z]]>", "a &b c"]
+    rnd = random.Random(42)
+    for n in range(500):
+        parts = []
+        for _ in range(rnd.randint(1, 25)):
+            roll, tag = rnd.random(), rnd.choice(tags)
+            if roll < 0.35:
+                parts.append(f"<{tag} {rnd.choice(attrs).format(n)}>")
+            elif roll < 0.55:
+                parts.append(f"</{tag}>")
+            elif roll < 0.6:
+                parts.append(f"<{tag} {rnd.choice(attrs).format(n)}/>")
+            else:
+                parts.append(rnd.choice(texts))
+        html = "".join(parts)
+        assert extract_single_pass(html).as_dict() == extract_soup(html).as_dict(), html
+
+
+def test_extract_page_backends():
+    assert extract_page(PAGE, "soup").as_dict() == extract_page(PAGE).as_dict()
+
+
+def streamed(chunks, served, content_type="text/html; charset=utf-8"):
+    async def body():
+        for chunk in chunks:
+            served.append(chunk)
+            yield chunk
+
+    headers = {"Content-Type": content_type} if content_type else {}
+    return httpx.Response(200, headers=headers, content=body())
+
+
+@pytest.mark.asyncio
+async def test_read_head_stops_at_head_end():
+    served = []
+    body = [b"<html><head><title>Caf\xc3", b"\xa9</title><meta name=robots content=noindex></head>"]
+    body += [b"<body><h1>x</h1>" + b"<p>filler</p>" * 1000] * 50
+    response = streamed(body, served)
+
+    read = await read_head(response)
+    await response.aclose()
+
+    assert read.page.title == "Café"
+    assert read.page.robots_meta == "noindex"
+    assert read.page.headings == []
+    assert read.stopped == "head_end"
+    assert len(served) == 2 and read.bytes_read == len(body[0]) + len(body[1])
+
+
+@pytest.mark.asyncio
+async def test_read_head_with_headings_reads_up_to_the_cap():
+    served = []
+    body = [b"<html><head><title>t</title></head><body><h1>One</h1>", b"<h2>Two</h2>", b"<h2>Three</h2>", b"<h2>Four</h2>"]
+    response = streamed(body, served)
+
+    read = await read_head(response, max_bytes=len(body[0]) + 5, headings=True)
+    await response.aclose()
+
+    assert read.page.headings == [("h1", "One"), ("h2", "Two")]
+    assert read.stopped == "max_bytes"
+    assert len(served) == 2
+
+
+@pytest.mark.asyncio
+async def test_read_head_sniffs_bodies_without_content_type():
+    html = streamed([b"  \n <!DOC", b"TYPE html><title>Sniffed</title>"], [], content_type=None)
+    text = streamed([b"just some ", b"plain text, not a page"], [], content_type=None)
+
+    assert (await read_head(html, sniff=True)).page.title == "Sniffed"
+    assert (await read_head(text, sniff=True)).page is None
+
+
+def test_headings_can_be_skipped():
+    for backend in ("html.parser", "soup"):
+        page = extract_page(PAGE, backend, headings=False)
+        assert page.headings == [] and page.title == "Shoes & Boots"
@@ -0,0 +1,75 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.http_client import HostLimitedTransport
+
+
+class NetworkStream(httpx.AsyncByteStream):
+    """Body that is not in memory yet, like one read from a socket."""
+
+    async def __aiter__(self):
+        yield b"ok"
+
+
+@pytest.mark.asyncio
+async def test_host_limited_transport_caps_concurrency_per_host():
+    """
+    🚦 At most `max_per_host` requests run against the same host at once,
+    while other hosts are not blocked by it.
+    """
+    in_flight = {}
+    peak = {}
+
+    async def handler(request):
+        host = request.url.host
+        in_flight[host] = in_flight.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), in_flight[host])
+        await asyncio.sleep(0.01)
+        in_flight[host] -= 1
+        return httpx.Response(200, text="ok")
+
+    transport = HostLimitedTransport(httpx.MockTransport(handler), max_per_host=2)
+    async with httpx.AsyncClient(transport=transport) as client:
+        urls = [f"https://a.example/{i}" for i in range(6)] + [f"https://b.example/{i}" for i in range(3)]
+        responses = await asyncio.gather(*(client.get(u) for u in urls))
+
+    assert all(r.status_code == 200 for r in responses)
+    assert peak == {"a.example": 2, "b.example": 2}
+    # Idle hosts don't keep semaphores around
+    assert len(transport._limiter) == 0
+
+
+@pytest.mark.asyncio
+async def test_host_limited_transport_holds_slot_until_body_closed():
+    """
+    📥 A streamed response keeps its per-host slot until the body is closed.
+    """
+    transport = HostLimitedTransport(
+        httpx.MockTransport(lambda request: httpx.Response(200, stream=NetworkStream())),
+        max_per_host=1,
+    )
+    async with httpx.AsyncClient(transport=transport) as client:
+        async with client.stream("GET", "https://a.example/1"):
+            second = asyncio.ensure_future(client.get("https://a.example/2"))
+            await asyncio.sleep(0.01)
+            assert not second.done()
+        response = await second
+
+    assert response.status_code == 200
+
+
+def test_create_http_client_honours_explicit_limits():
+    """
+    🔢 Explicit limits are used as given (0 keep-alive connections included), not replaced by defaults.
+    """
+    from app.http_client import create_http_client
+
+    client = create_http_client(max_keepalive_connections=0, max_connections_per_host=3, http2=False)
+    pool = client._transport._transport._pool
+    assert pool._max_keepalive_connections == 0
+    assert client._transport._limiter.limit == 3
+
+    with pytest.raises(ValueError):
+        create_http_client(max_connections_per_host=0)
@@ -0,0 +1,89 @@
+import os
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app import settings
+from app.page_performance import cumulative_layout_shift, summarize_performance
+
+# What PERFORMANCE_SCRIPT returns for a small page (values as Chrome reports them)
+RAW = {
+    "navigation": {
+        "startTime": 0, "redirectStart": 0, "redirectEnd": 0,
+        "domainLookupStart": 2.1, "domainLookupEnd": 14.6,
+        "connectStart": 14.6, "secureConnectionStart": 30.2, "connectEnd": 61.0,
+        "requestStart": 61.3, "responseStart": 180.44, "responseEnd": 215.0,
+        "domInteractive": 402.7, "domContentLoadedEventEnd": 420.0, "loadEventEnd": 911.9,
+        "transferSize": 14000,
+    },
+    "paint": [{"name": "first-paint", "start": 450.12}, {"name": "first-contentful-paint", "start": 452.0}],
+    "lcp": {"start": 780.5, "element": "img", "url": "https://example.com/hero.webp"},
+    "layout_shifts": [{"start": 500, "value": 0.05}, {"start": 900, "value": 0.02}, {"start": 4000, "value": 0.04}],
+    "resources": [
+        {"url": "https://example.com/app.css", "initiator": "link", "duration": 80.0, "transfer_size": 9000, "decoded_size": 40000},
+        {"url": "https://example.com/app.js", "initiator": "script", "duration": 120.0, "transfer_size": 30000, "decoded_size": 90000},
+        {"url": "https://example.com/hero.webp", "initiator": "img", "duration": 300.0, "transfer_size": 60000, "decoded_size": 60000},
+        {"url": "https://fonts.gstatic.com/s/inter.woff2", "initiator": "css", "duration": 50.0, "transfer_size": 0, "decoded_size": 0},
+        {"url": "https://example.com/api/user", "initiator": "fetch", "duration": 40.0, "transfer_size": 500, "decoded_size": 300},
+        {"url": "data:image/png;base64,AAAA", "initiator": "img", "duration": 0, "transfer_size": 0, "decoded_size": 0},
+    ],
+}
+
+
+def test_summarize_performance():
+    result = summarize_performance("https://example.com/", RAW, final_url="https://example.com/", ready=True)
+
+    navigation = result.navigation
+    assert navigation.redirect == 0 and navigation.dns == 12.5
+    assert navigation.connect == 46.4 and navigation.tls == 30.8
+    assert navigation.ttfb == 180.4 and navigation.download == 34.6 and navigation.load == 911.9
+    assert result.first_paint == 450.1 and result.first_contentful_paint == 452.0
+    assert result.largest_contentful_paint == 780.5 and result.lcp_element == "img"
+    assert result.cumulative_layout_shift == 0.07
+    assert set(result.resources) == {"stylesheet", "script", "image", "font", "xhr"}
+    assert result.resources["image"].transfer_bytes == 60000 and result.resources["image"].count == 1
+    assert result.request_count == 6
+    assert result.transfer_bytes == 14000 + 9000 + 30000 + 60000 + 500
+    assert result.transfer_bytes_source == "resource_timing"
+
+    proxied = summarize_performance("https://example.com/", RAW, proxy_bytes=250000)
+    assert proxied.transfer_bytes == 250000 and proxied.transfer_bytes_source == "proxy"
+
+
+def test_cumulative_layout_shift_uses_session_windows():
+    # Gaps over 1s start a new window; a window is at most 5s long
+    assert cumulative_layout_shift([]) == 0
+    assert cumulative_layout_shift([{"start": 0, "value": 0.1}, {"start": 2000, "value": 0.15}]) == 0.15
+    steady = [{"start": t, "value": 0.01} for t in range(0, 8000, 500)]
+    assert cumulative_layout_shift(steady) == 0.11
+
+
+@pytest.mark.skipif(
+    not (os.getenv("RUN_BROWSER_TESTS") and os.path.exists(settings.CHROMEDRIVER_PATH)),
+    reason="needs Chrome, chromedriver and RUN_BROWSER_TESTS=1"
+)
+def test_measure_page_against_local_server(tmp_path, monkeypatch):
+    from app.browser_pool import BrowserPool
+    from app.selenium_runner import measure_page
+
+    monkeypatch.setattr(settings, "BROWSER_ALLOW_PRIVATE_HOSTS", True)  # the page is on 127.0.0.1
+    (tmp_path / "index.html").write_text(
+        "<html><head><title>Perf</title><link rel=stylesheet href=style.css></head>"
+        "<body><h1>Hello</h1><p>Some text to paint.</p></body></html>"
+    )
+    (tmp_path / "style.css").write_text("h1 { color: #333 }")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(SimpleHTTPRequestHandler, directory=str(tmp_path)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    pool = BrowserPool(size=1)
+    try:
+        with pool.session() as driver:
+            result = measure_page(driver, f"http://127.0.0.1:{server.server_port}/", settle_ms=200)
+    finally:
+        pool.close()
+        server.shutdown()
+
+    assert result["ready"] is True
+    assert result["navigation"]["load"] > 0 and result["first_contentful_paint"] is not None
+    assert result["resources"]["stylesheet"]["count"] == 1
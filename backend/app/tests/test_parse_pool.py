@@ -0,0 +1,38 @@
+import pytest
+
+from app.html_extract import extract_page
+from app.parse_pool import ParsePool
+
+PAGE = (
+    "<html lang=fr><head><title>Crème brûlée</title><link rel=canonical href=/c></head>"
+    "<body><h1>Dessert</h1>" + "<p>filler text</p>" * 200 + "</body></html>"
+)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("workers", [1, 0])
+async def test_pool_matches_inline_extraction(workers):
+    """
+    🧵 Pages over the inline cutoff go to worker processes (or threads with
+    workers=0) and come back with the same fields.
+    """
+    pool = ParsePool(workers=workers, inline_max_bytes=100)
+    try:
+        page = await pool.extract(PAGE.encode("latin-1"), "latin-1")
+        no_headings = await pool.extract(PAGE.encode(), "utf-8", headings=False)
+    finally:
+        pool.shutdown()
+
+    assert page.as_dict() == extract_page(PAGE).as_dict()
+    assert no_headings.headings == [] and no_headings.title == "Crème brûlée"
+    assert pool.use_threads is (workers == 0)
+
+
+@pytest.mark.asyncio
+async def test_small_pages_are_parsed_inline():
+    pool = ParsePool(workers=1, inline_max_bytes=len(PAGE) * 2)
+    page = await pool.extract(PAGE.encode())
+
+    assert page.h1 == "Dessert"
+    # Never needed a worker
+    assert pool._executor is None
@@ -0,0 +1,63 @@
+import pytest
+
+from app import settings
+from app.private_hosts import HostGuard, PrivateHostError, check_host, ensure_public_url
+from app.tests.test_resource_blocking import FakeRequest
+
+
+def test_check_host_refuses_local_names_and_non_global_addresses():
+    for host in ("localhost", "app.localhost", "127.0.0.1", "[::1]", "10.1.2.3", "169.254.169.254"):
+        with pytest.raises(PrivateHostError):
+            check_host(host)
+    with pytest.raises(PrivateHostError):
+        check_host("127.0.0.1.nip.io", ["127.0.0.1"])
+    with pytest.raises(PrivateHostError):
+        check_host("dual.example.com", ["93.184.215.14", "fd00::1"])  # one private address is enough
+
+    check_host("example.com", ["93.184.215.14", "2606:2800:21f:cb07:6820:80da:af6b:8b2c"])
+    check_host("8.8.8.8")
+    check_host("unresolvable.example")
+
+
+@pytest.mark.asyncio
+async def test_ensure_public_url_resolves_host_names(fake_dns):
+    fake_dns.update({"localtest.me": "127.0.0.1", "metadata.google.internal": "169.254.169.254", "example.com": "93.184.215.14"})
+
+    for url in ("http://localtest.me/", "http://metadata.google.internal/computeMetadata/v1/"):
+        with pytest.raises(PrivateHostError):
+            await ensure_public_url(url)
+    await ensure_public_url("https://example.com/")
+
+
+def test_host_guard_aborts_private_requests_and_passes_the_rest_on(fake_dns, monkeypatch):
+    monkeypatch.setattr(settings, "BROWSER_ALLOW_PRIVATE_HOSTS", False)
+    fake_dns.update({"www.example.com": "93.184.215.14", "intranet.corp": "10.0.0.7"})
+    seen = []
+    guard = HostGuard(then=lambda request: seen.append(request.url))
+
+    page = FakeRequest(1, "https://www.example.com/", "document")
+    redirect = FakeRequest(2, "http://intranet.corp/admin", "document")  # where the page redirected to
+    metadata = FakeRequest(3, "http://169.254.169.254/latest/meta-data/", "script")
+    image = FakeRequest(4, "https://www.example.com/logo.png", "image")
+    for request in (page, redirect, metadata, image):
+        guard.intercept(request)
+
+    assert not page.aborted and not image.aborted
+    assert redirect.aborted and metadata.aborted and guard.refused == 2
+    assert seen == [page.url, image.url]  # blocked requests never reach the blocking policy
+
+    monkeypatch.setattr(settings, "BROWSER_ALLOW_PRIVATE_HOSTS", True)
+    assert HostGuard().allowed("http://intranet.corp/admin")
+
+
+def test_host_guard_resolves_each_host_once():
+    lookups = []
+
+    def resolve(host):
+        lookups.append(host)
+        return ["93.184.215.14"]
+
+    guard = HostGuard(resolve=resolve)
+    for path in ("/", "/a.css", "/b.js"):
+        guard.intercept(FakeRequest(1, "https://www.example.com" + path))
+    assert lookups == ["www.example.com"]
@@ -0,0 +1,118 @@
+import httpx
+import pytest
+
+from app.redirects import RedirectResolver
+
+
+def make_client(routes, requests):
+    def handler(request):
+        requests.append(str(request.url))
+        return routes[str(request.url)]()
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+CHAIN = {
+    "http://example.com/a": lambda: httpx.Response(301, headers={"Location": "https://example.com/a"}),
+    "https://example.com/a": lambda: httpx.Response(301, headers={"Location": "https://www.example.com/a"}),
+    "https://www.example.com/a": lambda: httpx.Response(200, text="page"),
+}
+
+
+@pytest.mark.asyncio
+async def test_hops_are_recorded_and_cached():
+    """
+    💾 The second fetch of the same chain reuses the cached hops and only
+    requests the final page.
+    """
+    requests = []
+    resolver = RedirectResolver(cache_ttl=60)
+    async with make_client(CHAIN, requests) as client:
+        first = await resolver.fetch(client, "http://example.com/a")
+        second = await resolver.fetch(client, "http://example.com/a")
+
+    assert [(hop.status_code, hop.location) for hop in first.hops] == [
+        (301, "https://example.com/a"),
+        (301, "https://www.example.com/a"),
+    ]
+    assert all(hop.latency is not None and not hop.cached for hop in first.hops)
+    assert first.response.text == "page"
+    assert first.final_url == "https://www.example.com/a"
+
+    assert all(hop.cached for hop in second.hops)
+    assert second.final_url == "https://www.example.com/a"
+    assert requests == [
+        "http://example.com/a",
+        "https://example.com/a",
+        "https://www.example.com/a",
+        "https://www.example.com/a",
+    ]
+    assert len(second.responses) == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_disabled_with_zero_ttl():
+    requests = []
+    resolver = RedirectResolver(cache_ttl=0)
+    async with make_client(CHAIN, requests) as client:
+        await resolver.fetch(client, "http://example.com/a")
+        await resolver.fetch(client, "http://example.com/a")
+
+    assert len(requests) == 6
+
+
+@pytest.mark.asyncio
+async def test_stops_after_max_redirects():
+    """
+    🛑 An endless (non-looping) chain stops at max_redirects.
+    """
+    requests = []
+
+    class Endless(dict):
+        def __getitem__(self, url):
+            n = int(url.rsplit("/", 1)[1])
+            return lambda: httpx.Response(302, headers={"Location": f"/{n + 1}"})
+
+    resolver = RedirectResolver(max_redirects=3)
+    async with make_client(Endless(), requests) as client:
+        result = await resolver.fetch(client, "https://example.com/0")
+
+    assert result.stopped == "max_redirects"
+    assert result.response is None
+    assert len(result.hops) == 3
+    assert result.status_code == 302
+    assert result.final_url == "https://example.com/3"
+
+
+class FailingStream(httpx.AsyncByteStream):
+    """Body that times out halfway, like a stalled server."""
+
+    async def __aiter__(self):
+        yield b"<html><head>"
+        raise httpx.ReadTimeout("timed out reading the body")
+
+
+@pytest.mark.asyncio
+async def test_failed_body_reads_free_the_per_host_slot():
+    """
+    🔓 A body read that fails closes the response, so its per-host slot is
+    freed and later requests to the host don't hang.
+    """
+    import asyncio
+
+    from app.http_client import HostLimitedTransport
+
+    def handler(request):
+        if request.url.path == "/broken":
+            return httpx.Response(200, stream=FailingStream())
+        return httpx.Response(200, text="page")
+
+    transport = HostLimitedTransport(httpx.MockTransport(handler), max_per_host=2)
+    resolver = RedirectResolver(cache_ttl=0)
+    async with httpx.AsyncClient(transport=transport) as client:
+        for _ in range(2):
+            with pytest.raises(httpx.ReadTimeout):
+                await resolver.fetch(client, "https://example.com/broken")
+        result = await asyncio.wait_for(resolver.fetch(client, "https://example.com/ok"), 2)
+
+    assert result.response.text == "page"
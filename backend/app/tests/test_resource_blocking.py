@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+from app.resource_blocking import TYPICAL_BYTES, BlockPolicy, resource_type
+
+
+class FakeRequest:
+    def __init__(self, id, url, dest=None, response=None):
+        self.id = id
+        self.url = url
+        self.headers = {"Sec-Fetch-Dest": dest} if dest else {}
+        self.response = response
+        self.aborted = False
+
+    def abort(self):
+        self.aborted = True
+        self.response = SimpleNamespace(status_code=403, headers={}, body=b"")
+
+
+def test_resource_type_from_fetch_dest_then_extension():
+    assert resource_type("https://example.com/a", {"Sec-Fetch-Dest": "image"}) == "image"
+    assert resource_type("https://example.com/v.mp4", {"Sec-Fetch-Dest": "video"}) == "media"
+    assert resource_type("https://example.com/f.woff2?v=3", {}) == "font"
+    assert resource_type("https://example.com/app.js", {}) == "script"
+    assert resource_type("https://example.com/v1.2/page", {}) == "other"
+
+
+def test_policy_blocks_by_type_and_domain_lists():
+    policy = BlockPolicy(block_types={"image", "font"}, deny_domains=["doubleclick.net"], allow_domains=[])
+    site = "example.com"
+
+    assert policy.decide("https://example.com/", {"Sec-Fetch-Dest": "document"}, site) is None
+    assert policy.decide("https://example.com/logo.png", {}, site) == "type:image"
+    assert policy.decide("https://example.com/app.js", {}, site) is None
+    assert policy.decide("https://ad.doubleclick.net/pixel", {}, site) == "domain"
+    assert policy.decide("https://notdoubleclick.net/x.js", {}, site) is None
+
+    allow_listed = BlockPolicy(block_types=(), deny_domains=(), allow_domains=["cdn.jsdelivr.net"])
+    assert allow_listed.decide("https://static.example.com/app.js", {}, site) is None
+    assert allow_listed.decide("https://cdn.jsdelivr.net/lib.js", {}, site) is None
+    assert allow_listed.decide("https://widgets.other.com/w.js", {}, site) == "domain"
+
+
+def test_recorder_aborts_and_counts_savings():
+    policy = BlockPolicy(block_types={"image"}, deny_domains=["hotjar.com"], allow_domains=())
+    recorder = policy.recorder("https://www.example.com/page")
+
+    page = FakeRequest(1, "https://www.example.com/page", "document",
+                       SimpleNamespace(status_code=200, headers={"Content-Length": "1200"}, body=b""))
+    script = FakeRequest(2, "https://www.example.com/app.js", "script",
+                         SimpleNamespace(status_code=200, headers={}, body=b"x" * 300))
+    image = FakeRequest(3, "https://www.example.com/hero.jpg", "image")
+    tracker = FakeRequest(4, "https://static.hotjar.com/c.js", "script")
+    for request in (page, script, image, tracker):
+        recorder.intercept(request)
+
+    assert not page.aborted and not script.aborted and image.aborted and tracker.aborted
+    stats = recorder.finish([page, script, image, tracker])
+    assert stats.requests_allowed == 2 and stats.requests_blocked == 2
+    assert stats.blocked_by_type == {"image": 1, "script": 1} and stats.blocked_by_domain_rule == 1
+    assert stats.bytes_saved_estimate == TYPICAL_BYTES["image"] + TYPICAL_BYTES["script"]
+    assert stats.bytes_loaded == 1500
@@ -0,0 +1,122 @@
+import time
+
+import httpx
+import pytest
+
+from app.robots import RobotsCache, RobotsMatcher, RobotsTxt, url_path
+
+ROBOTS = """
+# comment line
+Sitemap: https://example.com/sitemap.xml
+
+User-agent: *
+Disallow: /admin
+Allow: /admin/public
+Disallow: /*.pdf$
+Disallow: /search?
+Disallow:
+
+User-agent: Googlebot
+User-agent: Bingbot
+Disallow: /no-bots/   # trailing comment
+
+User-agent: googlebot
+Allow: /no-bots/ok
+"""
+
+
+def test_parse_groups_and_sitemaps():
+    robots = RobotsTxt.parse("https://example.com/robots.txt", ROBOTS)
+
+    assert robots.sitemaps == ["https://example.com/sitemap.xml"]
+    assert [agents for agents, _ in robots.groups] == [["*"], ["googlebot", "bingbot"], ["googlebot"]]
+
+
+@pytest.mark.parametrize("url, allowed", [
+    ("https://example.com/", True),
+    ("https://example.com/admin", False),
+    ("https://example.com/administrator", False),
+    ("https://example.com/admin/public/page", True),
+    ("https://example.com/files/report.pdf", False),
+    ("https://example.com/files/report.pdf?download=1", True),
+    ("https://example.com/search?q=shoes", False),
+    ("https://example.com/search", True),
+])
+def test_default_group_rules(url, allowed):
+    robots = RobotsTxt.parse("https://example.com/robots.txt", ROBOTS)
+    assert robots.allowed(url, "*") is allowed
+
+
+def test_agent_groups_are_merged_and_replace_the_default_group():
+    robots = RobotsTxt.parse("https://example.com/robots.txt", ROBOTS)
+
+    assert robots.allowed("https://example.com/no-bots/x", "Googlebot/2.1") is False
+    assert robots.allowed("https://example.com/no-bots/ok", "Googlebot/2.1") is True
+    # The '*' rules don't apply to an agent with its own group
+    assert robots.allowed("https://example.com/admin", "Googlebot") is True
+    assert robots.allowed("https://example.com/admin", "SomeOtherBot") is False
+
+
+def test_longest_rule_wins_and_allow_wins_ties():
+    matcher = RobotsMatcher([(False, "/page"), (True, "/page"), (False, "/p")])
+    assert matcher.decide("/page1").allow is True
+    assert matcher.decide("/p1").pattern == "/p"
+    assert matcher.decide("/other") is None
+
+
+def test_paths_are_compared_percent_encoded():
+    matcher = RobotsMatcher([(False, "/café")])
+    assert url_path("https://example.com/caf%c3%a9/menu") == "/caf%C3%A9/menu"
+    assert matcher.allowed(url_path("https://example.com/caf%c3%a9/menu")) is False
+    assert matcher.allowed(url_path("https://example.com/café")) is False
+
+
+def test_unreachable_disallows_everything():
+    robots = RobotsTxt("https://example.com/robots.txt", "unreachable")
+    assert robots.allowed("https://example.com/anything") is False
+    assert RobotsTxt("https://example.com/robots.txt", "unavailable").allowed("https://example.com/x") is True
+
+
+def test_matching_is_fast():
+    """
+    ⚡ A few hundred rules, still only microseconds per URL.
+    """
+    rules = [(False, f"/section-{i}/") for i in range(200)] + [(False, f"/*/tmp-{i}$") for i in range(50)]
+    matcher = RobotsMatcher(rules)
+    paths = [url_path(f"https://example.com/products/{i}?page=2") for i in range(10_000)]
+
+    started = time.perf_counter()
+    for path in paths:
+        matcher.allowed(path)
+    per_url = (time.perf_counter() - started) / len(paths)
+
+    assert per_url < 200e-6
+
+
+@pytest.mark.asyncio
+async def test_cache_shares_fetches_per_origin():
+    requests = []
+
+    def handler(request):
+        requests.append(str(request.url))
+        if request.url.host == "down.example.com":
+            return httpx.Response(500)
+        if request.url.host == "missing.example.com":
+            return httpx.Response(404)
+        return httpx.Response(200, text="User-agent: *\nDisallow: /x\n")
+
+    cache = RobotsCache(ttl=60, error_ttl=0)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        first = await cache.get(client, "https://example.com/a")
+        second = await cache.get(client, "https://EXAMPLE.com/b?c")
+        down = await cache.get(client, "https://down.example.com/")
+        await cache.get(client, "https://down.example.com/")
+        missing = await cache.get(client, "https://missing.example.com/")
+
+    assert first is second
+    assert first.status == "ok" and not first.allowed("https://example.com/x1")
+    assert down.status == "unreachable" and down.http_status == 500
+    assert missing.status == "unavailable" and missing.allowed("https://missing.example.com/x")
+    # error_ttl=0: unreachable files are not cached
+    assert requests.count("https://down.example.com/robots.txt") == 2
+    assert requests.count("https://example.com/robots.txt") == 1
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from app.seo_rules import RULE_KINDS, RuleSet, rule_kind
+
+PAGE = dict(
+    title="A title that is long enough to pass the length check",
+    description=None,
+    canonical="https://example.com/other",
+    final_url="https://example.com/page",
+    robots_meta="NOINDEX, follow",
+    open_graph={"og:title": "x"},
+    h1="Heading",
+    all_h1=["Heading", "Second"],
+)
+
+
+def test_default_rules():
+    checks = RuleSet.from_config(None).evaluate(PAGE)
+
+    assert {name: check.passed for name, check in checks.items()} == {
+        "title": True,
+        "description": False,
+        "h1": True,
+        "all_h1": False,
+        "canonical": False,
+        "robots_meta_noindex": False,
+        "open_graph": False,
+    }
+    assert checks["title"].message == "Length: 52 characters" and checks["title"].severity == "error"
+    assert checks["description"].message == "Missing meta description"
+    assert checks["all_h1"].message == "2 H1 tags found"
+    assert checks["open_graph"].message == "Missing: og:description, og:image"
+
+
+def test_rules_for_fields_not_collected_are_skipped():
+    values = {key: value for key, value in PAGE.items() if key not in ("h1", "all_h1")}
+    checks = RuleSet.from_config(None).evaluate(dict(values, robots_txt_allowed=False, robots_txt_rule="/drafts/"))
+
+    assert "h1" not in checks and "all_h1" not in checks
+    assert checks["robots_txt"].message == "Blocked by robots.txt: Disallow: /drafts/"
+
+
+def test_config_file_overrides_disables_and_adds_rules(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps([
+        {"id": "title", "max": 40},
+        {"id": "open_graph", "enabled": False},
+        {"id": "short_h1", "kind": "length", "field": "h1", "max": 5, "severity": "info",
+         "fail_message": "H1 is {length} characters"},
+    ]))
+
+    checks = RuleSet.from_config(str(path)).evaluate(PAGE)
+
+    assert checks["title"].passed is False
+    assert "open_graph" not in checks
+    assert checks["short_h1"].passed is False and checks["short_h1"].message == "H1 is 7 characters"
+
+
+def test_custom_kinds_and_batches():
+    @rule_kind("max_words")
+    def max_words(config):
+        return lambda value, values: (len(value.split()) <= config.max, {"words": len(value.split())})
+
+    try:
+        rules = RuleSet([{"id": "title_words", "kind": "max_words", "field": "title", "max": 5,
+                          "fail_message": "{words} words"}])
+        results = rules.evaluate_many([{"title": "one two"}, {"title": "a b c d e f"}, {}])
+    finally:
+        del RULE_KINDS["max_words"]
+
+    assert [r["title_words"].passed for r in results[:2]] == [True, False]
+    assert results[1]["title_words"].message == "6 words"
+    assert results[2] == {}
+
+
+def test_unknown_kind_fails_at_compile_time():
+    with pytest.raises(ValueError, match="Unknown rule kind"):
+        RuleSet([{"id": "x", "kind": "nope", "field": "title"}])
@@ -0,0 +1,67 @@
+import httpx
+import pytest
+
+from app.sitemap_cache import SitemapDiskCache
+from app.sitemap_stream import ParsedSitemap
+
+
+def cache_dir(tmp_path):
+    path = tmp_path / "cache"
+    path.mkdir()
+    return path
+
+
+def store(cache, url, locs, etag='"v1"'):
+    writer = cache.writer(url, httpx.Response(200, headers={"ETag": etag}))
+    for loc in locs:
+        writer.add(loc)
+    parsed = ParsedSitemap(url, 200)
+    parsed.kind = "urlset"
+    return writer.finish(parsed)
+
+
+def test_evicts_least_recently_used_over_max_bytes(tmp_path):
+    """
+    🧹 Total stored size stays under max_bytes, oldest entries go first.
+    """
+    directory = cache_dir(tmp_path)
+    cache = SitemapDiskCache(directory=str(directory), max_bytes=10**9)
+    store(cache, "https://a.com/sitemap.xml", [f"https://a.com/{i}" for i in range(200)])
+    size = cache.total_bytes
+    cache.max_bytes = size * 2 + size // 2
+
+    store(cache, "https://b.com/sitemap.xml", [f"https://a.com/{i}" for i in range(200)])
+    store(cache, "https://c.com/sitemap.xml", [f"https://a.com/{i}" for i in range(200)])
+
+    assert len(cache) == 2
+    assert cache.conditional_headers("https://a.com/sitemap.xml") == {}
+    assert cache.total_bytes <= cache.max_bytes
+    assert len(list(directory.iterdir())) == 4
+
+
+@pytest.mark.asyncio
+async def test_index_survives_restart(tmp_path):
+    directory = cache_dir(tmp_path)
+    cache = SitemapDiskCache(directory=str(directory))
+    store(cache, "https://a.com/sitemap.xml", ["https://a.com/1", "https://a.com/ odd"])
+
+    reopened = SitemapDiskCache(directory=str(directory))
+    parsed = await reopened.load("https://a.com/sitemap.xml")
+
+    assert reopened.conditional_headers("https://a.com/sitemap.xml") == {"If-None-Match": '"v1"'}
+    assert parsed.kind == "urlset"
+    assert parsed.locs == ["https://a.com/1", "https://a.com/ odd"]
+
+
+def test_failed_parse_and_uncacheable_responses_are_not_stored(tmp_path):
+    directory = cache_dir(tmp_path)
+    cache = SitemapDiskCache(directory=str(directory))
+    writer = cache.writer("https://a.com/sitemap.xml", httpx.Response(200, headers={"ETag": '"v1"'}))
+    writer.add("https://a.com/1")
+    parsed = ParsedSitemap("https://a.com/sitemap.xml", 200)
+    parsed.error = ValueError("broken")
+    writer.finish(parsed)
+
+    assert cache.writer("https://a.com/sitemap.xml", httpx.Response(200)) is None
+    assert len(cache) == 0
+    assert list(directory.iterdir()) == []
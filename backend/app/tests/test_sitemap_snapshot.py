@@ -0,0 +1,47 @@
+import random
+
+from app.sitemap_snapshot import SnapshotStore, diff_snapshots
+
+
+def build(store, entries):
+    builder = store.builder()
+    for loc, lastmod in entries:
+        builder.add(loc, lastmod)
+    return builder.finish()
+
+
+def test_diff_matches_set_arithmetic(tmp_path):
+    """
+    🧮 The merge over sorted hashes gives the same answer as comparing dicts.
+    """
+    store = SnapshotStore(directory=str(tmp_path))
+    rng = random.Random(1)
+    old = {f"https://example.com/{i}": f"2024-01-{rng.randint(1, 9):02d}" for i in range(5000)}
+    new = {url: lastmod for url, lastmod in old.items() if rng.random() > 0.1}
+    new.update({f"https://example.com/new/{i}": None for i in range(300)})
+    for url in rng.sample(sorted(new), 200):
+        new[url] = "2025-01-01"
+
+    previous = build(store, old.items())
+    store.save("https://example.com/sitemap.xml", previous)
+    previous = store.load("https://example.com/sitemap.xml")
+    # Repeated URLs keep their first lastmod
+    current = build(store, list(new.items()) + [(url, "2030-01-01") for url in list(new)[:50]])
+
+    diff = diff_snapshots(previous, current)
+
+    assert {loc for loc, _ in current.read(diff.added)} == new.keys() - old.keys()
+    assert {loc for loc, _ in previous.read(diff.removed)} == old.keys() - new.keys()
+    assert {loc for loc, _ in current.read(diff.changed_new)} == {
+        url for url in new.keys() & old.keys() if new[url] != old[url]
+    }
+    assert len(current) == len(new)
+
+
+def test_read_limit_and_skipped_entries(tmp_path):
+    store = SnapshotStore(directory=str(tmp_path))
+    snapshot = build(store, [("https://example.com/a", None), ("https://exa\tmple.com/", None), ("https://example.com/b", "2024")])
+
+    assert len(snapshot) == 2
+    assert snapshot.read(range(len(snapshot)), limit=1) == [("https://example.com/a", None)]
+    assert sorted(snapshot.read(range(len(snapshot)))) == [("https://example.com/a", None), ("https://example.com/b", "2024")]
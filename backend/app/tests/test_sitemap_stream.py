@@ -0,0 +1,95 @@
+import gzip
+import tracemalloc
+from datetime import datetime, timezone
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from app.sitemap_stream import SitemapDecompressionError, SitemapParser, UnsupportedSitemapError, parse_w3c_datetime
+
+
+def urlset(n: int) -> bytes:
+    entries = "".join(f"<url><loc>https://example.com/page{i}</loc></url>" for i in range(n))
+    return f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>'.encode()
+
+
+def parse(data: bytes, chunk_size: int):
+    parser = SitemapParser()
+    locs = []
+    for i in range(0, len(data), chunk_size):
+        locs.extend(parser.feed(data[i:i + chunk_size]))
+    locs.extend(parser.close())
+    return parser, locs
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_plain_and_gzip_give_same_locs_for_any_chunking(chunk_size):
+    """
+    🧩 Chunk boundaries (even inside the gzip header) don't change the result.
+    """
+    data = urlset(50)
+    _, plain = parse(data, chunk_size)
+    parser, gz = parse(gzip.compress(data), chunk_size)
+
+    assert plain == gz == [f"https://example.com/page{i}" for i in range(50)]
+    assert parser.kind == "urlset"
+    assert parser.bytes_parsed == len(data)
+
+
+def test_multi_member_gzip():
+    data = urlset(3)
+    _, locs = parse(gzip.compress(data[:40]) + gzip.compress(data[40:]), 16)
+    assert len(locs) == 3
+
+
+def test_sitemapindex_yields_nested_files():
+    data = b"""<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+        <sitemap><loc> https://example.com/s1.xml </loc></sitemap>
+        <sitemap><loc>https://example.com/s2.xml.gz</loc></sitemap>
+    </sitemapindex>"""
+    parser, locs = parse(data, 10)
+    assert parser.kind == "sitemapindex"
+    assert locs == ["https://example.com/s1.xml", "https://example.com/s2.xml.gz"]
+
+
+def test_errors():
+    with pytest.raises(SitemapDecompressionError):
+        parse(gzip.compress(urlset(10))[:-20], 64)
+    with pytest.raises(ET.ParseError):
+        parse(b"<urlset><url>", 64)
+    with pytest.raises(UnsupportedSitemapError):
+        parse(b"<rss><channel/></rss>", 64)
+
+
+def test_memory_stays_flat_for_large_sitemaps():
+    """
+    📉 Peak memory is bounded by the chunk size, not the number of entries.
+    """
+    def peak_for(n):
+        data = gzip.compress(urlset(n))
+        parser = SitemapParser()
+        tracemalloc.start()
+        count = 0
+        for i in range(0, len(data), 64 * 1024):
+            count += len(parser.feed(data[i:i + 64 * 1024]))
+        count += len(parser.close())
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert count == n
+        return peak
+
+    small, large = peak_for(30_000), peak_for(120_000)
+    assert large < small * 1.5
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024", datetime(2024, 1, 1, tzinfo=timezone.utc)),
+    ("2024-03", datetime(2024, 3, 1, tzinfo=timezone.utc)),
+    ("2024-03-05", datetime(2024, 3, 5, tzinfo=timezone.utc)),
+    ("2024-03-05T10:30:00Z", datetime(2024, 3, 5, 10, 30, tzinfo=timezone.utc)),
+    ("2024-03-05T12:30:00.5+02:00", datetime(2024, 3, 5, 10, 30, 0, 500000, tzinfo=timezone.utc)),
+    ("yesterday", None),
+    ("2024-13-01", None),
+])
+def test_parse_w3c_datetime(value, expected):
+    assert parse_w3c_datetime(value) == expected
@@ -0,0 +1,56 @@
+from app.sitemap_validation import BloomFilter, SitemapValidator
+
+
+def test_validator_flags_each_problem():
+    validator = SitemapValidator("https://example.com/sitemap.xml")
+    validator.add("https://example.com/ok", "2024-05-01T10:00:00+02:00")
+    validator.add("https://example.com/ok", "2024")
+    validator.add("/relative", None)
+    validator.add("https://other.com/page", None)
+    validator.add("https://example.com/with space", None)
+    validator.add("https://example.com/caf%C3%A9", None)
+    validator.add("https://example.com/bad%zz", None)
+    validator.add("https://example.com/date", "01/05/2024")
+    validator.add("https://example.com/date2", "2024-02-30")
+
+    result = validator.result(uncompressed_bytes=1000)
+    issues = {issue.code: issue for issue in result.issues}
+
+    assert result.valid is False
+    assert result.entry_count == 9
+    assert issues["duplicate_loc"].examples == ["https://example.com/ok"]
+    assert issues["not_absolute"].examples == ["/relative"]
+    assert issues["foreign_host"].examples == ["https://other.com/page"]
+    assert issues["bad_escaping"].examples == ["https://example.com/with space", "https://example.com/bad%zz"]
+    assert issues["invalid_lastmod"].count == 2
+    assert "too_many_urls" not in issues
+
+
+def test_validator_limits():
+    validator = SitemapValidator("https://example.com/sitemap.xml", max_examples=2)
+    for i in range(50_001):
+        validator.add(f"https://example.com/{i}")
+
+    result = validator.result(uncompressed_bytes=60 * 1024 * 1024)
+    issues = {issue.code: issue for issue in result.issues}
+
+    assert set(issues) == {"too_many_urls", "file_too_large"}
+    assert issues["too_many_urls"].examples == ["50001 entries"]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=10_000)
+    assert not any(bloom.add(f"https://example.com/{i}") for i in range(10_000))
+    assert all(bloom.add(f"https://example.com/{i}") for i in range(10_000))
+    assert len(bloom._bits) < 20_000
+
+
+def test_validator_flags_malformed_urls_instead_of_raising():
+    validator = SitemapValidator("https://example.com/sitemap.xml")
+    validator.add("https://[bad/x", None)
+    validator.add("https://example.com/ok", None)
+
+    issues = {issue.code: issue for issue in validator.result(uncompressed_bytes=100).issues}
+
+    assert issues["malformed_url"].examples == ["https://[bad/x"]
+    assert validator.entry_count == 2 and "not_absolute" not in issues
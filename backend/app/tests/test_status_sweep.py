@@ -0,0 +1,65 @@
+import time
+
+import httpx
+import pytest
+
+from app.status_sweep import StatusSweep, latency_stats
+
+
+def test_latency_stats_nearest_rank():
+    stats = latency_stats([i / 100 for i in range(1, 101)])
+    assert (stats.p50, stats.p90, stats.p99, stats.max) == (0.5, 0.9, 0.99, 1.0)
+    assert stats.mean == 0.505
+    assert latency_stats([]).p50 is None
+
+
+@pytest.mark.asyncio
+async def test_sweep_rate_limits_each_host_separately():
+    """
+    🚦 Each host gets at most `host_rate` requests/s; hosts are throttled in
+    parallel, not one after the other.
+    """
+    sent = {}
+    urls = [f"https://a.example.com/{i}" for i in range(4)] + [f"https://b.example.com/{i}" for i in range(4)]
+    body = "<urlset>" + "".join(f"<url><loc>{u}</loc></url>" for u in urls) + "</urlset>"
+
+    def handler(request):
+        if request.url.path == "/sitemap.xml":
+            return httpx.Response(200, text=body)
+        sent.setdefault(request.url.host, []).append(time.monotonic())
+        return httpx.Response(200)
+
+    started = time.monotonic()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        sweep = await StatusSweep(client, concurrency=8, host_rate=20, host_burst=1).run("https://example.com/sitemap.xml")
+    elapsed = time.monotonic() - started
+
+    assert sweep.counts["2xx"] == 8
+    for times in sent.values():
+        # 4 requests, 1 token up front and 3 more at 20/s
+        assert times[-1] - times[0] >= 0.14
+    assert elapsed < 0.3
+
+
+@pytest.mark.asyncio
+async def test_sweep_records_malformed_urls_and_keeps_going():
+    """
+    🧱 A <loc> that can't be parsed is an "error" result; the worker goes on
+    with the URLs queued after it.
+    """
+    body = (
+        "<urlset><url><loc>https://[bad</loc></url>"
+        "<url><loc>https://example.com/a</loc></url><url><loc>https://example.com/b</loc></url></urlset>"
+    )
+
+    def handler(request):
+        if request.url.path == "/sitemap.xml":
+            return httpx.Response(200, text=body)
+        return httpx.Response(200)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        sweep = await StatusSweep(client, concurrency=1).run("https://example.com/sitemap.xml")
+
+    assert sweep.counts["2xx"] == 2 and sweep.counts["error"] == 1
+    assert sweep.listed["error"][0].url == "https://[bad"
+    assert sweep.listed["error"][0].error.startswith("Malformed URL")
@@ -0,0 +1,62 @@
+import httpcore
+import httpx
+import pytest
+
+from app.timing import RequestTimer, record_dns
+
+
+def mock_client(*responses: bytes) -> httpx.AsyncClient:
+    """
+    Client whose connections read canned bytes, so httpcore emits real trace events.
+    """
+    transport = httpx.AsyncHTTPTransport()
+    transport._pool._network_backend = httpcore.AsyncMockBackend(list(responses))
+    return httpx.AsyncClient(transport=transport, follow_redirects=True)
+
+
+@pytest.mark.asyncio
+async def test_timer_splits_redirect_hops_and_phases():
+    """
+    ⏱ Each redirect hop gets its own phases; the reused connection has no connect time.
+    """
+    client = mock_client(
+        b"HTTP/1.1 301 Moved Permanently\r\nLocation: /final\r\nContent-Length: 0\r\n\r\n",
+        b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok",
+    )
+    timer = RequestTimer()
+    with timer:
+        record_dns(0.25)  # lookup made before the request, e.g. by the DNS check
+        response = await client.get("http://example.com/start", extensions={"trace": timer.trace})
+    await client.aclose()
+
+    timings = timer.summary([*response.history, response])
+
+    assert [hop.status_code for hop in timings.hops] == [301, 200]
+    assert [hop.url for hop in timings.hops] == ["http://example.com/start", "http://example.com/final"]
+    first, second = timings.hops
+    assert first.dns == 0.25
+    assert first.connect is not None
+    assert second.dns is None and second.connect is None
+    for hop in timings.hops:
+        assert hop.send is not None and hop.ttfb is not None and hop.download is not None
+        assert hop.total >= hop.ttfb
+    assert timings.dns == 0.25
+    assert timings.tls is None
+
+
+def test_summary_without_request_keeps_dns_only():
+    """
+    🛜 When the DNS check fails there are no hops, only the lookup time.
+    """
+    timer = RequestTimer()
+    with timer:
+        record_dns(0.1)
+
+    timings = timer.summary()
+    assert timings.hops == []
+    assert timings.dns == 0.1
+    assert timings.total is None
+
+
+def test_record_dns_outside_timer_is_ignored():
+    record_dns(1.0)  # must not raise
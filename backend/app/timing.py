@@ -0,0 +1,152 @@
+import time
+from contextvars import ContextVar
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+_current_timer: ContextVar[Optional["RequestTimer"]] = ContextVar("request_timer", default=None)
+
+PHASES = ("dns", "connect", "tls", "send", "ttfb", "download")
+
+
+class PhaseTimings(BaseModel):
+    """
+    Time spent in each phase, in seconds. `None` means the phase did not
+    happen (e.g. no connect/tls when a pooled connection was reused).
+    """
+    dns: Optional[float] = Field(None, description="Name resolution.")
+    connect: Optional[float] = Field(None, description="TCP connect, excluding DNS.")
+    tls: Optional[float] = Field(None, description="TLS handshake.")
+    send: Optional[float] = Field(None, description="Sending request headers and body.")
+    ttfb: Optional[float] = Field(None, description="Waiting for the response headers after the request was sent.")
+    download: Optional[float] = Field(None, description="Reading the response body.")
+    total: Optional[float] = Field(None, description="Wall time of the whole request.")
+
+
+class HopTimings(PhaseTimings):
+    url: Optional[str] = None
+    status_code: Optional[int] = None
+
+
+class RequestTimings(PhaseTimings):
+    """
+    Phases summed over all hops, plus the breakdown of every redirect hop.
+    """
+    hops: List[HopTimings] = Field(default_factory=list)
+
+
+def _add(current: Optional[float], value: float) -> float:
+    return value if current is None else current + value
+
+
+def record_dns(seconds: float):
+    """
+    Called by the resolver so lookups are attributed to the active timer, if any.
+    """
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.add_dns(seconds)
+
+
+class RequestTimer:
+    """
+    Collects per-phase timings from httpcore trace events.
+
+    Use as a context manager around the request and pass `timer.trace` as the
+    `trace` request extension. A new hop starts whenever a request begins on a
+    connection after the previous hop already got its response, so redirects
+    followed by httpx are split into separate hops.
+    """
+
+    def __init__(self):
+        self.hops: List[HopTimings] = []
+        self._hop_started_at = None
+        self._marks = {}
+        self._pending_dns = 0.0
+        self._dns_in_connect = 0.0
+        self._has_response = False
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_timer.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _current_timer.reset(self._token)
+
+    def add_dns(self, seconds: float):
+        if "connect_tcp" in self._marks and self.hops:
+            self.hops[-1].dns = _add(self.hops[-1].dns, seconds)
+            self._dns_in_connect += seconds
+        else:
+            # Lookup done before the request (e.g. the DNS check), goes to the next hop
+            self._pending_dns += seconds
+
+    def _start_hop(self, now: float):
+        hop = HopTimings()
+        if self._pending_dns:
+            hop.dns = self._pending_dns
+        self._hop_started_at = now - self._pending_dns
+        self._pending_dns = 0.0
+        self._has_response = False
+        self.hops.append(hop)
+
+    async def trace(self, event_name: str, info: dict):
+        name, _, stage = event_name.rpartition(".")
+        phase = name.split(".", 1)[-1]
+        now = time.perf_counter()
+
+        if stage == "started":
+            if phase in ("connect_tcp", "send_connection_init", "send_request_headers"):
+                if not self.hops or self._has_response:
+                    self._start_hop(now)
+            if phase == "connect_tcp":
+                self._dns_in_connect = 0.0
+            self._marks[phase] = now
+            return
+
+        started = self._marks.pop(phase, None)
+        if started is None or not self.hops:
+            return
+        hop = self.hops[-1]
+        elapsed = now - started
+
+        if phase == "connect_tcp":
+            hop.connect = _add(hop.connect, max(elapsed - self._dns_in_connect, 0.0))
+        elif phase == "start_tls":
+            hop.tls = _add(hop.tls, elapsed)
+        elif phase in ("send_request_headers", "send_request_body"):
+            hop.send = _add(hop.send, elapsed)
+        elif phase == "receive_response_headers":
+            hop.ttfb = _add(hop.ttfb, elapsed)
+            self._has_response = True
+        elif phase == "receive_response_body":
+            hop.download = _add(hop.download, elapsed)
+        if phase in ("receive_response_body", "response_closed") or stage == "failed":
+            hop.total = now - self._hop_started_at
+
+    def summary(self, responses=None) -> RequestTimings:
+        """
+        Builds the response model. `responses` (history + final response)
+        fills in url and status code for each hop.
+        """
+        if responses is not None and len(responses) == len(self.hops):
+            for hop, response in zip(self.hops, responses):
+                hop.url = str(response.url)
+                hop.status_code = response.status_code
+
+        hops = [hop.model_copy() for hop in self.hops]
+        for hop in hops:
+            for field in PHASES + ("total",):
+                value = getattr(hop, field)
+                if value is not None:
+                    setattr(hop, field, round(value, 4))
+
+        totals = {}
+        for field in PHASES + ("total",):
+            values = [getattr(hop, field) for hop in hops if getattr(hop, field) is not None]
+            totals[field] = round(sum(values), 4) if values else None
+        if self._pending_dns:
+            totals["dns"] = round((totals["dns"] or 0.0) + self._pending_dns, 4)
+
+        return RequestTimings(hops=hops, **totals)
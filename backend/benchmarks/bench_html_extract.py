@@ -0,0 +1,84 @@
+"""
+Benchmark: check_url HTML extraction, BeautifulSoup tree vs single pass.
+
+Times the old BeautifulSoup extraction (one tree search per field), the
+single-pass html.parser extractor and, when lxml is installed, the lxml
+backend, over a corpus of saved pages. Also checks that the single pass
+returns exactly what the BeautifulSoup extraction returns.
+
+The default corpus is benchmarks/pages, filled by benchmarks.fetch_pages
+from a fixed list of real pages. Run from the backend directory:
+
+    python -m benchmarks.fetch_pages
+    python -m benchmarks.bench_html_extract --repeat 5
+
+--corpus points at another directory of .html files; --synthetic uses a
+generated page of --size KB instead (no network needed, but far more
+regular markup than real pages).
+"""
+import argparse
+import pathlib
+import sys
+import time
+
+from app.html_extract import _lxml_available, extract_lxml, extract_single_pass, extract_soup
+from benchmarks.fetch_pages import CORPUS_DIR
+
+
+def synthetic_page(size_kb):
+    head = (
+        '<!DOCTYPE html><html lang="en"><head><title>Synthetic page</title>'
+        '<meta name="description" content="A large page"><link rel="canonical" href="https://example.com/">'
+        '<link rel="alternate" hreflang="de" href="https://example.com/de/"><link rel="icon" href="/favicon.ico">'
+        '<meta property="og:title" content="Synthetic"><meta name="twitter:card" content="summary">'
+        '<script type="application/ld+json">{"@type": "WebPage"}</script></head><body>'
+    )
+    block = (
+        '<div class="card"><h2>Section &amp; title</h2><p>Some <a href="/x">linked</a> text with '
+        '<b>markup</b> and an image <img src="/i.png" alt="x"><br>more text.</p>'
+        '<ul><li>one</li><li>two</li><li>three</li></ul></div>\n'
+    )
+    body = block * max(1, size_kb * 1024 // len(block))
+    return head + "<h1>Synthetic</h1>" + body + "</body></html>"
+
+
+def load_corpus(directory):
+    return [path.read_text(encoding="utf-8", errors="replace") for path in sorted(pathlib.Path(directory).glob("*.html"))]
+
+
+def main(pages, repeat):
+    total_kb = sum(len(page) for page in pages) / 1024
+    print(f"{len(pages)} pages, {total_kb:.0f} KB, {repeat} rounds")
+
+    mismatches = sum(extract_single_pass(page).as_dict() != extract_soup(page).as_dict() for page in pages)
+    print(f"single pass vs BeautifulSoup: {mismatches} mismatching pages")
+
+    extractors = [("BeautifulSoup tree", extract_soup), ("single pass", extract_single_pass)]
+    if _lxml_available():
+        extractors.append(("lxml", extract_lxml))
+    else:
+        print("lxml not installed, skipping it")
+
+    for name, extract in extractors:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for page in pages:
+                extract(page)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<20} {elapsed / repeat * 1000:9.1f} ms/round  ({total_kb * repeat / elapsed:8.0f} KB/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=str(CORPUS_DIR), help="directory of .html files")
+    parser.add_argument("--synthetic", action="store_true", help="use a synthetic page instead of the corpus")
+    parser.add_argument("--size", type=int, default=500, help="synthetic page size in KB")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    if args.synthetic:
+        pages = [synthetic_page(args.size)]
+    else:
+        pages = load_corpus(args.corpus)
+        if not pages:
+            sys.exit(f"No .html files in {args.corpus}; run python -m benchmarks.fetch_pages first (or pass --synthetic)")
+    main(pages, args.repeat)
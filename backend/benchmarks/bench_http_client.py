@@ -0,0 +1,87 @@
+"""
+Benchmark: per-request httpx.AsyncClient vs the shared pooled client.
+
+Starts a local keep-alive HTTP server and fires the same number of GETs
+through both strategies, printing requests per second for each.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_http_client --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from app.http_client import create_http_client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        body = b"<html><head><title>ok</title></head></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def run_per_request(url, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            async with httpx.AsyncClient(timeout=5.0, follow_redirects=True) as client:
+                await client.get(url)
+
+    await asyncio.gather(*(one() for _ in range(total)))
+
+
+async def run_shared(url, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    client = create_http_client(max_connections_per_host=concurrency)
+
+    async def one():
+        async with semaphore:
+            await client.get(url)
+
+    try:
+        await asyncio.gather(*(one() for _ in range(total)))
+    finally:
+        await client.aclose()
+
+
+async def main(total, concurrency):
+    server = start_server()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    try:
+        for name, runner in (("per-request client", run_per_request), ("shared pooled client", run_shared)):
+            start = time.perf_counter()
+            await runner(url, total, concurrency)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<22} {total / elapsed:8.0f} req/s  ({elapsed:.2f}s for {total} requests)")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
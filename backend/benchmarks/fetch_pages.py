@@ -0,0 +1,68 @@
+"""
+Fetches the pages of the HTML extraction benchmark corpus.
+
+A fixed list of public pages of the kinds check_url sees: news and
+e-commerce pages heavy with scripts and inline JSON, documentation,
+encyclopedia articles, blogs. Pages are saved as fetched (decoded to
+text), one file per URL, into benchmarks/pages. Pages change over time,
+so record the fetch date next to any numbers you quote.
+
+Run from the backend directory:
+
+    python -m benchmarks.fetch_pages
+"""
+import argparse
+import asyncio
+import pathlib
+import re
+
+from app.http_client import create_http_client
+from app.utils import FALLBACK_USER_AGENTS
+
+CORPUS_DIR = pathlib.Path(__file__).parent / "pages"
+
+PAGES = [
+    "https://en.wikipedia.org/wiki/Web_crawler",
+    "https://en.wikipedia.org/wiki/Search_engine_optimization",
+    "https://www.bbc.com/news",
+    "https://www.theguardian.com/international",
+    "https://edition.cnn.com/",
+    "https://www.amazon.com/dp/B0BSHF7WHW",
+    "https://www.ebay.com/",
+    "https://www.etsy.com/",
+    "https://github.com/encode/httpx",
+    "https://stackoverflow.com/questions/11227809",
+    "https://developer.mozilla.org/en-US/docs/Web/HTML/Element/link",
+    "https://docs.python.org/3/library/html.parser.html",
+    "https://fastapi.tiangolo.com/",
+    "https://www.python.org/",
+    "https://developers.google.com/search/docs/crawling-indexing/sitemaps/overview",
+    "https://wordpress.org/news/",
+    "https://medium.com/",
+    "https://www.nytimes.com/",
+]
+
+
+def file_name(url):
+    return re.sub(r"[^a-z0-9]+", "-", url.split("://", 1)[-1].lower()).strip("-") + ".html"
+
+
+async def fetch_all(directory):
+    directory.mkdir(parents=True, exist_ok=True)
+    async with create_http_client() as client:
+        for url in PAGES:
+            try:
+                response = await client.get(url, headers={"User-Agent": FALLBACK_USER_AGENTS[0]})
+                response.raise_for_status()
+            except Exception as exc:
+                print(f"❌ {url}: {type(exc).__name__}: {exc}")
+                continue
+            (directory / file_name(url)).write_text(response.text, encoding="utf-8")
+            print(f"✅ {url}: {len(response.content) // 1024} KB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=str(CORPUS_DIR), help="directory to save the pages to")
+    args = parser.parse_args()
+    asyncio.run(fetch_all(pathlib.Path(args.out)))